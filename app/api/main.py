@@ -1,10 +1,18 @@
 # app/api/main.py
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+import time
+from fastapi import Depends, FastAPI, Request
+from fastapi.responses import JSONResponse, Response
 from dotenv import load_dotenv
 import os
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.rate_limiter import limiter
-from app.api.routes import books, changes
+from app.core.database import create_mongo_client
+from app.core.cache import response_cache
+from app.core.security import verify_api_key
+from app.core.config import MONGO_MAX_POOL_SIZE, MONGO_MIN_POOL_SIZE
+from app.core.metrics import API_REQUEST_SECONDS, CONTENT_TYPE, REGISTRY, merge_expositions, read_textfiles
+from app.api.routes import books, changes, stats
 
 from dotenv import load_dotenv
 
@@ -14,10 +22,22 @@ load_dotenv()
 if not os.getenv("API_KEY"):
     raise RuntimeError("API_KEY not set in environment")
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One pooled client for the whole process instead of one per request
+    app.state.mongo_client = create_mongo_client()
+    try:
+        yield
+    finally:
+        app.state.mongo_client.close()
+        app.state.mongo_client = None
+
+
 app = FastAPI(
     title="Book Crawler API",
     description="RESTful API for books.toscrape.com data with authentication and change tracking.",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Rate limiting
@@ -29,13 +49,69 @@ app.add_middleware(
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
+def route_template(request: Request) -> str:
+    """/books/{book_id} rather than the raw path, so label values stay bounded."""
+    if request.scope.get("route") is None:
+        return "unmatched"
+    path = request.url.path
+    for name, value in request.path_params.items():
+        path = path.replace(f"/{value}", f"/{{{name}}}", 1)
+    return path
+
+
+# Per-route request latency
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        API_REQUEST_SECONDS.observe(
+            time.perf_counter() - start, route=route_template(request), method=request.method, status=status
+        )
+
 # Routes
 app.include_router(books.router, prefix="/books", tags=["Books"])
 app.include_router(changes.router, prefix="/changes", tags=["Changes"])
+app.include_router(stats.router, prefix="/stats", tags=["Stats"])
 
 # Health check
 @app.get("/health")
 async def health():
-    return {"status": "ok"}
\ No newline at end of file
+    return {"status": "ok"}
+
+
+# Prometheus scrape target: the API's metrics plus the crawler/scheduler textfiles
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return Response(merge_expositions([REGISTRY.render(), *read_textfiles()]), media_type=CONTENT_TYPE)
+
+
+# Response cache hit/miss counters
+@app.get("/cache/stats", dependencies=[Depends(verify_api_key)])
+async def cache_stats():
+    return response_cache.stats()
+
+
+# Readiness: the shared pool can reach MongoDB
+@app.get("/ready")
+async def ready():
+    client = getattr(app.state, "mongo_client", None)
+    if client is None:
+        return JSONResponse(status_code=503, content={"status": "unavailable", "detail": "MongoDB client not started"})
+    start = time.perf_counter()
+    try:
+        await client.admin.command("ping")
+    except Exception as e:
+        return JSONResponse(status_code=503, content={"status": "unavailable", "detail": str(e)})
+    return {
+        "status": "ready",
+        "mongo_ping_ms": round((time.perf_counter() - start) * 1000, 2),
+        "pool": {"max_size": MONGO_MAX_POOL_SIZE, "min_size": MONGO_MIN_POOL_SIZE},
+    }
\ No newline at end of file
@@ -1,23 +1,65 @@
-from fastapi import APIRouter, Depends, Query, Request, HTTPException
-from motor.motor_asyncio import AsyncIOMotorClient
+from fastapi import APIRouter, Depends, Query, Request, Response, HTTPException
+from fastapi.responses import StreamingResponse
+from motor.motor_asyncio import AsyncIOMotorDatabase
 from bson import ObjectId
-from app.models.book import BookResponse
+from app.models.book import BookResponse, SearchResult
 from app.core.security import verify_api_key
 from app.core.rate_limiter import limiter
-from app.core.config import MONGODB_URL, MONGODB_DB_NAME
+from app.core.database import get_db
+from app.core.cache import response_cache
+from app.core.pagination import encode_cursor, decode_cursor, keyset_filter
+from app.core.export import EXPORT_FORMATS, encode_stream, iter_csv, iter_ndjson
+from app.core.metrics import API_MONGO_QUERY_SECONDS
+from app.core.search import SEARCH_MODES, build_search
 from typing import List, Optional
+from datetime import datetime, timedelta
 import logging
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(dependencies=[Depends(verify_api_key)])
 
+# Page bodies live in html_pages; never pull legacy inline copies over the wire
+BOOK_PROJECTION = {"raw_html": 0}
+
+SORT_FIELDS = {
+    "rating": "rating",
+    "price": "price_incl_tax",
+    "reviews": "num_reviews"
+}
+
+# Export columns, in order: the fields of BookResponse
+EXPORT_FIELDS = list(BookResponse.model_fields)
+
+
+def build_book_query(
+    category: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    rating: Optional[int] = None,
+) -> dict:
+    """Mongo filter for the catalog query parameters shared by list and export."""
+    query = {}
+    if category:
+        query["category"] = category
+    if min_price is not None or max_price is not None:
+        price_filter = {}
+        if min_price is not None:
+            price_filter["$gte"] = min_price
+        if max_price is not None:
+            price_filter["$lte"] = max_price
+        query["price_incl_tax"] = price_filter
+    if rating is not None:
+        query["rating"] = rating
+    return query
+
 
 # === LIST endpoint: GET /books ===
 @router.get("", response_model=List[BookResponse])
 @limiter.limit("100/hour")
 async def get_books(
     request: Request,
+    response: Response,
     category: Optional[str] = None,
     min_price: Optional[float] = None,
     max_price: Optional[float] = None,
@@ -25,49 +67,199 @@ async def get_books(
     sort_by: str = "rating",
     page: int = Query(1, ge=1),
     size: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor from a previous page; takes precedence over page"),
+    db: AsyncIOMotorDatabase = Depends(get_db),
     _=Depends(verify_api_key)
 ):
-    valid_sort_fields = {"rating", "price", "reviews"}
-    if sort_by not in valid_sort_fields:
+    if sort_by not in SORT_FIELDS:
         raise HTTPException(status_code=400, detail="Invalid sort_by parameter")
 
-    query = {}
-    if category:
-        query["category"] = category
-    if min_price is not None or max_price is not None:
-        price_filter = {}
-        if min_price is not None:
-            price_filter["$gte"] = min_price
-        if max_price is not None:
-            price_filter["$lte"] = max_price
-        query["price_incl_tax"] = price_filter
-    if rating is not None:
-        query["rating"] = rating
+    query = build_book_query(category, min_price, max_price, rating)
+    db_sort_field = SORT_FIELDS[sort_by]
 
-    sort_field_map = {
-        "rating": "rating",
-        "price": "price_incl_tax",
-        "reviews": "num_reviews"
-    }
-    db_sort_field = sort_field_map[sort_by]
+    # Keyset pagination: continue after the last (sort value, _id) seen
+    skip = (page - 1) * size
+    if cursor:
+        try:
+            position = decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        if position["sort_by"] != sort_by:
+            raise HTTPException(status_code=400, detail="Cursor does not match sort_by")
+        after = keyset_filter(db_sort_field, position["value"], position["id"])
+        query = {"$and": [query, after]} if query else after
+        skip = 0
 
-    client = AsyncIOMotorClient(MONGODB_URL)
-    try:
-        db = client[MONGODB_DB_NAME]
-        cursor = db.books.find(query).sort(db_sort_field, -1)
-        skip = (page - 1) * size
-        books = await cursor.skip(skip).limit(size).to_list(length=size)
+    async def load():
+        with API_MONGO_QUERY_SECONDS.time(route="/books"):
+            books = await (
+                db.books.find(query, BOOK_PROJECTION)
+                .sort([(db_sort_field, -1), ("_id", -1)])
+                .skip(skip)
+                .limit(size)
+                .to_list(length=size)
+            )
+        next_cursor = None
+        if len(books) == size:
+            last = books[-1]
+            next_cursor = encode_cursor(sort_by, last.get(db_sort_field), last["_id"])
 
         for book in books:
             if "_id" in book:
                 book["id"] = str(book["_id"])
                 del book["_id"]
-        return books
+        return {"books": books, "next_cursor": next_cursor}
+
+    params = {
+        "category": category, "min_price": min_price, "max_price": max_price, "rating": rating,
+        "sort_by": sort_by, "page": page, "size": size, "cursor": cursor,
+    }
+    try:
+        result = await response_cache.get_or_compute(db, "books", params, load)
     except Exception as e:
         logger.error(f"Database error in get_books: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
-    finally:
-        client.close()
+
+    if result["next_cursor"]:
+        response.headers["X-Next-Cursor"] = result["next_cursor"]
+    return result["books"]
+
+
+# === SEARCH endpoint: GET /books/search ===
+# Declared before /{book_id} so "search" is not taken for an id
+@router.get("/search", response_model=List[SearchResult])
+@limiter.limit("300/hour")
+async def search_books(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=200),
+    mode: str = Query("text", description="text (ranked words in title/description) or prefix (typeahead on title)"),
+    category: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    rating: Optional[int] = Query(None, ge=1, le=5),
+    page: int = Query(1, ge=1),
+    size: int = Query(20, ge=1, le=100),
+    db: AsyncIOMotorDatabase = Depends(get_db),
+    _=Depends(verify_api_key)
+):
+    """Books matching ``q``, best first, combined with the list filters."""
+    if mode not in SEARCH_MODES:
+        raise HTTPException(status_code=400, detail="Invalid mode parameter")
+    search, projection, sort = build_search(q, mode)
+    if search is None:
+        return []
+    filters = build_book_query(category, min_price, max_price, rating)
+    query = {"$and": [search, filters]} if filters else search
+
+    async def load():
+        with API_MONGO_QUERY_SECONDS.time(route="/books/search"):
+            books = await (
+                db.books.find(query, {**BOOK_PROJECTION, **projection})
+                .sort(sort)
+                .skip((page - 1) * size)
+                .limit(size)
+                .to_list(length=size)
+            )
+        for book in books:
+            book["id"] = str(book.pop("_id"))
+        return books
+
+    params = {
+        "q": q, "mode": mode, "category": category, "min_price": min_price, "max_price": max_price,
+        "rating": rating, "page": page, "size": size,
+    }
+    try:
+        return await response_cache.get_or_compute(db, "search", params, load)
+    except Exception as e:
+        logger.error(f"Database error in search_books: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
+# === EXPORT endpoint: GET /books/export ===
+# Declared before /{book_id} so "export" is not taken for an id
+@router.get("/export")
+@limiter.limit("10/hour")
+async def export_books(
+    request: Request,
+    category: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    rating: Optional[int] = Query(None, ge=1, le=5),
+    sort_by: str = "rating",
+    format: str = Query("ndjson", description="ndjson or csv"),
+    db: AsyncIOMotorDatabase = Depends(get_db),
+    _=Depends(verify_api_key)
+):
+    """Stream the whole filtered catalog in one response.
+
+    Documents come straight from a Motor cursor without response_model
+    validation, so memory stays flat however many books match. The body
+    is gzipped when the client sends ``Accept-Encoding: gzip``.
+    """
+    if sort_by not in SORT_FIELDS:
+        raise HTTPException(status_code=400, detail="Invalid sort_by parameter")
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="Invalid format parameter")
+
+    query = build_book_query(category, min_price, max_price, rating)
+    projection = {field: 1 for field in EXPORT_FIELDS if field != "id"}
+    cursor = (
+        db.books.find(query, projection)
+        .sort([(SORT_FIELDS[sort_by], -1), ("_id", -1)])
+        .batch_size(1000)
+    )
+    lines = iter_csv(cursor, EXPORT_FIELDS) if format == "csv" else iter_ndjson(cursor, EXPORT_FIELDS)
+    gzip = "gzip" in request.headers.get("accept-encoding", "")
+    headers = {"Content-Disposition": f'attachment; filename="books.{format}"', "Vary": "Accept-Encoding"}
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(encode_stream(lines, gzip=gzip), media_type=EXPORT_FORMATS[format], headers=headers)
+
+
+def facet_document(doc: dict) -> dict:
+    """API shape of one category_stats document (maintained by scheduler.category_stats)."""
+    books = doc.get("books", 0)
+    return {
+        "category": doc["_id"],
+        "books": books,
+        "in_stock": doc.get("in_stock", 0),
+        "price_min": doc.get("price_min"),
+        "price_max": doc.get("price_max"),
+        "price_avg": round(doc.get("price_sum", 0.0) / books, 2) if books else None,
+        "ratings": {str(r): doc.get("rating_hist", {}).get(str(r), 0) for r in range(1, 6)},
+    }
+
+
+# === FACETS endpoint: GET /books/facets ===
+# Declared before /{book_id}; one document per category, however many books
+@router.get("/facets")
+@limiter.limit("100/hour")
+async def get_book_facets(
+    request: Request,
+    db: AsyncIOMotorDatabase = Depends(get_db),
+    _=Depends(verify_api_key)
+):
+    """Per-category book and in-stock counts, price range and rating histogram, plus catalog totals."""
+    async def load():
+        with API_MONGO_QUERY_SECONDS.time(route="/books/facets"):
+            docs = await db.category_stats.find({"books": {"$gt": 0}}).sort("_id", 1).to_list(length=None)
+        categories = [facet_document(doc) for doc in docs]
+        total_books = sum(c["books"] for c in categories)
+        total = {
+            "books": total_books,
+            "in_stock": sum(c["in_stock"] for c in categories),
+            "price_min": min((c["price_min"] for c in categories if c["price_min"] is not None), default=None),
+            "price_max": max((c["price_max"] for c in categories if c["price_max"] is not None), default=None),
+            "price_avg": round(sum(doc.get("price_sum", 0.0) for doc in docs) / total_books, 2) if total_books else None,
+            "ratings": {r: sum(c["ratings"][r] for c in categories) for r in map(str, range(1, 6))},
+        }
+        return {"categories": categories, "total": total}
+
+    try:
+        return await response_cache.get_or_compute(db, "facets", {}, load)
+    except Exception as e:
+        logger.error(f"Database error in get_book_facets: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
 
 
 # === DETAIL endpoint: GET /books/{id} ===
@@ -76,23 +268,61 @@ async def get_books(
 async def get_book_by_id(
     request: Request,
     book_id: str,
+    db: AsyncIOMotorDatabase = Depends(get_db),
     _=Depends(verify_api_key)
 ):
     if not ObjectId.is_valid(book_id):
         raise HTTPException(status_code=400, detail="Invalid book ID")
 
-    client = AsyncIOMotorClient(MONGODB_URL)
     try:
-        db = client[MONGODB_DB_NAME]
-        book = await db.books.find_one({"_id": ObjectId(book_id)})
-        if not book:
-            raise HTTPException(status_code=404, detail="Book not found")
-
-        book["id"] = str(book["_id"])
-        del book["_id"]
-        return book
+        with API_MONGO_QUERY_SECONDS.time(route="/books/{book_id}"):
+            book = await db.books.find_one({"_id": ObjectId(book_id)}, BOOK_PROJECTION)
     except Exception as e:
         logger.error(f"Database error in get_book_by_id: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
-    finally:
-        client.close()
\ No newline at end of file
+    if not book:
+        raise HTTPException(status_code=404, detail="Book not found")
+
+    book["id"] = str(book["_id"])
+    del book["_id"]
+    return book
+
+
+# Daily rollups only: never scans the raw observations
+HISTORY_PROJECTION = {"_id": 0, "book_url": 0, "category": 0}
+
+
+# === HISTORY endpoint: GET /books/{id}/history ===
+@router.get("/{book_id}/history")
+@limiter.limit("100/hour")
+async def get_book_history(
+    request: Request,
+    book_id: str,
+    days: int = Query(90, ge=1, le=3650),
+    db: AsyncIOMotorDatabase = Depends(get_db),
+    _=Depends(verify_api_key)
+):
+    """Daily min/max/avg/last price and stock of one book, oldest day first."""
+    if not ObjectId.is_valid(book_id):
+        raise HTTPException(status_code=400, detail="Invalid book ID")
+
+    async def load():
+        with API_MONGO_QUERY_SECONDS.time(route="/books/{book_id}/history"):
+            book = await db.books.find_one({"_id": ObjectId(book_id)}, {"url": 1})
+            if not book:
+                return None
+            cutoff = datetime.combine(datetime.utcnow().date() - timedelta(days=days - 1), datetime.min.time())
+            return await (
+                db.book_daily.find({"book_url": book["url"], "day": {"$gte": cutoff}}, HISTORY_PROJECTION)
+                .sort("day", 1)
+                .to_list(length=days)
+            )
+
+    try:
+        history = await response_cache.get_or_compute(db, "book_history", {"id": book_id, "days": days}, load)
+    except Exception as e:
+        logger.error(f"Database error in get_book_history: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+    if history is None:
+        raise HTTPException(status_code=404, detail="Book not found")
+    return history
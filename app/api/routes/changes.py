@@ -1,10 +1,16 @@
 # app/api/routes/changes.py
-from fastapi import APIRouter, Depends, Request
-from motor.motor_asyncio import AsyncIOMotorClient
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from bson import ObjectId
+from typing import Optional
 from app.core.security import verify_api_key
-from app.core.config import MONGODB_URL, MONGODB_DB_NAME
+from app.core.database import get_db
+from app.core.cache import response_cache
 from datetime import datetime, timedelta
 from app.core.rate_limiter import limiter
+from app.core.metrics import API_MONGO_QUERY_SECONDS
+from app.core.changefeed import build_feed_query, iter_change_events, serialize_change, wait_for_changes
 
 router = APIRouter(dependencies=[Depends(verify_api_key)])
 
@@ -12,18 +18,86 @@ router = APIRouter(dependencies=[Depends(verify_api_key)])
 @limiter.limit("100/hour")
 async def get_changes(
     request: Request,  # ← REQUIRED
+    db: AsyncIOMotorDatabase = Depends(get_db),
     _=Depends(verify_api_key)
 ):
-    client = AsyncIOMotorClient(MONGODB_URL)
-    db = client[MONGODB_DB_NAME]
-    
-    # Last 24 hours
-    cutoff = datetime.utcnow() - timedelta(hours=24)
-    changes = await db.change_log.find(
-        {"detected_at": {"$gte": cutoff}}
-    ).sort("detected_at", -1).to_list(length=100)
-    
-    # Convert ObjectId to str
-    for c in changes:
-        c["id"] = str(c.pop("_id"))
-    return changes
\ No newline at end of file
+    async def load():
+        # Last 24 hours
+        cutoff = datetime.utcnow() - timedelta(hours=24)
+        with API_MONGO_QUERY_SECONDS.time(route="/changes"):
+            changes = await db.change_log.find(
+                {"detected_at": {"$gte": cutoff}}
+            ).sort("detected_at", -1).to_list(length=100)
+
+        # Convert ObjectId to str
+        for c in changes:
+            c["id"] = str(c.pop("_id"))
+        return changes
+
+    # The 24h window moves with time, so entries also expire by TTL
+    return await response_cache.get_or_compute(db, "changes", {}, load)
+
+
+def feed_query(after_id, since, change_type, category, field, last_event_id=None) -> dict:
+    cursor = after_id or last_event_id
+    if cursor is not None and not ObjectId.is_valid(cursor):
+        raise HTTPException(status_code=400, detail="Invalid after_id")
+    return build_feed_query(ObjectId(cursor) if cursor else None, since, change_type, category, field)
+
+
+# === FEED endpoint: GET /changes/feed ===
+@router.get("/feed")
+@limiter.limit("600/hour")
+async def get_change_feed(
+    request: Request,
+    response: Response,
+    after_id: Optional[str] = Query(None, description="X-Next-Cursor from the previous call"),
+    since: Optional[datetime] = Query(None, description="Start at this detected_at when there is no after_id"),
+    change_type: Optional[str] = Query(None, description="new or updated"),
+    category: Optional[str] = None,
+    field: Optional[str] = Query(None, description="Only updates that changed this field, e.g. price_incl_tax"),
+    limit: int = Query(100, ge=1, le=1000),
+    wait: float = Query(0, ge=0, le=60, description="Long poll: seconds to wait when nothing is new"),
+    db: AsyncIOMotorDatabase = Depends(get_db),
+    _=Depends(verify_api_key)
+):
+    """Change log entries ordered by ``_id``, after a cursor.
+
+    Pass the ``X-Next-Cursor`` response header back as ``after_id`` to get
+    the later entries; delivery is at least once, so de-duplicate by id
+    (see app.core.changefeed for when entries can be missed). Not cached:
+    each call reads MongoDB directly.
+    """
+    query = feed_query(after_id, since, change_type, category, field)
+    docs = await wait_for_changes(db.change_log, query, limit, wait, route="/changes/feed")
+    # With nothing new, hand the same cursor back so the consumer keeps its place
+    next_cursor = str(docs[-1]["_id"]) if docs else after_id
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return [serialize_change(doc) for doc in docs]
+
+
+# === STREAM endpoint: GET /changes/stream (server-sent events) ===
+@router.get("/stream")
+@limiter.limit("60/hour")
+async def stream_changes(
+    request: Request,
+    after_id: Optional[str] = None,
+    since: Optional[datetime] = None,
+    change_type: Optional[str] = None,
+    category: Optional[str] = None,
+    field: Optional[str] = None,
+    db: AsyncIOMotorDatabase = Depends(get_db),
+    _=Depends(verify_api_key)
+):
+    """Every entry after the cursor, then new ones as they are detected.
+
+    Each event's ``id`` is the entry id, so a reconnecting EventSource
+    resumes from ``Last-Event-ID``; the same at-least-once, ``_id``-ordered
+    guarantee as /changes/feed applies.
+    """
+    query = feed_query(after_id, since, change_type, category, field, request.headers.get("last-event-id"))
+    events = iter_change_events(db.change_log, query, is_disconnected=request.is_disconnected)
+    return StreamingResponse(
+        events, media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
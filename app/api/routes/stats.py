@@ -0,0 +1,41 @@
+# app/api/routes/stats.py
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from datetime import datetime, timedelta
+import logging
+from app.core.security import verify_api_key
+from app.core.database import get_db
+from app.core.cache import response_cache
+from app.core.rate_limiter import limiter
+from app.core.metrics import API_MONGO_QUERY_SECONDS
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(dependencies=[Depends(verify_api_key)])
+
+
+# === GET /stats/categories/{name}/daily ===
+@router.get("/categories/{name}/daily")
+@limiter.limit("100/hour")
+async def get_category_daily(
+    request: Request,
+    name: str,
+    days: int = Query(90, ge=1, le=3650),
+    db: AsyncIOMotorDatabase = Depends(get_db),
+    _=Depends(verify_api_key)
+):
+    """Per-day book count, in-stock count and price min/max/avg of a category, from the daily rollups."""
+    async def load():
+        cutoff = datetime.combine(datetime.utcnow().date() - timedelta(days=days - 1), datetime.min.time())
+        with API_MONGO_QUERY_SECONDS.time(route="/stats/categories/{name}/daily"):
+            return await (
+                db.category_daily.find({"category": name, "day": {"$gte": cutoff}}, {"_id": 0, "category": 0})
+                .sort("day", 1)
+                .to_list(length=days)
+            )
+
+    try:
+        return await response_cache.get_or_compute(db, "category_daily", {"name": name, "days": days}, load)
+    except Exception as e:
+        logger.error(f"Database error in get_category_daily: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
@@ -0,0 +1,143 @@
+# app/core/cache.py
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable
+from app.core.config import (
+    RESPONSE_CACHE_ENABLED, RESPONSE_CACHE_BACKEND, RESPONSE_CACHE_TTL,
+    RESPONSE_CACHE_MAX_ENTRIES, RESPONSE_CACHE_VERSION_TTL, REDIS_URL
+)
+
+# Same document as crawler.storage.CATALOG_VERSION_ID, bumped by every
+# writer to books/change_log
+CATALOG_VERSION_ID = "catalog_version"
+
+
+class LocalCacheBackend:
+    """In-process LRU with a per-entry TTL."""
+
+    name = "local"
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES, ttl: float = RESPONSE_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    async def get(self, key: str) -> Any | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: Any):
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def clear(self):
+        self._entries.clear()
+
+
+class RedisCacheBackend:
+    """Cache shared by all API workers; requires the optional redis package."""
+
+    name = "redis"
+
+    def __init__(self, url: str = REDIS_URL, ttl: float = RESPONSE_CACHE_TTL, prefix: str = "book-api:"):
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            raise RuntimeError("RESPONSE_CACHE_BACKEND=redis requires the redis package") from e
+        self._redis = redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+
+    async def get(self, key: str) -> Any | None:
+        raw = await self._redis.get(self.prefix + key)
+        return json.loads(raw) if raw is not None else None
+
+    async def set(self, key: str, value: Any):
+        await self._redis.set(self.prefix + key, json.dumps(value, default=str), px=int(self.ttl * 1000))
+
+    async def clear(self):
+        async for key in self._redis.scan_iter(match=self.prefix + "*"):
+            await self._redis.delete(key)
+
+
+def create_cache_backend(name: str = RESPONSE_CACHE_BACKEND):
+    if name == "local":
+        return LocalCacheBackend()
+    if name == "redis":
+        return RedisCacheBackend()
+    raise RuntimeError(f"Unknown RESPONSE_CACHE_BACKEND: {name!r}")
+
+
+class ResponseCache:
+    """Caches query results under the current catalog version.
+
+    Keys embed the version stored in the ``meta`` collection, so a write
+    by the scheduler or crawler makes every older entry unreachable; the
+    backend's TTL/LRU then reclaims them.
+    """
+
+    def __init__(self, backend, enabled: bool = RESPONSE_CACHE_ENABLED,
+                 version_ttl: float = RESPONSE_CACHE_VERSION_TTL):
+        self.backend = backend
+        self.enabled = enabled
+        self.version_ttl = version_ttl
+        self.hits = 0
+        self.misses = 0
+        self._version = 0
+        self._version_checked_at = float("-inf")
+
+    @staticmethod
+    def make_key(route: str, params: dict, version: int) -> str:
+        normalized = {k: v for k, v in sorted(params.items()) if v is not None}
+        return f"{route}:v{version}:{json.dumps(normalized, sort_keys=True, default=str)}"
+
+    async def catalog_version(self, db) -> int:
+        now = time.monotonic()
+        if now - self._version_checked_at >= self.version_ttl:
+            doc = await db.meta.find_one({"_id": CATALOG_VERSION_ID})
+            self._version = doc["value"] if doc else 0
+            self._version_checked_at = now
+        return self._version
+
+    async def get_or_compute(self, db, route: str, params: dict, compute: Callable[[], Awaitable[Any]]) -> Any:
+        if not self.enabled:
+            return await compute()
+        key = self.make_key(route, params, await self.catalog_version(db))
+        cached = await self.backend.get(key)
+        if cached is not None:
+            self.hits += 1
+            return cached
+        self.misses += 1
+        value = await compute()
+        await self.backend.set(key, value)
+        return value
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        stats = {
+            "enabled": self.enabled,
+            "backend": self.backend.name,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "catalog_version": self._version,
+        }
+        if isinstance(self.backend, LocalCacheBackend):
+            stats["entries"] = len(self.backend)
+        return stats
+
+
+response_cache = ResponseCache(create_cache_backend() if RESPONSE_CACHE_ENABLED else LocalCacheBackend())
@@ -0,0 +1,145 @@
+# app/core/changefeed.py
+"""Resumable reads of change_log for GET /changes/feed and /changes/stream.
+
+Entries are read in ``_id`` order and paged with "everything after this
+id". Delivery is at least once, ordered by ``_id``: consumers should
+de-duplicate by id. The paging is only complete while ObjectIds rise with
+insertion order, which holds for a single writer (the scheduler) whose
+per-process counter does not wrap within one second. A second writer, or
+more than 2^24 entries in one second, can insert an id below a cursor
+already handed out, and that entry is then skipped by that consumer.
+"""
+import asyncio
+import json
+import time
+from datetime import datetime
+from typing import AsyncIterator
+from bson import ObjectId
+from pymongo.errors import OperationFailure
+from app.core.config import CHANGE_FEED_POLL_INTERVAL, CHANGE_FEED_HEARTBEAT
+from app.core.metrics import API_MONGO_QUERY_SECONDS
+
+
+def build_feed_query(
+    after_id: ObjectId | None = None,
+    since: datetime | None = None,
+    change_type: str | None = None,
+    category: str | None = None,
+    field: str | None = None,
+) -> dict:
+    """change_log filter; ``after_id`` wins over ``since`` as the starting point."""
+    query = {}
+    if after_id is not None:
+        query["_id"] = {"$gt": after_id}
+    elif since is not None:
+        query["detected_at"] = {"$gte": since}
+    if change_type:
+        query["change_type"] = change_type
+    if category:
+        query["category"] = category
+    if field:
+        query["changed_fields"] = field
+    return query
+
+
+def change_stream_match(query: dict) -> dict:
+    """The same filter for a change stream, where the entry is ``fullDocument``."""
+    return {"operationType": "insert", **{f"fullDocument.{key}": value for key, value in query.items()}}
+
+
+def serialize_change(doc: dict) -> dict:
+    doc = dict(doc)
+    doc["id"] = str(doc.pop("_id"))
+    return doc
+
+
+async def read_feed(collection, query: dict, limit: int, route: str | None = None) -> list[dict]:
+    """One page of the feed; with ``route``, the query is timed in api_mongo_query_seconds."""
+    cursor = collection.find(query).sort("_id", 1).limit(limit)
+    if route is None:
+        return await cursor.to_list(length=limit)
+    with API_MONGO_QUERY_SECONDS.time(route=route):
+        return await cursor.to_list(length=limit)
+
+
+async def wait_for_changes(collection, query: dict, limit: int, timeout: float,
+                           poll_interval: float = CHANGE_FEED_POLL_INTERVAL, route: str | None = None) -> list[dict]:
+    """Long poll: the next entries matching ``query``, waiting up to ``timeout`` seconds for some.
+
+    Only the reads are timed (see ``read_feed``), not the waits between them.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        docs = await read_feed(collection, query, limit, route)
+        remaining = deadline - time.monotonic()
+        if docs or remaining <= 0:
+            return docs
+        await asyncio.sleep(min(poll_interval, remaining))
+
+
+def _sse(doc: dict) -> str:
+    entry = serialize_change(doc)
+    return f"id: {entry['id']}\nevent: change\ndata: {json.dumps(entry, default=str)}\n\n"
+
+
+async def iter_change_events(collection, query: dict, batch_size: int = 500,
+                             poll_interval: float = CHANGE_FEED_POLL_INTERVAL,
+                             heartbeat: float = CHANGE_FEED_HEARTBEAT,
+                             is_disconnected=None) -> AsyncIterator[str]:
+    """Server-sent events: the backlog after the cursor, then new entries as they are inserted.
+
+    New entries come from a change stream, opened before the backlog is
+    read so nothing inserted in between is lost; on a standalone mongod
+    (no replica set, so no change streams) the collection is tailed by
+    polling every ``poll_interval`` seconds instead.
+    """
+    last_id = query.get("_id", {}).get("$gt")
+    stream = None
+    try:
+        stream = collection.watch([{"$match": change_stream_match(query)}])
+        await stream.try_next()  # raises here when change streams are unsupported
+    except (OperationFailure, NotImplementedError):
+        stream = None
+
+    def after(last):
+        if last is None:
+            return query
+        tail = {key: value for key, value in query.items() if key not in ("_id", "detected_at")}
+        return {**tail, "_id": {"$gt": last}}
+
+    # Backlog (and, without a change stream, every later poll)
+    idle_since = time.monotonic()
+    try:
+        while True:
+            while docs := await read_feed(collection, after(last_id), batch_size):
+                for doc in docs:
+                    yield _sse(doc)
+                last_id = docs[-1]["_id"]
+                idle_since = time.monotonic()
+            if stream is not None:
+                break
+            if is_disconnected is not None and await is_disconnected():
+                return
+            if time.monotonic() - idle_since >= heartbeat:
+                yield ": keep-alive\n\n"
+                idle_since = time.monotonic()
+            await asyncio.sleep(poll_interval)
+
+        while True:
+            change = await stream.try_next()
+            if change is not None:
+                doc = change["fullDocument"]
+                # Already sent with the backlog
+                if last_id is None or doc["_id"] > last_id:
+                    last_id = doc["_id"]
+                    idle_since = time.monotonic()
+                    yield _sse(doc)
+                continue
+            if is_disconnected is not None and await is_disconnected():
+                return
+            if time.monotonic() - idle_since >= heartbeat:
+                yield ": keep-alive\n\n"
+                idle_since = time.monotonic()
+    finally:
+        if stream is not None:
+            await stream.close()
@@ -5,4 +5,33 @@ from dotenv import load_dotenv
 load_dotenv()  # ← Critical: loads .env at import time
 
 MONGODB_URL = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
-MONGODB_DB_NAME = os.getenv("MONGODB_DB_NAME", "books_db")
\ No newline at end of file
+MONGODB_DB_NAME = os.getenv("MONGODB_DB_NAME", "books_db")
+# Shared API connection pool (see app.core.database)
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", 100))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", 0))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", 300000))
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", 5000))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", 5000))
+MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", 30000))
+
+# Response cache for /books and /changes (see app.core.cache)
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "local")  # "local" or "redis"
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", 300))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", 1024))
+# How long a catalog version read from MongoDB is trusted before re-checking
+RESPONSE_CACHE_VERSION_TTL = float(os.getenv("RESPONSE_CACHE_VERSION_TTL", 1.0))
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+# Metrics (see app.core.metrics): the crawler and scheduler write <job>.prom
+# files here, which /metrics serves alongside the API's own metrics
+METRICS_TEXTFILE_DIR = os.getenv("METRICS_TEXTFILE_DIR", "metrics")
+# Optional Prometheus Pushgateway, e.g. http://pushgateway:9091
+METRICS_PUSHGATEWAY_URL = os.getenv("METRICS_PUSHGATEWAY_URL", "")
+# How often a running batch process re-exports its metrics (seconds)
+METRICS_EXPORT_INTERVAL = float(os.getenv("METRICS_EXPORT_INTERVAL", 15.0))
+
+# Change feed (see app.core.changefeed): polling interval when MongoDB has no
+# change streams (standalone mongod) and SSE keep-alive interval, in seconds
+CHANGE_FEED_POLL_INTERVAL = float(os.getenv("CHANGE_FEED_POLL_INTERVAL", 1.0))
+CHANGE_FEED_HEARTBEAT = float(os.getenv("CHANGE_FEED_HEARTBEAT", 15.0))
@@ -0,0 +1,36 @@
+# app/core/database.py
+from fastapi import Request
+from motor.motor_asyncio import AsyncIOMotorClient
+from app.core.config import (
+    MONGODB_URL, MONGODB_DB_NAME, MONGO_MAX_POOL_SIZE, MONGO_MIN_POOL_SIZE, MONGO_MAX_IDLE_TIME_MS,
+    MONGO_CONNECT_TIMEOUT_MS, MONGO_SERVER_SELECTION_TIMEOUT_MS, MONGO_SOCKET_TIMEOUT_MS
+)
+
+
+def create_mongo_client() -> AsyncIOMotorClient:
+    return AsyncIOMotorClient(
+        MONGODB_URL,
+        maxPoolSize=MONGO_MAX_POOL_SIZE,
+        minPoolSize=MONGO_MIN_POOL_SIZE,
+        maxIdleTimeMS=MONGO_MAX_IDLE_TIME_MS,
+        connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+        serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        socketTimeoutMS=MONGO_SOCKET_TIMEOUT_MS,
+    )
+
+
+async def get_db(request: Request):
+    """Database handle backed by the app-wide client created in the lifespan.
+
+    Falls back to a short-lived client when the lifespan has not run
+    (e.g. a TestClient used without a ``with`` block).
+    """
+    client = getattr(request.app.state, "mongo_client", None)
+    if client is not None:
+        yield client[MONGODB_DB_NAME]
+        return
+    client = create_mongo_client()
+    try:
+        yield client[MONGODB_DB_NAME]
+    finally:
+        client.close()
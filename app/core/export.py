@@ -0,0 +1,62 @@
+# app/core/export.py
+import csv
+import io
+import json
+import zlib
+from typing import AsyncIterator
+
+# Flush the encoder once this many bytes are buffered
+CHUNK_SIZE = 64 * 1024
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+def _export_row(doc: dict, fields: list[str]) -> dict:
+    row = {field: doc.get(field) for field in fields if field != "id"}
+    if "id" in fields:
+        row = {"id": str(doc["_id"]), **row}
+    return row
+
+
+async def iter_ndjson(docs: AsyncIterator[dict], fields: list[str]) -> AsyncIterator[str]:
+    """One JSON object per line; datetimes and ObjectIds are written as strings."""
+    async for doc in docs:
+        yield json.dumps(_export_row(doc, fields), default=str, ensure_ascii=False) + "\n"
+
+
+async def iter_csv(docs: AsyncIterator[dict], fields: list[str]) -> AsyncIterator[str]:
+    """Header row followed by one row per document."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fields, extrasaction="ignore")
+    writer.writeheader()
+    async for doc in docs:
+        writer.writerow(_export_row(doc, fields))
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+async def encode_stream(lines: AsyncIterator[str], gzip: bool = False) -> AsyncIterator[bytes]:
+    """UTF-8 encode (and optionally gzip) a text stream in ~CHUNK_SIZE pieces."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS) if gzip else None
+    pending = []
+    size = 0
+    async for line in lines:
+        data = line.encode("utf-8")
+        pending.append(data)
+        size += len(data)
+        if size >= CHUNK_SIZE:
+            chunk = b"".join(pending)
+            pending, size = [], 0
+            chunk = compressor.compress(chunk) if compressor else chunk
+            if chunk:
+                yield chunk
+    chunk = b"".join(pending)
+    if compressor:
+        chunk = compressor.compress(chunk) + compressor.flush()
+    if chunk:
+        yield chunk
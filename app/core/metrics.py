@@ -0,0 +1,295 @@
+# app/core/metrics.py
+"""In-process metrics in the Prometheus text exposition format.
+
+The API serves the registry at ``/metrics``. The crawler and scheduler
+run as separate processes and export theirs with ``export_metrics(job)``
+(every METRICS_EXPORT_INTERVAL seconds while they run, via
+``exporting_metrics``): as a ``<job>.prom`` file in METRICS_TEXTFILE_DIR (which ``/metrics`` and
+node_exporter's textfile collector both pick up) and, when
+METRICS_PUSHGATEWAY_URL is set, to a Prometheus Pushgateway.
+"""
+import asyncio
+import bisect
+import logging
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager, contextmanager
+from typing import Callable
+import httpx
+from app.core.config import METRICS_TEXTFILE_DIR, METRICS_PUSHGATEWAY_URL, METRICS_EXPORT_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+# Seconds; spans a parse (sub-ms) to a retried fetch
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple, values: tuple, extra: dict | None = None) -> str:
+    pairs = list(zip(names, values)) + list((extra or {}).items())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric(ABC):
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: dict[tuple, object] = {}
+
+    def _key(self, labels: dict) -> tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    @abstractmethod
+    def _samples(self) -> list[tuple]:
+        """(name suffix, label values, extra labels, value) for each sample line."""
+
+    def render(self, const_labels: dict | None = None) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, labels, extra, value in self._samples():
+            extra = {**(const_labels or {}), **(extra or {})}
+            lines.append(f"{self.name}{suffix}{_format_labels(self.labelnames, labels, extra)} {_format_value(value)}")
+        return lines
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def _samples(self):
+        with self._lock:
+            return [("_total", key, None, value) for key, value in sorted(self._values.items())]
+
+
+class Gauge(_Metric):
+    """A value that goes up and down; ``callback`` computes ``{label values: value}`` at render time."""
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (),
+                 callback: Callable[[], dict] | None = None):
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def _samples(self):
+        with self._lock:
+            values = dict(self._values)
+        if self.callback is not None:
+            values.update({tuple(str(v) for v in key): value for key, value in self.callback().items()})
+        return [("", key, None, value) for key, value in sorted(values.items())]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key) or ([0] * (len(self.buckets) + 1), 0.0)
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._values[key] = (counts, total + value)
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of the ``with`` block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> int:
+        entry = self._values.get(self._key(labels))
+        return sum(entry[0]) if entry else 0
+
+    def total(self, **labels) -> float:
+        """Sum of the observed values."""
+        entry = self._values.get(self._key(labels))
+        return entry[1] if entry else 0.0
+
+    def _samples(self):
+        samples = []
+        with self._lock:
+            items = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                samples.append(("_bucket", key, {"le": _format_value(bound)}, cumulative))
+            samples.append(("_sum", key, None, total))
+            samples.append(("_count", key, None, cumulative))
+        return samples
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                # Modules may be imported more than once (e.g. under spawn); reuse the metric
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: tuple = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: tuple = (),
+              callback: Callable[[], dict] | None = None) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames, callback))
+
+    def histogram(self, name: str, documentation: str, labelnames: tuple = (),
+                  buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self, const_labels: dict | None = None) -> str:
+        """Text exposition; ``const_labels`` (e.g. ``{"job": ...}``) are added to every sample."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(line for metric in metrics for line in metric.render(const_labels)) + "\n"
+
+    def clear(self):
+        """Reset every value (tests)."""
+        for metric in self._metrics.values():
+            metric.clear()
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+API_REQUEST_SECONDS = REGISTRY.histogram(
+    "api_request_seconds", "API request latency by route template", ("route", "method", "status")
+)
+API_MONGO_QUERY_SECONDS = REGISTRY.histogram("api_mongo_query_seconds", "MongoDB query time per API route", ("route",))
+
+
+def write_textfile(job: str, registry: Registry = REGISTRY, directory: str = METRICS_TEXTFILE_DIR) -> str:
+    """Atomically write ``<directory>/<job>.prom``; returns the path."""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{job}.prom")
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(registry.render({"job": job}))
+    os.replace(tmp, path)
+    return path
+
+
+def read_textfiles(directory: str = METRICS_TEXTFILE_DIR) -> list[str]:
+    """Contents of every ``*.prom`` file exported by other processes."""
+    if not os.path.isdir(directory):
+        return []
+    parts = []
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(".prom"):
+            with open(os.path.join(directory, name), encoding="utf-8") as f:
+                parts.append(f.read())
+    return parts
+
+
+def merge_expositions(texts: list[str]) -> str:
+    """Join several text expositions, keeping one HELP/TYPE block per metric.
+
+    Processes export the same metric names (told apart by their ``job``
+    label), and a scrape must not repeat a metric family.
+    """
+    headers: dict[str, list[str]] = {}
+    samples: dict[str, list[str]] = {}
+    for text in texts:
+        family = None
+        for line in text.splitlines():
+            if line.startswith("# HELP ") or line.startswith("# TYPE "):
+                family = line.split(" ", 3)[2]
+                block = headers.setdefault(family, [])
+                if len(block) < 2 and line not in block:
+                    block.append(line)
+                samples.setdefault(family, [])
+            elif line and not line.startswith("#") and family is not None:
+                samples[family].append(line)
+    return "".join("\n".join(headers[f] + samples[f]) + "\n" for f in headers)
+
+
+async def push(job: str, registry: Registry = REGISTRY, url: str = METRICS_PUSHGATEWAY_URL):
+    """Replace this job's metrics on a Prometheus Pushgateway."""
+    async with httpx.AsyncClient(timeout=5.0) as client:
+        # The Pushgateway adds the job label itself
+        response = await client.put(
+            f"{url.rstrip('/')}/metrics/job/{job}", content=registry.render(), headers={"Content-Type": CONTENT_TYPE}
+        )
+        response.raise_for_status()
+
+
+async def export_metrics(job: str):
+    """Publish a batch process's metrics: textfile always, Pushgateway when configured."""
+    try:
+        write_textfile(job)
+        if METRICS_PUSHGATEWAY_URL:
+            await push(job)
+    except Exception as e:
+        logger.warning(f"Failed to export metrics for {job}: {e}")
+
+
+@asynccontextmanager
+async def exporting_metrics(job: str, interval: float = METRICS_EXPORT_INTERVAL):
+    """Export ``job``'s metrics every ``interval`` seconds while the block runs,
+    so gauges such as in-flight requests are seen live, and once more when
+    it exits, whether or not it raised."""
+    async def export_periodically():
+        while True:
+            await asyncio.sleep(interval)
+            await export_metrics(job)
+
+    exporter = asyncio.create_task(export_periodically())
+    try:
+        yield
+    finally:
+        exporter.cancel()
+        await export_metrics(job)
@@ -0,0 +1,28 @@
+# app/core/pagination.py
+import base64
+import json
+from bson import ObjectId
+
+
+def encode_cursor(sort_by: str, value, object_id: ObjectId) -> str:
+    """Opaque cursor pointing just past (value, _id) in a descending sort."""
+    payload = json.dumps({"s": sort_by, "v": value, "id": str(object_id)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> dict:
+    """Inverse of encode_cursor; raises ValueError for anything malformed."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return {"sort_by": payload["s"], "value": payload["v"], "id": ObjectId(payload["id"])}
+    except Exception as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def keyset_filter(field: str, value, object_id: ObjectId) -> dict:
+    """Documents after (value, _id) when sorting by field and _id, both descending."""
+    return {"$or": [
+        {field: {"$lt": value}},
+        {field: value, "_id": {"$lt": object_id}},
+    ]}
@@ -0,0 +1,27 @@
+# app/core/search.py
+import re
+from utils.text import tokenize
+
+SEARCH_MODES = ("text", "prefix")
+
+
+def build_search(q: str, mode: str = "text") -> tuple[dict | None, dict, list]:
+    """(filter, extra projection, sort) for GET /books/search; filter is None when q has no words.
+
+    ``text`` uses the books_text index (title weighted 10x description) and
+    ranks by MongoDB's textScore. ``prefix`` matches whole title words plus
+    the last one as a prefix ("harry pot") on the multikey title_tokens
+    index, for typeahead.
+    """
+    if mode == "prefix":
+        tokens = tokenize(q)
+        if not tokens:
+            return None, {}, []
+        clauses = [{"title_tokens": token} for token in tokens[:-1]]
+        clauses.append({"title_tokens": {"$regex": f"^{re.escape(tokens[-1])}"}})
+        query = clauses[0] if len(clauses) == 1 else {"$and": clauses}
+        return query, {}, [("rating", -1), ("_id", -1)]
+    if not tokenize(q):
+        return None, {}, []
+    score = {"$meta": "textScore"}
+    return {"$text": {"$search": q}}, {"score": score}, [("score", score), ("_id", -1)]
@@ -1,11 +1,13 @@
 # app/models/book.py
 from pydantic import BaseModel, Field, field_validator
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 
 class Book(BaseModel):
     url: str
     title: str
+    # Lowercased title words, for prefix search (see utils.text.tokenize)
+    title_tokens: List[str] = []
     description: Optional[str] = None
     category: str
     price_excl_tax: float
@@ -43,4 +45,9 @@ class BookResponse(BaseModel):
     num_reviews: int
     image_url: str
     rating: int
-    crawled_at: datetime
\ No newline at end of file
+    crawled_at: datetime
+
+
+class SearchResult(BookResponse):
+    # MongoDB textScore in text mode; None in prefix mode
+    score: Optional[float] = None
\ No newline at end of file
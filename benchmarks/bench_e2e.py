@@ -0,0 +1,219 @@
+# benchmarks/bench_e2e.py
+"""End-to-end throughput: full crawl, change detection and API against the synthetic catalog.
+
+Each catalog size runs in a fresh subprocess (so peak RSS is per size) with
+its own database, crawl journal and reports directory:
+
+    python -m benchmarks.bench_e2e --books 1000,10000,100000 --mongo-url mongodb://localhost:27017
+    python -m benchmarks.bench_e2e --books 1000 --in-memory          # needs mongomock-motor
+    python -m benchmarks.bench_e2e --books 1000 --base-url http://127.0.0.1:8081  # catalog_server over HTTP
+
+Reports books/sec per scenario, p50/p99 per pipeline stage (and per API
+request) and the process's peak RSS after each scenario.
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+RESULT_PREFIX = "RESULT "
+
+
+class RewriteTransport(httpx.AsyncBaseTransport):
+    """Send requests for books.toscrape.com to a catalog_server running elsewhere."""
+
+    def __init__(self, base_url: str):
+        self.target = httpx.URL(base_url)
+        self.transport = httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        request.url = request.url.copy_with(scheme=self.target.scheme, host=self.target.host, port=self.target.port)
+        return await self.transport.handle_async_request(request)
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def percentiles(samples: list[float]) -> dict:
+    ordered = sorted(samples)
+    if not ordered:
+        return {"p50_ms": None, "p99_ms": None}
+    return {
+        f"p{int(q * 100)}_ms": round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 2)
+        for q in (0.5, 0.99)
+    }
+
+
+def stage_latencies(stats: dict) -> dict:
+    return {name: {"p50_ms": s["p50_ms"], "p99_ms": s["p99_ms"]} for name, s in stats.items()}
+
+
+async def use_database(args):
+    """Point crawler.storage at the benchmark database; returns a Motor-compatible client."""
+    import crawler.storage as storage
+    if args.in_memory:
+        try:
+            from mongomock_motor import AsyncMongoMockClient
+        except ImportError:
+            sys.exit("--in-memory needs the mongomock-motor package (pip install mongomock-motor)")
+        client = AsyncMongoMockClient()
+        storage.AsyncIOMotorClient = lambda *a, **kw: client  # every connect() shares the same store
+        return client
+    from motor.motor_asyncio import AsyncIOMotorClient
+    client = AsyncIOMotorClient(args.mongo_url)
+    await client.drop_database(os.environ["MONGODB_DB_NAME"])
+    return client
+
+
+async def bench_api(client) -> dict:
+    from app.api.main import app
+    from app.core.rate_limiter import limiter
+
+    limiter.enabled = False
+    app.state.mongo_client = client
+    headers = {"X-API-Key": os.environ["API_KEY"]}
+    latencies = []
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://api") as api:
+        start = time.perf_counter()
+        seen, cursor = 0, None
+        while True:
+            params = {"size": 100, "sort_by": "price", **({"cursor": cursor} if cursor else {})}
+            t = time.perf_counter()
+            response = await api.get("/books", params=params, headers=headers)
+            latencies.append(time.perf_counter() - t)
+            response.raise_for_status()
+            seen += len(response.json())
+            cursor = response.headers.get("X-Next-Cursor")
+            if not cursor:
+                break
+        paged = time.perf_counter() - start
+
+        start = time.perf_counter()
+        exported = 0
+        async with api.stream("GET", "/books/export", headers=headers) as response:
+            async for _ in response.aiter_lines():
+                exported += 1
+        export_time = time.perf_counter() - start
+    return {
+        "api_paged_books": seen,
+        "api_paged_books_per_sec": round(seen / paged, 1),
+        "api_request": percentiles(latencies),
+        "api_export_books_per_sec": round(exported / export_time, 1),
+    }
+
+
+async def run_one(args) -> dict:
+    from benchmarks.catalog_server import CatalogServer, SyntheticCatalog
+    from crawler import main as crawler_main
+    from crawler.stats import run_stats
+    from scheduler.tasks import run_full_crawl_and_detect_changes
+
+    client = await use_database(args)
+    categories = max(1, args.size // args.books_per_category)
+    catalog = SyntheticCatalog(categories, args.books_per_category, seed=args.seed)
+    server = CatalogServer(catalog, args.latency, args.jitter, args.error_rate, seed=args.seed)
+
+    def transport():
+        return RewriteTransport(args.base_url) if args.base_url else httpx.ASGITransport(app=server)
+
+    result = {"books": len(catalog.books), "categories": categories}
+
+    start = time.perf_counter()
+    stats = await crawler_main.main(transport())
+    elapsed = time.perf_counter() - start
+    result["crawl"] = {
+        "seconds": round(elapsed, 2),
+        "books_per_sec": round(run_stats["books_written"] / elapsed, 1),
+        "stages": stage_latencies(stats),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+    changed = catalog.mutate(args.mutate) if not args.base_url else 0
+    requests_before = server.requests
+    start = time.perf_counter()
+    stats = await run_full_crawl_and_detect_changes(transport())
+    elapsed = time.perf_counter() - start
+    result["detect"] = {
+        "seconds": round(elapsed, 2),
+        "books_per_sec": round(len(catalog.books) / elapsed, 1),
+        "mutated": changed,
+        "updated": run_stats["books_updated"],
+        "requests": server.requests - requests_before if not args.base_url else None,
+        "stages": stage_latencies(stats),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+    result["api"] = {**await bench_api(client), "peak_rss_mb": peak_rss_mb()}
+    return result
+
+
+def run_sizes(args):
+    rows = []
+    for size in args.books:
+        workdir = tempfile.mkdtemp(prefix=f"bench_e2e_{size}_")
+        env = {
+            **os.environ,
+            "MONGODB_URL": args.mongo_url,
+            "MONGODB_DB_NAME": f"bench_e2e_{size}",
+            "CRAWL_JOURNAL_PATH": os.path.join(workdir, "journal.sqlite3"),
+            "REPORTS_DIR": os.path.join(workdir, "reports"),
+            "API_KEY": os.environ.get("API_KEY", "bench"),
+        }
+        command = [sys.executable, "-m", "benchmarks.bench_e2e", "--run-one", str(size), *sys.argv[1:]]
+        print(f"▶ {size} books ...", flush=True)
+        proc = subprocess.run(command, env=env, capture_output=True, text=True)
+        lines = [line for line in proc.stdout.splitlines() if line.startswith(RESULT_PREFIX)]
+        if proc.returncode != 0 or not lines:
+            print(proc.stdout[-2000:], proc.stderr[-2000:], sep="\n")
+            sys.exit(f"benchmark for {size} books failed")
+        rows.append(json.loads(lines[-1][len(RESULT_PREFIX):]))
+
+    print(f"\n{'books':>7} {'scenario':>8} {'books/s':>9} {'secs':>7} {'rss MB':>7}  per-stage p50/p99 ms")
+    for row in rows:
+        for scenario in ("crawl", "detect"):
+            r = row[scenario]
+            stages = " ".join(f"{n}={s['p50_ms']}/{s['p99_ms']}" for n, s in r["stages"].items())
+            print(f"{row['books']:>7} {scenario:>8} {r['books_per_sec']:>9} {r['seconds']:>7} {r['peak_rss_mb']:>7}  {stages}")
+        api = row["api"]
+        print(f"{row['books']:>7} {'api':>8} {api['api_paged_books_per_sec']:>9} {'':>7} {api['peak_rss_mb']:>7}  "
+              f"GET /books={api['api_request']['p50_ms']}/{api['api_request']['p99_ms']} "
+              f"export={api['api_export_books_per_sec']} books/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--books", type=lambda v: [int(n) for n in v.split(",")], default=[1000, 10000, 100000])
+    parser.add_argument("--books-per-category", type=int, default=20)
+    parser.add_argument("--mongo-url", default=os.getenv("MONGODB_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--in-memory", action="store_true", help="use mongomock-motor instead of a mongod")
+    parser.add_argument("--base-url", help="crawl a catalog_server over HTTP instead of in-process")
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--mutate", type=float, default=0.05, help="share of books changed before detection")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--run-one", dest="size", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.size is None:
+        run_sizes(args)
+    else:
+        result = asyncio.run(run_one(args))
+        print(RESULT_PREFIX + json.dumps(result), flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+# benchmarks/bench_parse_executor.py
+"""Pages/sec for inline parsing vs the parsing pool at high concurrency.
+
+Fetches are simulated with a fixed sleep so that the event loop, not the
+network, is the bottleneck:
+
+    python -m benchmarks.bench_parse_executor --pages 2000 --concurrency 100
+"""
+import argparse
+import asyncio
+import os
+import time
+from pathlib import Path
+from crawler.config import CRAWL_CONCURRENCY
+from crawler.executor import configure_parse_executor, get_parse_executor, parse_book_page_async
+
+FIXTURE = Path(__file__).resolve().parent.parent / "tests" / "fixtures" / "book_page.html"
+
+
+async def crawl(html: str, pages: int, concurrency: int, latency: float) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        async with semaphore:
+            await asyncio.sleep(latency)  # stand-in for the HTTP round trip
+            await parse_book_page_async(f"https://books.toscrape.com/catalogue/book_{i}/index.html", html)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[one(i) for i in range(pages)])
+    return pages / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=max(CRAWL_CONCURRENCY, 100))
+    parser.add_argument("--latency", type=float, default=0.005, help="simulated fetch time in seconds")
+    parser.add_argument("--kind", default="auto", choices=["auto", "process", "thread"])
+    args = parser.parse_args()
+
+    html = FIXTURE.read_text(encoding="utf-8")
+    cores = os.cpu_count() or 1
+    worker_counts = sorted({0, 1, 2, 4, cores} & set(range(cores + 1)))
+
+    print(f"{args.pages} pages, concurrency={args.concurrency}, latency={args.latency * 1000:.0f}ms, {cores} cores")
+    print(f"{'workers':>8} {'pages/sec':>10} {'speedup':>8}")
+    baseline = None
+    for workers in worker_counts:
+        configure_parse_executor(workers, args.kind)
+        if get_parse_executor() is not None:
+            asyncio.run(crawl(html, cores * 4, cores, 0))  # warm up the pool
+        rate = asyncio.run(crawl(html, args.pages, args.concurrency, args.latency))
+        baseline = baseline or rate
+        print(f"{workers:>8} {rate:>10.0f} {rate / baseline:>7.2f}x")
+    configure_parse_executor(0)
+
+
+if __name__ == "__main__":
+    main()
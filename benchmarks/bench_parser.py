@@ -0,0 +1,71 @@
+# benchmarks/bench_parser.py
+"""Pages/sec and allocations per page for the fast and legacy book parsers.
+
+Runs every saved page in tests/fixtures. The fast parser's per-page peak
+includes lexbor's document arena (about 1 MiB, released after each parse):
+
+    python -m benchmarks.bench_parser --rounds 500
+"""
+import argparse
+import time
+import tracemalloc
+from functools import partial
+from pathlib import Path
+from crawler.parser import parse_book_page, parse_book_page_legacy
+
+FIXTURES = Path(__file__).resolve().parent.parent / "tests" / "fixtures"
+URL = "https://books.toscrape.com/catalogue/book_1/index.html"
+
+PARSERS = {
+    "fast": partial(parse_book_page, strict=False),
+    "fast (strict)": partial(parse_book_page, strict=True),
+    "legacy": parse_book_page_legacy,
+}
+
+
+def pages_per_sec(parse, pages: list[str], rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for html in pages:
+            parse(URL, html)
+    return rounds * len(pages) / (time.perf_counter() - start)
+
+
+def allocations(parse, pages: list[str], rounds: int) -> tuple[float, float]:
+    """(mean, max) KiB of Python-heap peak per parse, as traced by tracemalloc.
+
+    Memory held by the HTML parser's C library is not traced.
+    """
+    peaks = []
+    tracemalloc.start()
+    try:
+        for _ in range(rounds):
+            for html in pages:
+                baseline = tracemalloc.get_traced_memory()[0]
+                tracemalloc.reset_peak()
+                parse(URL, html)
+                peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+    finally:
+        tracemalloc.stop()
+    return sum(peaks) / len(peaks) / 1024, max(peaks) / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=500, help="passes over the fixture pages")
+    args = parser.parse_args()
+
+    pages = [path.read_text(encoding="utf-8") for path in sorted(FIXTURES.glob("*.html"))]
+    print(f"{len(pages)} fixture pages x {args.rounds} rounds")
+    print(f"{'parser':>14} {'pages/sec':>10} {'speedup':>8} {'KiB/page':>9} {'max KiB':>8}")
+    for parse in PARSERS.values():
+        parse(URL, pages[0])  # warm up (imports, selector caches)
+    baseline = pages_per_sec(PARSERS["legacy"], pages, args.rounds)
+    for name, parse in PARSERS.items():
+        rate = baseline if name == "legacy" else pages_per_sec(parse, pages, args.rounds)
+        mean_kib, max_kib = allocations(parse, pages, max(1, args.rounds // 10))
+        print(f"{name:>14} {rate:>10.0f} {rate / baseline:>7.2f}x {mean_kib:>9.1f} {max_kib:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+# benchmarks/bench_search.py
+"""GET /books/search latency on a synthetic catalog.
+
+Loads N synthetic books into a scratch database (indexes from
+Database.connect), then times text and prefix queries through the API
+with the response cache off:
+
+    python -m benchmarks.bench_search --books 100000 --mongo-url mongodb://localhost:27017
+
+Prints p50/p99 per mode; the target is p99 under 10 ms at 100k books.
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+from datetime import datetime
+
+import httpx
+
+from benchmarks.bench_e2e import percentiles
+from benchmarks.catalog_server import WORDS, SyntheticCatalog
+
+
+def book_documents(catalog: SyntheticCatalog, seed: int = 0):
+    from utils.text import tokenize
+    rng = random.Random(seed)
+    for book in catalog.books:
+        yield {
+            "url": f"https://books.toscrape.com/catalogue/{book['slug']}/index.html",
+            "title": book["title"],
+            "title_tokens": tokenize(book["title"]),
+            "description": f"{book['title']} is a synthetic book about {' and '.join(rng.sample(WORDS, 3))}.",
+            "category": book["category"]["name"],
+            "price_excl_tax": book["price"],
+            "price_incl_tax": book["price"],
+            "availability_count": book["stock"],
+            "num_reviews": 0,
+            "image_url": "",
+            "rating": book["rating"],
+            "crawled_at": datetime.utcnow(),
+        }
+
+
+async def load_catalog(args):
+    from crawler.storage import db
+    await db.connect()  # creates the search indexes
+    await db.books.delete_many({})
+    batch = []
+    for doc in book_documents(SyntheticCatalog(max(1, args.books // 20), 20, seed=args.seed), args.seed):
+        batch.append(doc)
+        if len(batch) == 5000:
+            await db.books.insert_many(batch, ordered=False)
+            batch = []
+    if batch:
+        await db.books.insert_many(batch, ordered=False)
+    await db.close()
+
+
+async def run(args):
+    from app.api.main import app
+    from app.core.cache import response_cache
+    from app.core.database import create_mongo_client
+    from app.core.rate_limiter import limiter
+
+    limiter.enabled = False
+    response_cache.enabled = False
+    app.state.mongo_client = create_mongo_client()
+    headers = {"X-API-Key": os.environ["API_KEY"]}
+    rng = random.Random(args.seed)
+    queries = {
+        "text": lambda: {"q": " ".join(rng.sample(WORDS, 2))},
+        "text+filter": lambda: {"q": rng.choice(WORDS), "rating": rng.randint(1, 5)},
+        "prefix": lambda: {"q": rng.choice(WORDS)[:rng.randint(2, 4)], "mode": "prefix"},
+        "prefix 2 words": lambda: {"q": f"{rng.choice(WORDS)} {rng.choice(WORDS)[:3]}", "mode": "prefix"},
+    }
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://api") as api:
+        for name, make_params in queries.items():
+            latencies = []
+            for i in range(args.warmup + args.queries):
+                start = time.perf_counter()
+                response = await api.get("/books/search", params={**make_params(), "size": 20}, headers=headers)
+                if i >= args.warmup:
+                    latencies.append(time.perf_counter() - start)
+                response.raise_for_status()
+            p = percentiles(latencies)
+            print(f"{name:>15}: p50={p['p50_ms']} ms  p99={p['p99_ms']} ms  ({args.queries} queries)")
+    app.state.mongo_client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--books", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--mongo-url", default=os.getenv("MONGODB_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--skip-load", action="store_true", help="reuse the books already in the scratch database")
+    args = parser.parse_args()
+
+    # Config modules read these at import time; never the real books_db, it is emptied
+    os.environ["MONGODB_URL"] = args.mongo_url
+    os.environ["MONGODB_DB_NAME"] = f"bench_search_{args.books}"
+    os.environ.setdefault("API_KEY", "bench")
+    if not args.skip_load:
+        print(f"▶ loading {args.books} books ...", flush=True)
+        asyncio.run(load_catalog(args))
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
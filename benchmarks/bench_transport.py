@@ -0,0 +1,126 @@
+# benchmarks/bench_transport.py
+"""Crawler HTTP transport throughput: bare client vs crawler.transport, HTTP/1.1 vs HTTP/2.
+
+Starts catalog_server stand-ins in subprocesses (uvicorn for HTTP/1.1,
+hypercorn for cleartext HTTP/2) and fetches the same book pages through
+each client at a fixed concurrency:
+
+    python -m benchmarks.bench_transport --pages 2000 --concurrency 10 --latency 0.02
+
+The HTTP/2 scenario needs the h2 and hypercorn packages
+(pip install "httpx[http2]" hypercorn) and is skipped without them.
+"""
+import argparse
+import asyncio
+import subprocess
+import sys
+import time
+
+import httpx
+
+from benchmarks.bench_e2e import percentiles
+from benchmarks.catalog_server import SyntheticCatalog
+
+
+def book_paths(pages: int, books_per_category: int, seed: int) -> list[str]:
+    catalog = SyntheticCatalog(max(1, -(-pages // books_per_category)), books_per_category, seed)
+    return [f"catalogue/{book['slug']}/index.html" for book in catalog.books[:pages]]
+
+
+def start_server(args, server: str, port: int) -> subprocess.Popen:
+    command = [
+        sys.executable, "-m", "benchmarks.catalog_server", "--server", server, "--port", str(port),
+        "--categories", str(max(1, -(-args.pages // args.books_per_category))),
+        "--books-per-category", str(args.books_per_category), "--latency", str(args.latency),
+        "--seed", str(args.seed),
+    ]
+    return subprocess.Popen(command)
+
+
+async def wait_until_up(base_url: str, timeout: float = 15.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while True:
+            try:
+                await client.get("index.html")
+                return
+            except httpx.TransportError:
+                if time.monotonic() > deadline:
+                    raise
+                await asyncio.sleep(0.1)
+
+
+async def fetch_all(client: httpx.AsyncClient, paths: list[str], concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    versions = set()
+
+    async def fetch(path):
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.get(path)
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+            versions.add(response.http_version)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(fetch(path) for path in paths))
+    elapsed = time.perf_counter() - start
+    return {"requests_per_sec": round(len(paths) / elapsed, 1), **percentiles(latencies),
+            "http_version": ",".join(sorted(versions))}
+
+
+async def run(args):
+    from crawler.transport import build_client, h2
+
+    paths = book_paths(args.pages, args.books_per_category, args.seed)
+    http1_url = f"http://127.0.0.1:{args.port}/"
+    http2_url = f"http://127.0.0.1:{args.port + 1}/"
+    scenarios = [
+        ("bare AsyncClient (before)", http1_url, lambda: httpx.AsyncClient(base_url=http1_url, timeout=10.0)),
+        ("build_client HTTP/1.1", http1_url, lambda: build_client(base_url=http1_url, http2=False)),
+    ]
+    try:
+        import hypercorn  # noqa: F401
+        have_hypercorn = True
+    except ImportError:
+        have_hypercorn = False
+    if h2 is not None and have_hypercorn:
+        # Cleartext HTTP/2 with prior knowledge; against a TLS origin ALPN picks h2 instead
+        scenarios.append(("build_client HTTP/2", http2_url,
+                          lambda: build_client(base_url=http2_url, http2=True, http1=False)))
+    else:
+        print("ℹ️  HTTP/2 scenario skipped: needs the h2 and hypercorn packages")
+
+    servers = [start_server(args, "uvicorn", args.port)]
+    if len(scenarios) == 3:
+        servers.append(start_server(args, "hypercorn", args.port + 1))
+    try:
+        for base_url in {base_url for _, base_url, _ in scenarios}:
+            await wait_until_up(base_url)
+        print(f"\n{'client':>26} {'req/s':>8} {'p50 ms':>7} {'p99 ms':>7}  protocol")
+        for name, _, make_client in scenarios:
+            async with make_client() as client:
+                await fetch_all(client, paths[:args.concurrency], args.concurrency)  # warm the pool
+                result = await fetch_all(client, paths, args.concurrency)
+            print(f"{name:>26} {result['requests_per_sec']:>8} {result['p50_ms']:>7} {result['p99_ms']:>7}  "
+                  f"{result['http_version']}")
+    finally:
+        for server in servers:
+            server.terminate()
+            server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.0, help="server-side delay per response, seconds")
+    parser.add_argument("--books-per-category", type=int, default=20)
+    parser.add_argument("--port", type=int, default=8091, help="HTTP/1.1 server port; HTTP/2 uses port + 1")
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
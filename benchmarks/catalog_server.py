@@ -0,0 +1,245 @@
+# benchmarks/catalog_server.py
+"""Synthetic books.toscrape.com stand-in: N categories x M books in the real site's HTML shape.
+
+Serves the homepage, category and global listings (with the "Page X of N"
+pager), and book detail pages, with ETags, optional latency and injected
+503s. ``SyntheticCatalog.mutate`` reprices, restocks and rerates a share
+of the books between runs. Use it in-process through
+``httpx.ASGITransport(app=CatalogServer(...))`` or stand-alone:
+
+    python -m benchmarks.catalog_server --categories 50 --books-per-category 20 --port 8081
+    python -m benchmarks.catalog_server --server hypercorn --port 8082   # HTTP/1.1 + h2c, needs hypercorn
+"""
+import argparse
+import asyncio
+import hashlib
+import html
+import random
+import re
+
+RATING_WORDS = ["One", "Two", "Three", "Four", "Five"]
+WORDS = [
+    "light", "attic", "velvet", "soumission", "sharp", "objects", "sapiens", "requiem", "dark",
+    "secret", "garden", "midnight", "river", "stone", "glass", "winter", "orchard", "harbor",
+    "letters", "shadow", "history", "little", "golden", "silent", "empire", "voyage", "storm",
+]
+PAGE_SIZE = 20
+
+
+def _slug(text: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-")
+
+
+def _page_number(name: str) -> int:
+    """1 for index.html, N for page-N.html (ValueError otherwise)."""
+    if name == "index.html":
+        return 1
+    if not (name.startswith("page-") and name.endswith(".html")):
+        raise ValueError(name)
+    return int(name[len("page-"):-len(".html")])
+
+
+class SyntheticCatalog:
+    """Deterministic catalog data; ``seed`` fixes every title, price, stock and rating."""
+
+    def __init__(self, categories: int = 50, books_per_category: int = 20, seed: int = 0):
+        self.rng = random.Random(seed)
+        self.categories = []
+        self.books = []
+        for c in range(categories):
+            name = f"{WORDS[c % len(WORDS)].title()} {c + 1}"
+            category = {"id": c + 2, "name": name, "slug": f"{_slug(name)}_{c + 2}", "books": []}
+            self.categories.append(category)
+            for _ in range(books_per_category):
+                book_id = len(self.books) + 1
+                title = " ".join(self.rng.choice(WORDS) for _ in range(3)).title() + f" {book_id}"
+                book = {
+                    "id": book_id,
+                    "slug": f"{_slug(title)}_{book_id}",
+                    "title": title,
+                    "category": category,
+                    "price": round(self.rng.uniform(10, 60), 2),
+                    "stock": self.rng.randint(0, 22),
+                    "rating": self.rng.randint(1, 5),
+                    "reviews": 0,
+                    "upc": hashlib.md5(f"{seed}:{book_id}".encode()).hexdigest()[:16],
+                }
+                self.books.append(book)
+                category["books"].append(book)
+        self.by_slug = {book["slug"]: book for book in self.books}
+        self.category_by_slug = {category["slug"]: category for category in self.categories}
+
+    def mutate(self, fraction: float = 0.05) -> int:
+        """Change price, stock or rating of ``fraction`` of the books; returns how many changed."""
+        changed = self.rng.sample(self.books, int(len(self.books) * fraction))
+        for book in changed:
+            field = self.rng.choice(["price", "stock", "rating"])
+            if field == "price":
+                book["price"] = round(book["price"] * self.rng.uniform(0.8, 1.2), 2)
+            elif field == "stock":
+                book["stock"] = 0 if book["stock"] else self.rng.randint(1, 22)
+            else:
+                book["rating"] = book["rating"] % 5 + 1
+        return len(changed)
+
+    # === HTML ===
+
+    def homepage(self) -> str:
+        links = "".join(
+            f'<li><a href="catalogue/category/books/{c["slug"]}/index.html">{html.escape(c["name"])}</a></li>'
+            for c in self.categories
+        )
+        return (
+            '<html><body><div class="side_categories"><ul class="nav nav-list"><li>'
+            '<a href="catalogue/category/books_1/index.html">Books</a>'
+            f"<ul>{links}</ul></li></ul></div></body></html>"
+        )
+
+    def listing(self, books: list[dict], page: int, href_prefix: str) -> str | None:
+        pages = max(1, -(-len(books) // PAGE_SIZE))
+        if page > pages:
+            return None
+        pods = "".join(
+            '<li class="col-xs-6 col-sm-4 col-md-3 col-lg-3"><article class="product_pod">'
+            f'<p class="star-rating {RATING_WORDS[b["rating"] - 1]}"></p>'
+            f'<h3><a href="{href_prefix}{b["slug"]}/index.html" title="{html.escape(b["title"])}">'
+            f'{html.escape(b["title"][:20])}...</a></h3>'
+            f'<div class="product_price"><p class="price_color">£{b["price"]:.2f}</p>'
+            f'<p class="{"instock" if b["stock"] else "outofstock"} availability">'
+            f'{"In stock" if b["stock"] else "Out of stock"}</p></div></article></li>'
+            for b in books[(page - 1) * PAGE_SIZE:page * PAGE_SIZE]
+        )
+        pager = f'<ul class="pager"><li class="current">Page {page} of {pages}</li></ul>' if pages > 1 else ""
+        return f'<html><body><section><ol class="row">{pods}</ol><div>{pager}</div></section></body></html>'
+
+    def book_page(self, book: dict) -> str:
+        category = book["category"]
+        availability = f"In stock ({book['stock']} available)" if book["stock"] else "Out of stock"
+        title = html.escape(book["title"])
+        rows = [
+            ("UPC", book["upc"]), ("Product Type", "Books"),
+            ("Price (excl. tax)", f"£{book['price']:.2f}"), ("Price (incl. tax)", f"£{book['price']:.2f}"),
+            ("Tax", "£0.00"), ("Availability", availability), ("Number of reviews", book["reviews"]),
+        ]
+        table = "".join(f"<tr><th>{th}</th><td>{td}</td></tr>" for th, td in rows)
+        return (
+            "<!DOCTYPE html><html><head><title>" + title + " | Books to Scrape - Sandbox</title></head><body>"
+            '<div class="container-fluid page"><div class="page_inner"><ul class="breadcrumb">'
+            '<li><a href="../../index.html">Home</a></li>'
+            '<li><a href="../category/books_1/index.html">Books</a></li>'
+            f'<li><a href="../category/books/{category["slug"]}/index.html">{html.escape(category["name"])}</a></li>'
+            f'<li class="active">{title}</li></ul>'
+            '<article class="product_page"><div class="row">'
+            '<div class="col-sm-6"><div id="product_gallery" class="carousel"><div class="thumbnail">'
+            f'<div class="carousel-inner"><div class="item active"><img src="../../media/cache/{book["upc"]}.jpg" '
+            f'alt="{title}" /></div></div></div></div></div>'
+            f'<div class="col-sm-6 product_main"><h1>{title}</h1><p class="price_color">£{book["price"]:.2f}</p>'
+            f'<p class="{"instock" if book["stock"] else "outofstock"} availability">{availability}</p>'
+            f'<p class="star-rating {RATING_WORDS[book["rating"] - 1]}"></p></div></div>'
+            '<div id="product_description" class="sub-header"><h2>Product Description</h2></div>'
+            f"<p>{title} is a synthetic book generated for benchmarks.</p>"
+            '<div class="sub-header"><h2>Product Information</h2></div>'
+            f'<table class="table table-striped">{table}</table></article></div></div></body></html>'
+        )
+
+    def render(self, path: str) -> str | None:
+        """HTML for a site path, or None for a 404."""
+        path = path.lstrip("/")
+        if path in ("", "index.html"):
+            return self.homepage()
+        parts = path.split("/")
+        try:
+            if parts[:3] == ["catalogue", "category", "books"] and len(parts) == 5:
+                category = self.category_by_slug.get(parts[3])
+                return self.listing(category["books"], _page_number(parts[4]), "../../../") if category else None
+            if parts[0] == "catalogue" and len(parts) == 2 and parts[1].startswith("page-"):
+                return self.listing(self.books, _page_number(parts[1]), "")
+            if parts[0] == "catalogue" and len(parts) == 3 and parts[2] == "index.html":
+                book = self.by_slug.get(parts[1])
+                return self.book_page(book) if book else None
+        except ValueError:
+            return None
+        return None
+
+
+class CatalogServer:
+    """ASGI app serving a SyntheticCatalog.
+
+    ``latency`` (+ uniform ``jitter``) is added to every response and
+    ``error_rate`` of the requests are answered with a 503.
+    """
+
+    def __init__(self, catalog: SyntheticCatalog, latency: float = 0.0, jitter: float = 0.0,
+                 error_rate: float = 0.0, seed: int = 0):
+        self.catalog = catalog
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.requests = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await receive()  # startup
+            await send({"type": "lifespan.startup.complete"})
+            await receive()  # shutdown
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+        self.requests += 1
+        delay = self.latency + (self.rng.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay:
+            await asyncio.sleep(delay)
+
+        headers = {key.decode("latin-1").lower(): value.decode("latin-1") for key, value in scope["headers"]}
+        if self.error_rate and self.rng.random() < self.error_rate:
+            status, body, extra = 503, b"Service Unavailable", []
+        else:
+            page = self.catalog.render(scope["path"])
+            if page is None:
+                status, body, extra = 404, b"Not Found", []
+            else:
+                body = page.encode("utf-8")
+                etag = '"' + hashlib.md5(body).hexdigest() + '"'
+                extra = [(b"etag", etag.encode("ascii"))]
+                status = 304 if headers.get("if-none-match") == etag else 200
+                if status == 304:
+                    body = b""
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", b"text/html; charset=utf-8"),
+                        (b"content-length", str(len(body)).encode("ascii")), *extra],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--categories", type=int, default=50)
+    parser.add_argument("--books-per-category", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random latency, up to this many seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with 503")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--server", choices=["uvicorn", "hypercorn"], default="uvicorn",
+                        help="uvicorn speaks HTTP/1.1 only; hypercorn also accepts cleartext HTTP/2 (h2c)")
+    args = parser.parse_args()
+
+    catalog = SyntheticCatalog(args.categories, args.books_per_category, args.seed)
+    app = CatalogServer(catalog, args.latency, args.jitter, args.error_rate, args.seed)
+    if args.server == "hypercorn":
+        from hypercorn.asyncio import serve
+        from hypercorn.config import Config
+        config = Config()
+        config.bind = [f"{args.host}:{args.port}"]
+        config.loglevel = "WARNING"
+        asyncio.run(serve(app, config))
+    else:
+        import uvicorn
+        uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+# crawler/archive.py
+"""Record and replay crawl traffic (WARC-style archives).
+
+With ``CRAWL_RECORD_DIR`` set, every response the crawler receives is
+appended to ``crawl-<started>-<n>.warc.gz`` segments in that directory.
+Each record is a WARC/1.1 ``response`` record compressed as its own gzip
+member, so a record can be read by seeking to its offset; ``index.cdxj``
+maps each URL to its segment, offset and length.
+
+``ReplayTransport`` serves a crawl from an archive instead of the network:
+
+    python -m crawler.main --replay archives/2025-09-01
+
+and the CLI re-parses every recorded book page offline:
+
+    python -m crawler.archive reparse archives/2025-09-01 --out books.ndjson --compare
+
+While recording, requests are sent without validators (and the scheduler
+skips listing snapshot mode), so a recorded run holds every page rather
+than only the changed ones. Records are compressed and written on a
+background thread, off the event loop.
+
+Bodies are stored decoded (``Content-Encoding`` is dropped from the
+recorded headers), backoff statuses (429/503) are not recorded, and the
+newest record of a URL wins on replay.
+"""
+import argparse
+import atexit
+import gzip
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+import httpx
+from crawler.config import CRAWL_RECORD_DIR, CRAWL_RECORD_SEGMENT_MB
+from crawler.concurrency import BACKOFF_STATUSES
+
+INDEX_NAME = "index.cdxj"
+# Headers that describe the transfer, not the (decoded) body we store
+_TRANSFER_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection", "keep-alive"}
+
+
+def _warc_date(at: datetime) -> str:
+    return at.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _http_block(status: int, reason: str, headers: list[tuple[str, str]], body: bytes) -> bytes:
+    lines = [f"HTTP/1.1 {status} {reason}"]
+    lines += [f"{name}: {value}" for name, value in headers if name.lower() not in _TRANSFER_HEADERS]
+    lines.append(f"Content-Length: {len(body)}")
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body
+
+
+def warc_record(url: str, status: int, reason: str, headers: list[tuple[str, str]], body: bytes,
+                at: datetime) -> bytes:
+    """One uncompressed WARC/1.1 response record."""
+    block = _http_block(status, reason, headers, body)
+    head = (
+        "WARC/1.1\r\n"
+        "WARC-Type: response\r\n"
+        f"WARC-Target-URI: {url}\r\n"
+        f"WARC-Date: {_warc_date(at)}\r\n"
+        "Content-Type: application/http; msgtype=response\r\n"
+        f"Content-Length: {len(block)}\r\n\r\n"
+    )
+    return head.encode("utf-8") + block + b"\r\n\r\n"
+
+
+def parse_warc_record(data: bytes) -> dict:
+    """Inverse of ``warc_record``: url, date, status, headers and body."""
+    warc_head, _, rest = data.partition(b"\r\n\r\n")
+    warc_headers = dict(line.split(": ", 1) for line in warc_head.decode("utf-8").split("\r\n")[1:])
+    block = rest[:int(warc_headers["Content-Length"])]
+    http_head, _, body = block.partition(b"\r\n\r\n")
+    status_line, *header_lines = http_head.decode("latin-1").split("\r\n")
+    return {
+        "url": warc_headers["WARC-Target-URI"],
+        "date": warc_headers["WARC-Date"],
+        "status": int(status_line.split(" ", 2)[1]),
+        "headers": [tuple(line.split(": ", 1)) for line in header_lines],
+        "body": body,
+    }
+
+
+class ArchiveWriter:
+    """Appends response records to rotating segments plus the CDXJ index.
+
+    ``write`` is synchronous and holds a lock for the whole record, so
+    records never interleave; ``submit_response`` queues one for a single
+    writer thread instead, keeping compression and disk I/O off the event
+    loop (``close`` waits for the queue to drain). Both files are flushed
+    after every record, which keeps an archive readable up to the last
+    response after a crash.
+    """
+
+    def __init__(self, directory: str, segment_bytes: int = CRAWL_RECORD_SEGMENT_MB * 1024 * 1024):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.prefix = f"crawl-{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')}-{os.getpid()}"
+        self.segments = 0
+        self.records = 0
+        self._segment = None
+        self._segment_name = None
+        self._index = None
+        self._lock = threading.Lock()
+        self._executor: ThreadPoolExecutor | None = None
+
+    def _open_segment(self):
+        if self._segment is not None:
+            self._segment.close()
+        self._segment_name = f"{self.prefix}-{self.segments:05d}.warc.gz"
+        self._segment = open(os.path.join(self.directory, self._segment_name), "ab")
+        self.segments += 1
+
+    def write(self, url: str, status: int, reason: str, headers: list[tuple[str, str]], body: bytes,
+              at: datetime | None = None):
+        at = at or datetime.now(timezone.utc)
+        with self._lock:
+            self._write(url, status, reason, headers, body, at)
+
+    def _write(self, url: str, status: int, reason: str, headers: list[tuple[str, str]], body: bytes,
+               at: datetime):
+        if self._index is None:
+            os.makedirs(self.directory, exist_ok=True)
+            self._index = open(os.path.join(self.directory, INDEX_NAME), "a", encoding="utf-8")
+        if self._segment is None or self._segment.tell() >= self.segment_bytes:
+            self._open_segment()
+        member = gzip.compress(warc_record(url, status, reason, headers, body, at), compresslevel=6)
+        offset = self._segment.tell()
+        self._segment.write(member)
+        self._segment.flush()
+        entry = {"filename": self._segment_name, "offset": offset, "length": len(member), "status": status}
+        self._index.write(f"{url} {at.strftime('%Y%m%d%H%M%S')} {json.dumps(entry)}\n")
+        self._index.flush()
+        self.records += 1
+
+    def _write_logged(self, *record):
+        try:
+            self.write(*record)
+        except Exception as e:
+            print(f"⚠️  Failed to archive {record[0]}: {e}")
+
+    def submit_response(self, response: httpx.Response):
+        """Queue a fetched response for the writer thread."""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="crawl-archive")
+        self._executor.submit(
+            self._write_logged, str(response.request.url), response.status_code, response.reason_phrase,
+            list(response.headers.multi_items()), response.content, datetime.now(timezone.utc)
+        )
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        for handle in (self._segment, self._index):
+            if handle is not None:
+                handle.close()
+        self._segment = self._index = None
+
+
+recorder = ArchiveWriter(CRAWL_RECORD_DIR) if CRAWL_RECORD_DIR else None
+if recorder is not None:
+    atexit.register(recorder.close)
+
+
+def recording() -> bool:
+    return recorder is not None
+
+
+def record_response(response: httpx.Response):
+    """Archive a fetched response when recording is on (see fetch_response)."""
+    if recorder is not None and response.status_code != 304 and response.status_code not in BACKOFF_STATUSES:
+        recorder.submit_response(response)
+
+
+class ArchiveReader:
+    """Random access to an archive directory through its index."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.index = {}
+        with open(os.path.join(directory, INDEX_NAME), encoding="utf-8") as index:
+            for line in index:
+                url, _, entry = line.rstrip("\n").split(" ", 2)
+                self.index[url] = json.loads(entry)  # newest record wins
+        self._files = {}
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __contains__(self, url: str) -> bool:
+        return url in self.index
+
+    def read(self, url: str) -> dict | None:
+        entry = self.index.get(url)
+        if entry is None:
+            return None
+        segment = self._files.get(entry["filename"])
+        if segment is None:
+            segment = self._files[entry["filename"]] = open(os.path.join(self.directory, entry["filename"]), "rb")
+        segment.seek(entry["offset"])
+        return parse_warc_record(gzip.decompress(segment.read(entry["length"])))
+
+    def __iter__(self):
+        """Every URL's newest record."""
+        for url in self.index:
+            yield self.read(url)
+
+    def close(self):
+        for segment in self._files.values():
+            segment.close()
+        self._files = {}
+
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    """Serve requests from an archive; URLs that were never recorded get a 404."""
+
+    def __init__(self, directory: str):
+        self.archive = ArchiveReader(directory)
+        self.misses = 0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        record = self.archive.read(str(request.url))
+        if record is None:
+            self.misses += 1
+            return httpx.Response(404, headers={"X-Replay-Miss": "1"}, request=request)
+        return httpx.Response(record["status"], headers=record["headers"], content=record["body"], request=request)
+
+    async def aclose(self):
+        self.archive.close()
+
+
+def is_book_page(html: str) -> bool:
+    return 'class="product_page"' in html
+
+
+def reparse(directory: str, out: str | None = None, compare: bool = False) -> dict:
+    """Run parse_book_page over every recorded book page; ``compare`` diffs it against the legacy parser."""
+    from crawler.parser import parse_book_page, parse_book_page_legacy
+
+    archive = ArchiveReader(directory)
+    stats = {"records": len(archive), "book_pages": 0, "failed": 0, "mismatched": 0}
+    output = open(out, "w", encoding="utf-8") if out else None
+    parse_seconds = 0.0
+    try:
+        for record in archive:
+            if record["status"] != 200:
+                continue
+            html = record["body"].decode("utf-8", errors="replace")
+            if not is_book_page(html):
+                continue
+            stats["book_pages"] += 1
+            start = time.perf_counter()
+            try:
+                book = parse_book_page(record["url"], html)
+            except Exception as e:
+                stats["failed"] += 1
+                print(f"❌ {record['url']}: {e}")
+                continue
+            finally:
+                parse_seconds += time.perf_counter() - start
+            if compare:
+                legacy = parse_book_page_legacy(record["url"], html)
+                diff = sorted(key for key in book.keys() | legacy.keys()
+                              if key != "crawled_at" and book.get(key) != legacy.get(key))
+                if diff:
+                    stats["mismatched"] += 1
+                    print(f"⚠️  {record['url']}: {', '.join(diff)} differ from the legacy parser")
+            if output is not None:
+                output.write(json.dumps(book, default=str) + "\n")
+    finally:
+        archive.close()
+        if output is not None:
+            output.close()
+    stats["parse_seconds"] = round(parse_seconds, 3)
+    stats["pages_per_sec"] = round(stats["book_pages"] / parse_seconds, 1) if parse_seconds else None
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Work with recorded crawl archives")
+    commands = parser.add_subparsers(dest="command", required=True)
+    reparse_cmd = commands.add_parser("reparse", help="parse every recorded book page again, offline")
+    reparse_cmd.add_argument("archive", help="archive directory (CRAWL_RECORD_DIR of the recorded run)")
+    reparse_cmd.add_argument("--out", help="write the parsed books here as NDJSON")
+    reparse_cmd.add_argument("--compare", action="store_true", help="report fields that differ from the legacy parser")
+    args = parser.parse_args()
+
+    stats = reparse(args.archive, args.out, args.compare)
+    print(f"📦 {stats['records']} records, {stats['book_pages']} book pages parsed in {stats['parse_seconds']}s "
+          f"({stats['pages_per_sec']} pages/sec), {stats['failed']} failed, {stats['mismatched']} mismatched")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+# crawler/concurrency.py
+import asyncio
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+from crawler.config import (
+    CRAWL_CONCURRENCY, CRAWL_MIN_CONCURRENCY, CRAWL_INITIAL_CONCURRENCY,
+    CRAWL_LATENCY_TARGET, CRAWL_DECREASE_FACTOR, CRAWL_MAX_RPS
+)
+from app.core.metrics import REGISTRY
+
+# Responses that mean "slow down"
+BACKOFF_STATUSES = {429, 503}
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Retry-After as seconds; accepts delta-seconds or an HTTP date."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class AdaptiveConcurrency:
+    """AIMD limit on in-flight requests to one origin.
+
+    Every fast success adds ``1 / limit`` (about +1 per round trip of the
+    whole window); a 429/503, a transport error or a response slower than
+    ``latency_target`` multiplies the limit by ``decrease_factor``, at most
+    once per observed round trip. ``Retry-After`` pauses new requests, and
+    ``max_rps`` optionally spaces request starts.
+    """
+
+    def __init__(self, max_limit: int = CRAWL_CONCURRENCY, min_limit: int = CRAWL_MIN_CONCURRENCY,
+                 initial: int = CRAWL_INITIAL_CONCURRENCY, latency_target: float = CRAWL_LATENCY_TARGET,
+                 decrease_factor: float = CRAWL_DECREASE_FACTOR, max_rps: float = CRAWL_MAX_RPS):
+        self.max_limit = max(1, max_limit)
+        self.min_limit = max(1, min(min_limit, self.max_limit))
+        self.limit = float(min(max(initial, self.min_limit), self.max_limit))
+        self.latency_target = latency_target
+        self.decrease_factor = decrease_factor
+        self.max_rps = max_rps
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self._last_latency = 0.0
+        self._last_decrease = float("-inf")
+        self._next_start = 0.0
+        self._loop = None
+        self._changed: asyncio.Condition | None = None
+
+    def _condition(self) -> asyncio.Condition:
+        # asyncio primitives bind to one loop; each asyncio.run() gets fresh state
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._changed = asyncio.Condition()
+            self.in_flight = 0
+        return self._changed
+
+    async def acquire(self):
+        changed = self._condition()
+        async with changed:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    try:
+                        await asyncio.wait_for(changed.wait(), self.paused_until - now)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                if self.in_flight < int(self.limit):
+                    break
+                await changed.wait()
+            self.in_flight += 1
+            if self.max_rps > 0:
+                start_at = max(now, self._next_start)
+                self._next_start = start_at + 1.0 / self.max_rps
+            else:
+                start_at = now
+        if start_at > now:
+            try:
+                await asyncio.sleep(start_at - now)
+            except BaseException:
+                # Cancelled while waiting for its start time: give the slot back
+                await self.release(None, feedback=False)
+                raise
+
+    async def release(self, latency: float | None, status: int | None = None,
+                      retry_after: float | None = None, feedback: bool = True):
+        """Return a slot and feed back the outcome; latency None means the request failed.
+
+        ``feedback=False`` only returns the slot, e.g. for a cancelled request.
+        """
+        changed = self._condition()
+        async with changed:
+            self.in_flight = max(0, self.in_flight - 1)
+            if feedback:
+                self.record(latency, status, retry_after)
+            changed.notify_all()
+
+    def record(self, latency: float | None, status: int | None = None, retry_after: float | None = None):
+        now = time.monotonic()
+        if retry_after:
+            self.paused_until = max(self.paused_until, now + retry_after)
+        congested = latency is None or status in BACKOFF_STATUSES or latency > self.latency_target
+        if latency is not None:
+            self._last_latency = latency
+        if congested:
+            # One decrease per round trip: a burst of slow responses is one signal
+            if now - self._last_decrease >= self._last_latency:
+                self.limit = max(float(self.min_limit), self.limit * self.decrease_factor)
+                self._last_decrease = now
+        else:
+            self.limit = min(float(self.max_limit), self.limit + 1.0 / self.limit)
+
+    def snapshot(self) -> dict:
+        return {"limit": int(self.limit), "in_flight": self.in_flight}
+
+
+_controllers: dict[str, AdaptiveConcurrency] = {}
+
+
+def controller_for(url: str) -> AdaptiveConcurrency:
+    """Shared controller for the URL's host, used by the crawler and the scheduler."""
+    host = urlsplit(url).netloc
+    if host not in _controllers:
+        _controllers[host] = AdaptiveConcurrency()
+    return _controllers[host]
+
+
+# Read at scrape/export time, so the controllers need no metrics code of their own
+REGISTRY.gauge(
+    "crawler_concurrency_limit", "Current AIMD concurrency limit per host", ("host",),
+    callback=lambda: {(host,): int(c.limit) for host, c in _controllers.items()}
+)
+REGISTRY.gauge(
+    "crawler_in_flight", "Requests currently in flight per host", ("host",),
+    callback=lambda: {(host,): c.in_flight for host, c in _controllers.items()}
+)
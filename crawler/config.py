@@ -6,4 +6,84 @@ load_dotenv()
 MONGODB_URL = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
 MONGODB_DB_NAME = os.getenv("MONGODB_DB_NAME", "books_db")
 CRAWL_CONCURRENCY = int(os.getenv("CRAWL_CONCURRENCY", 10))
-BASE_URL = "https://books.toscrape.com/"
\ No newline at end of file
+BASE_URL = "https://books.toscrape.com/"
+# Buffered book writes: flush after this many upserts or this many seconds.
+# The full crawl and workers store in batches of SINK_BATCH_SIZE and flush
+# each one (the journal needs them written), so only the size applies there
+SINK_BATCH_SIZE = int(os.getenv("SINK_BATCH_SIZE", 100))
+SINK_FLUSH_INTERVAL = float(os.getenv("SINK_FLUSH_INTERVAL", 2.0))
+
+# HTML parsing offload: 0 parses inline on the event loop.
+# PARSE_EXECUTOR is "process", "thread" or "auto" (threads on free-threaded builds)
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", 0))
+PARSE_EXECUTOR = os.getenv("PARSE_EXECUTOR", "auto")
+# Validate every parsed page through the Book model (slower; for debugging)
+PARSE_STRICT = os.getenv("PARSE_STRICT", "false").lower() in ("1", "true", "yes")
+
+# Page bodies are stored compressed in the html_pages collection ("zstd" needs
+# the optional zstandard package and falls back to "gzip" without it)
+HTML_COMPRESSION = os.getenv("HTML_COMPRESSION", "zstd")
+
+# Adaptive (AIMD) concurrency per origin host: CRAWL_CONCURRENCY is the ceiling
+CRAWL_MIN_CONCURRENCY = int(os.getenv("CRAWL_MIN_CONCURRENCY", 1))
+CRAWL_INITIAL_CONCURRENCY = int(os.getenv("CRAWL_INITIAL_CONCURRENCY", max(1, CRAWL_CONCURRENCY // 2)))
+CRAWL_LATENCY_TARGET = float(os.getenv("CRAWL_LATENCY_TARGET", 2.0))  # seconds
+CRAWL_DECREASE_FACTOR = float(os.getenv("CRAWL_DECREASE_FACTOR", 0.5))
+CRAWL_MAX_RPS = float(os.getenv("CRAWL_MAX_RPS", 0))  # 0 = no requests/sec cap
+
+# Staged crawl pipeline (crawler.pipeline): bounded queues between stages
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", 100))
+PIPELINE_FRONTIER_WORKERS = int(os.getenv("PIPELINE_FRONTIER_WORKERS", 4))
+PIPELINE_FETCH_WORKERS = int(os.getenv("PIPELINE_FETCH_WORKERS", CRAWL_CONCURRENCY))
+PIPELINE_PARSE_WORKERS = int(os.getenv("PIPELINE_PARSE_WORKERS", max(1, PARSE_WORKERS)))
+PIPELINE_STORE_BATCH = int(os.getenv("PIPELINE_STORE_BATCH", 50))
+PIPELINE_STATS_INTERVAL = float(os.getenv("PIPELINE_STATS_INTERVAL", 10.0))
+
+# Crash-safe crawl journal (SQLite, WAL mode); commits are batched
+CRAWL_JOURNAL_PATH = os.getenv("CRAWL_JOURNAL_PATH", "crawler/.crawl_journal.sqlite3")
+CRAWL_JOURNAL_COMMIT_EVERY = int(os.getenv("CRAWL_JOURNAL_COMMIT_EVERY", 500))
+CRAWL_JOURNAL_COMMIT_INTERVAL = float(os.getenv("CRAWL_JOURNAL_COMMIT_INTERVAL", 1.0))
+
+# Distributed crawling (crawler.worker): leases on the crawl_queue collection
+CRAWL_LEASE_SECONDS = float(os.getenv("CRAWL_LEASE_SECONDS", 120))
+CRAWL_WORKER_BATCH = int(os.getenv("CRAWL_WORKER_BATCH", 50))
+CRAWL_MAX_ATTEMPTS = int(os.getenv("CRAWL_MAX_ATTEMPTS", 3))
+CRAWL_WORKER_IDLE_SECONDS = float(os.getenv("CRAWL_WORKER_IDLE_SECONDS", 5))
+
+# Change detection from listing pages: detail pages are fetched only for new
+# books, books whose listing price/stock/rating changed, or books not fully
+# verified for LISTING_SNAPSHOT_MAX_AGE_HOURS
+LISTING_SNAPSHOT_MODE = os.getenv("LISTING_SNAPSHOT_MODE", "true").lower() in ("1", "true", "yes")
+LISTING_SNAPSHOT_MAX_AGE_HOURS = float(os.getenv("LISTING_SNAPSHOT_MAX_AGE_HOURS", 168))
+
+# Crawl roots: "categories" (each category's listing) or "catalogue" (the
+# global catalogue/page-N.html listing)
+CRAWL_SEED = os.getenv("CRAWL_SEED", "categories")
+
+# Change reports (scheduler.reports): gzip the files and/or split the change
+# entries into NDJSON parts of REPORT_CHUNK_SIZE entries (0 = one file)
+REPORTS_DIR = os.getenv("REPORTS_DIR", "reports")
+REPORT_GZIP = os.getenv("REPORT_GZIP", "false").lower() in ("1", "true", "yes")
+REPORT_CHUNK_SIZE = int(os.getenv("REPORT_CHUNK_SIZE", 0))
+
+# Price/stock history (scheduler.rollups): raw observations expire after this
+# many days (0 = keep forever); the daily rollups are kept
+OBSERVATION_RETENTION_DAYS = int(os.getenv("OBSERVATION_RETENTION_DAYS", 400))
+
+# HTTP client (crawler.transport). HTTP/2 needs the optional h2 package
+# (pip install "httpx[http2]"); without it the crawler stays on HTTP/1.1.
+# The pool is sized to the concurrency ceiling, so the controller, not the
+# pool, decides how many requests are in flight.
+CRAWL_HTTP2 = os.getenv("CRAWL_HTTP2", "true").lower() in ("1", "true", "yes")
+CRAWL_MAX_CONNECTIONS = int(os.getenv("CRAWL_MAX_CONNECTIONS", CRAWL_CONCURRENCY))
+CRAWL_MAX_KEEPALIVE = int(os.getenv("CRAWL_MAX_KEEPALIVE", CRAWL_MAX_CONNECTIONS))
+CRAWL_KEEPALIVE_EXPIRY = float(os.getenv("CRAWL_KEEPALIVE_EXPIRY", 30.0))
+CRAWL_CONNECT_TIMEOUT = float(os.getenv("CRAWL_CONNECT_TIMEOUT", 5.0))
+CRAWL_READ_TIMEOUT = float(os.getenv("CRAWL_READ_TIMEOUT", 10.0))
+CRAWL_WRITE_TIMEOUT = float(os.getenv("CRAWL_WRITE_TIMEOUT", 10.0))
+CRAWL_POOL_TIMEOUT = float(os.getenv("CRAWL_POOL_TIMEOUT", 30.0))
+
+# Record every fetched response into WARC-style segments under this directory
+# (crawler.archive); empty turns recording off
+CRAWL_RECORD_DIR = os.getenv("CRAWL_RECORD_DIR", "")
+CRAWL_RECORD_SEGMENT_MB = int(os.getenv("CRAWL_RECORD_SEGMENT_MB", 100))
@@ -0,0 +1,69 @@
+# crawler/executor.py
+import asyncio
+import multiprocessing
+import sys
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from crawler.config import PARSE_WORKERS, PARSE_EXECUTOR
+from crawler.parser import parse_book_page
+
+_settings = {"workers": PARSE_WORKERS, "kind": PARSE_EXECUTOR}
+_executor: Executor | None = None
+
+
+def _gil_disabled() -> bool:
+    is_gil_enabled = getattr(sys, "_is_gil_enabled", None)
+    return is_gil_enabled is not None and not is_gil_enabled()
+
+
+def configure_parse_executor(workers: int, kind: str = "auto"):
+    """Override PARSE_WORKERS / PARSE_EXECUTOR; the pool is rebuilt on next use."""
+    shutdown_parse_executor()
+    _settings.update(workers=workers, kind=kind)
+
+
+def get_parse_executor() -> Executor | None:
+    """Shared parsing pool, or None when parsing runs inline."""
+    global _executor
+    if _settings["workers"] <= 0:
+        return None
+    if _executor is None:
+        kind = _settings["kind"]
+        if kind == "auto":
+            kind = "thread" if _gil_disabled() else "process"
+        if kind == "thread":
+            _executor = ThreadPoolExecutor(_settings["workers"], thread_name_prefix="parse")
+        elif kind == "process":
+            # spawn: never fork a process that already runs Motor's background threads
+            _executor = ProcessPoolExecutor(_settings["workers"], mp_context=multiprocessing.get_context("spawn"))
+        else:
+            raise ValueError(f"Unknown PARSE_EXECUTOR: {kind!r}")
+    return _executor
+
+
+def shutdown_parse_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
+
+
+def _parse_detached(url: str, html: str) -> dict:
+    # Runs in a worker process: the page is already held by the parent,
+    # so don't pickle raw_html back across the process boundary.
+    book = parse_book_page(url, html)
+    del book["raw_html"]
+    return book
+
+
+async def parse_book_page_async(url: str, html: str) -> dict:
+    """parse_book_page, run on the parsing pool when one is configured."""
+    executor = get_parse_executor()
+    if executor is None:
+        return parse_book_page(url, html)
+    loop = asyncio.get_running_loop()
+    if isinstance(executor, ThreadPoolExecutor):
+        # Threads share memory: the result dict is handed over as-is
+        return await loop.run_in_executor(executor, parse_book_page, url, html)
+    book = await loop.run_in_executor(executor, _parse_detached, url, html)
+    book["raw_html"] = html
+    return book
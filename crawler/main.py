@@ -1,55 +1,102 @@
+import argparse
 import asyncio
 import httpx
-from selectolax.parser import HTMLParser
-from urllib.parse import urljoin
-from crawler.scraper import crawl_category
+from crawler.scraper import fetch_seed_urls
+from crawler.pipeline import CrawlPipeline
 from crawler.storage import db
-from crawler.config import BASE_URL
-from crawler.state import load_last_category, save_last_category
+from crawler.config import SINK_BATCH_SIZE
+from crawler.transport import build_client
+from crawler.archive import ReplayTransport
+from crawler.state import CrawlJournal
+from crawler.executor import shutdown_parse_executor
+from crawler.stats import run_stats, reset_run_stats, format_run_summary
+from app.core.metrics import exporting_metrics
+from scheduler.category_stats import rebuild_category_stats
 
-async def main():
+
+async def store_books(books: list[dict]) -> list[str]:
+    """Write a batch through the sink; returns the URLs that failed.
+
+    The journal may only mark books stored once MongoDB has them, so each
+    batch is flushed here and the sink's own size/time batching is not
+    used on the crawl path; pipelines that store through this hand it
+    batches of SINK_BATCH_SIZE instead (see ``store_batch_size``).
+    """
+    failed_before = len(db.sink.failed)
+    for book in books:
+        await db.sink.add(book)
+    # Flush now so the journal only marks books stored once they are in MongoDB
+    await db.sink.flush()
+    return [failure["url"] for failure in db.sink.failed[failed_before:]]
+
+
+async def main(transport: httpx.AsyncBaseTransport | None = None):
+    """Full crawl; returns the pipeline stage stats.
+
+    ``transport`` swaps the network for e.g. a local stand-in server.
+    """
     await db.connect()
-    async with httpx.AsyncClient(base_url=BASE_URL) as client:
-        # Fetch homepage to get categories
-        resp = await client.get("")
-        tree = HTMLParser(resp.text)
-        category_links = tree.css(".side_categories a")[1:]  # Skip "Books"
-        full_category_urls = [
-            urljoin(BASE_URL, link.attributes["href"])
-            for link in category_links
-        ]
-
-        # Load last successfully crawled category
-        last_done = load_last_category()
-        if last_done and last_done in full_category_urls:
-            start_idx = full_category_urls.index(last_done) + 1
-            if start_idx >= len(full_category_urls):
-                print("✅ All categories already crawled. Starting fresh crawl.")
-                category_urls_to_crawl = full_category_urls
-                # Optional: reset state to allow re-crawl
-                save_last_category("")
-            else:
-                category_urls_to_crawl = full_category_urls[start_idx:]
-                print(f"✅ Resuming from category {start_idx + 1}/{len(full_category_urls)}")
-        else:
-            category_urls_to_crawl = full_category_urls
+    reset_run_stats()
+    journal = CrawlJournal()
+    async with exporting_metrics("crawler"):
+        try:
+            return await _crawl(transport, journal)
+        finally:
+            # Also when the crawl raises: don't leave parser processes behind
+            shutdown_parse_executor()
 
-        print(f"🌐 Found {len(category_urls_to_crawl)} categories to crawl.")
 
-        # Crawl with progress tracking
-        async def crawl_and_track(url):
-            await crawl_category(client, url)
-            save_last_category(url)
+async def _crawl(transport: httpx.AsyncBaseTransport | None, journal: CrawlJournal) -> dict:
+    async with build_client(transport) as client:
+        # Categories from the homepage, or the global catalogue listing (CRAWL_SEED)
+        full_category_urls = await fetch_seed_urls(client)
+
+        # Resume an interrupted run: re-walk unfinished categories and
+        # refetch books that were queued or fetched but never stored
+        pending_books = []
+        category_urls_to_crawl = full_category_urls
+        resuming = journal.start_run()
+        if resuming:
+            walked = journal.stored_urls(kind="category")
+            category_urls_to_crawl = [url for url in full_category_urls if url not in walked]
+            pending_books = [(url, category) for url, category in journal.unfinished() if category in walked]
+            print(f"✅ Resuming: {len(category_urls_to_crawl)} categories and "
+                  f"{len(pending_books)} books left from the interrupted run")
+
+        print(f"🌐 Found {len(category_urls_to_crawl)} categories to crawl.")
+        stats = {}
 
-        if category_urls_to_crawl:
-            await asyncio.gather(*[crawl_and_track(url) for url in category_urls_to_crawl])
+        if category_urls_to_crawl or pending_books:
+            pipeline = CrawlPipeline(client, store_books, journal=journal, store_batch_size=SINK_BATCH_SIZE)
+            stats = await pipeline.run(category_urls_to_crawl, pending_books)
+            print(f"📈 {pipeline.format_stats()}")
         else:
             print("ℹ️  No categories to crawl.")
 
+    shutdown_parse_executor()
+    # Books were written without change detection, so recount the facets
+    await db.sink.flush()
+    await rebuild_category_stats()
     await db.close()
+    # Leave a run with failed URLs open so the next start retries them (as
+    # after a crash); a resumed run is finished regardless, so a URL that
+    # keeps failing cannot turn every later run into a resume
+    if journal.is_complete(full_category_urls) or resuming:
+        journal.finish_run()
+    else:
+        walked = journal.stored_urls(kind="category")
+        print(f"⚠️  {len(journal.unfinished())} books and "
+              f"{sum(url not in walked for url in full_category_urls)} categories failed; "
+              f"the next run retries them before starting a new crawl")
+    journal.close()
+    run_stats["books_written"] = db.sink.written
+    run_stats["books_write_failed"] = len(db.sink.failed)
+    print(f"📊 Run summary: {format_run_summary()}")
     print("✅ Full crawl completed successfully.")
-    # Optional: uncomment to reset state after every full run
-    # save_last_category("")
+    return stats
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Full crawl of books.toscrape.com")
+    parser.add_argument("--replay", metavar="ARCHIVE", help="crawl a recorded archive (CRAWL_RECORD_DIR) instead of the site")
+    args = parser.parse_args()
+    asyncio.run(main(ReplayTransport(args.replay) if args.replay else None))
@@ -1,10 +1,92 @@
 from selectolax.parser import HTMLParser
+from selectolax.lexbor import LexborHTMLParser
 from app.models.book import Book
+from crawler.config import PARSE_STRICT
+from utils.text import tokenize
 from datetime import datetime
 import re
 
+# Star-rating class words → numeric rating
+RATING_WORDS = {"One": 1, "Two": 2, "Three": 3, "Four": 4, "Five": 5}
 
-def parse_book_page(url: str, html: str) -> dict:
+_AVAILABLE_RE = re.compile(r"\((\d+) available\)")
+_PRICE_RE = re.compile(r"\d+(?:\.\d+)?")
+IMAGE_BASE_URL = "https://books.toscrape.com/"
+
+
+def _price(text: str | None) -> float:
+    match = _PRICE_RE.search(text) if text else None
+    return float(match.group()) if match else 0.0
+
+
+def parse_book_page(url: str, html: str, strict: bool = PARSE_STRICT) -> dict:
+    """Parse a book detail page into a dict shaped like ``Book.model_dump()``.
+
+    Only the breadcrumb-to-product region of the page is parsed (with the
+    lexbor backend), the product information table is read in one pass
+    over its rows, and the dict is built directly from trusted values
+    instead of through the Pydantic model. ``strict`` validates through
+    ``Book`` as well.
+    """
+    start = html.find('<ul class="breadcrumb"')
+    end = html.find("</article>", start)
+    tree = LexborHTMLParser(html[start:end] if start != -1 and end != -1 else html)
+    product = tree.css_first("article.product_page") or tree.root
+
+    # Product information table: one pass over its cells in document order,
+    # each <td> keyed by the <th> before it
+    table = {}
+    header = None
+    for cell in product.css("table th, table td"):
+        if cell.tag == "th":
+            header = cell.text(strip=True)
+        elif header is not None:
+            table[header] = cell.text(strip=True)
+            header = None
+
+    title_el = product.css_first("h1")
+    breadcrumbs = tree.css("ul.breadcrumb li")
+    price_el = product.css_first("p.price_color")
+    listed_price = _price(price_el.text()) if price_el else 0.0
+
+    avail_raw = table.get("Availability")
+    if avail_raw is None:
+        avail_el = product.css_first(".availability")
+        avail_raw = avail_el.text(strip=True) if avail_el else "Not available"
+    count_match = _AVAILABLE_RE.search(avail_raw)
+
+    reviews = table.get("Number of reviews", "")
+    img_el = product.css_first("#product_gallery img")
+    img_src = img_el.attributes.get("src") if img_el is not None else None
+    rating_el = product.css_first("p.star-rating")
+    rating_class = rating_el.attributes.get("class") if rating_el is not None else None
+    desc_el = product.css_first("#product_description ~ p")
+    title = title_el.text().strip() if title_el else "Unknown Title"
+
+    book = {
+        "url": url,
+        "title": title,
+        "title_tokens": tokenize(title),
+        "description": desc_el.text().strip() if desc_el else None,
+        "category": breadcrumbs[-2].text().strip() if len(breadcrumbs) >= 2 else "Unknown",
+        "price_excl_tax": _price(table["Price (excl. tax)"]) if "Price (excl. tax)" in table else listed_price,
+        "price_incl_tax": _price(table["Price (incl. tax)"]) if "Price (incl. tax)" in table else listed_price,
+        "availability_raw": avail_raw,
+        "availability_count": int(count_match.group(1)) if count_match else 0,
+        "num_reviews": int(reviews) if reviews.isdigit() else 0,
+        "image_url": IMAGE_BASE_URL + img_src.replace("../", "") if img_src else "",
+        "rating": RATING_WORDS.get(rating_class.split()[-1], 0) if rating_class else 0,
+        "raw_html": html,
+        "crawled_at": datetime.utcnow(),
+        "status": "success",
+    }
+    if strict:
+        return Book(**book).model_dump()
+    return book
+
+
+def parse_book_page_legacy(url: str, html: str) -> dict:
+    """The original selector-per-field parser, kept for comparison and benchmarks."""
     tree = HTMLParser(html)
 
     # === Title (required) ===
@@ -39,8 +121,7 @@ def parse_book_page(url: str, html: str) -> dict:
     rating_el = tree.css_first("p.star-rating")
     rating_class = rating_el.attributes.get("class", "") if rating_el else ""
     rating_word = rating_class.split()[-1] if rating_class else "Zero"
-    rating_map = {"One": 1, "Two": 2, "Three": 3, "Four": 4, "Five": 5}
-    rating = rating_map.get(rating_word, 0)
+    rating = RATING_WORDS.get(rating_word, 0)
 
     # === Description (optional) ===
     desc_el = tree.css_first("#product_description ~ p")
@@ -50,6 +131,7 @@ def parse_book_page(url: str, html: str) -> dict:
     book = Book(
         url=url,
         title=title,
+        title_tokens=tokenize(title),
         description=description,
         category=category,
         price_excl_tax=price,
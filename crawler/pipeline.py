@@ -0,0 +1,333 @@
+# crawler/pipeline.py
+import asyncio
+import time
+from collections import deque
+from typing import Awaitable, Callable
+import httpx
+from crawler.config import (
+    PIPELINE_QUEUE_SIZE, PIPELINE_FRONTIER_WORKERS, PIPELINE_FETCH_WORKERS,
+    PIPELINE_PARSE_WORKERS, PIPELINE_STORE_BATCH, PIPELINE_STATS_INTERVAL
+)
+from crawler.executor import parse_book_page_async
+from crawler.scraper import fetch_response, iter_listing_snapshots, response_validators
+from crawler.state import CrawlJournal, QUEUED, FETCHED, STORED
+from crawler.stats import run_stats, STAGE_SECONDS, STAGE_FAILURES
+from crawler.storage import db
+
+# Tells a worker its upstream stage has finished
+_DONE = object()
+
+
+class Stage:
+    """Counters and recent per-item latencies for one pipeline stage and the queue feeding it."""
+
+    def __init__(self, name: str, workers: int, queue: asyncio.Queue | None = None, window: int = 10_000):
+        self.name = name
+        self.workers = workers
+        self.queue = queue
+        self.processed = 0
+        self.failed = 0
+        self.latencies = deque(maxlen=window)
+        self.started_at = time.monotonic()
+
+    def observe(self, seconds: float):
+        self.latencies.append(seconds)
+        STAGE_SECONDS.observe(seconds, stage=self.name)
+
+    def fail(self, count: int = 1):
+        self.failed += count
+        STAGE_FAILURES.inc(count, stage=self.name)
+
+    def percentile(self, q: float) -> float | None:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def snapshot(self) -> dict:
+        elapsed = max(time.monotonic() - self.started_at, 1e-9)
+        p50, p99 = self.percentile(0.5), self.percentile(0.99)
+        return {
+            "workers": self.workers,
+            "queue_depth": self.queue.qsize() if self.queue is not None else 0,
+            "processed": self.processed,
+            "failed": self.failed,
+            "per_sec": round(self.processed / elapsed, 1),
+            "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+            "p99_ms": round(p99 * 1000, 1) if p99 is not None else None,
+        }
+
+
+class CrawlPipeline:
+    """Category frontier → fetch → parse → store, joined by bounded queues.
+
+    Each stage has its own worker pool; a full queue blocks the stage
+    above it, so memory stays flat however large the catalog is. ``store``
+    receives batches of parsed book dicts (up to ``store_batch_size``) and
+    may return the URLs it failed to write. ``on_category_done`` is awaited
+    once every book of a category has been stored, skipped or has failed.
+
+    With a ``listing_filter``, the listing snapshots of each page (url,
+    price, in-stock flag, rating) are passed to it and only the URLs it
+    returns have their detail page fetched. ``on_not_modified`` is awaited
+    with the URLs of book pages answered with a 304, in batches of up to
+    ``store_batch_size``.
+
+    With a ``journal``, every book URL is recorded as queued, fetched and
+    stored, categories once fully walked, and URLs the journal already
+    has as stored are not crawled again.
+    """
+
+    def __init__(self, client: httpx.AsyncClient, store: Callable[[list[dict]], Awaitable],
+                 frontier_workers: int = PIPELINE_FRONTIER_WORKERS, fetch_workers: int = PIPELINE_FETCH_WORKERS,
+                 parse_workers: int = PIPELINE_PARSE_WORKERS, store_batch_size: int = PIPELINE_STORE_BATCH,
+                 queue_size: int = PIPELINE_QUEUE_SIZE, stats_interval: float = PIPELINE_STATS_INTERVAL,
+                 on_category_done: Callable[[str], Awaitable] | None = None,
+                 journal: CrawlJournal | None = None,
+                 listing_filter: Callable[[list[dict]], Awaitable[list[str]]] | None = None,
+                 on_not_modified: Callable[[list[str]], Awaitable] | None = None):
+        self.client = client
+        self.store = store
+        self.frontier_workers = frontier_workers
+        self.fetch_workers = fetch_workers
+        self.parse_workers = parse_workers
+        self.store_batch_size = store_batch_size
+        self.queue_size = queue_size
+        self.stats_interval = stats_interval
+        self.on_category_done = on_category_done
+        self.journal = journal
+        self.listing_filter = listing_filter
+        self.on_not_modified = on_not_modified
+        self._not_modified: list[str] = []
+        self._done_urls: set[str] = journal.stored_urls() if journal else set()
+        self.stages: dict[str, Stage] = {}
+        self._pending: dict[str, int] = {}
+        self._walked: set[str] = set()
+
+    async def run(self, category_urls: list[str], book_urls: list[tuple[str, str]] = ()) -> dict:
+        """Crawl ``category_urls`` plus already-discovered (book_url, category_url) pairs."""
+        categories = asyncio.Queue()
+        for url in category_urls:
+            categories.put_nowait(url)
+        fetch_q = asyncio.Queue(maxsize=self.queue_size)
+        parse_q = asyncio.Queue(maxsize=self.queue_size)
+        store_q = asyncio.Queue(maxsize=self.queue_size)
+        self.stages = {
+            "frontier": Stage("frontier", self.frontier_workers, categories),
+            "fetch": Stage("fetch", self.fetch_workers, fetch_q),
+            "parse": Stage("parse", self.parse_workers, parse_q),
+            "store": Stage("store", 1, store_q),
+        }
+
+        frontier = [asyncio.create_task(self._frontier_worker(categories, fetch_q)) for _ in range(self.frontier_workers)]
+        if book_urls:
+            frontier.append(asyncio.create_task(self._seed_books(book_urls, fetch_q)))
+        fetchers = [asyncio.create_task(self._fetch_worker(fetch_q, parse_q)) for _ in range(self.fetch_workers)]
+        parsers = [asyncio.create_task(self._parse_worker(parse_q, store_q)) for _ in range(self.parse_workers)]
+        storer = asyncio.create_task(self._store_worker(store_q))
+        reporter = asyncio.create_task(self._report_periodically())
+        everything = frontier + fetchers + parsers + [storer]
+
+        async def drain():
+            # Stage by stage: each stage stops once its upstream is done
+            for workers, downstream, consumers in (
+                (frontier, fetch_q, len(fetchers)),
+                (fetchers, parse_q, len(parsers)),
+                (parsers, store_q, 1),
+            ):
+                await asyncio.gather(*workers)
+                for _ in range(consumers):
+                    await downstream.put(_DONE)
+            await storer
+
+        drainer = asyncio.create_task(drain())
+        everything.append(drainer)
+        try:
+            # Supervise every worker: one that dies would otherwise leave the
+            # stage above it blocked on a full queue, and the run hanging
+            done, _ = await asyncio.wait(everything, return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                if not task.cancelled() and task.exception() is not None:
+                    raise task.exception()
+            await self._flush_not_modified()
+        finally:
+            if self.journal is not None:
+                self.journal.flush()
+            reporter.cancel()
+            for task in everything:
+                task.cancel()
+        return self.stats()
+
+    def stats(self) -> dict:
+        return {name: stage.snapshot() for name, stage in self.stages.items()}
+
+    def format_stats(self) -> str:
+        return " | ".join(
+            f"{name} q={s['queue_depth']} done={s['processed']} failed={s['failed']} {s['per_sec']}/s"
+            + (f" p50={s['p50_ms']}ms p99={s['p99_ms']}ms" if s["p50_ms"] is not None else "")
+            for name, s in self.stats().items()
+        )
+
+    async def _report_periodically(self):
+        while True:
+            await asyncio.sleep(self.stats_interval)
+            print(f"📈 {self.format_stats()}")
+
+    async def _settle(self, category_url: str, count: int = 1):
+        self._pending[category_url] -= count
+        await self._maybe_category_done(category_url)
+
+    async def _maybe_category_done(self, category_url: str):
+        if category_url in self._walked and self._pending.get(category_url) == 0:
+            self._walked.discard(category_url)
+            if self.on_category_done is not None:
+                try:
+                    await self.on_category_done(category_url)
+                except Exception as e:
+                    print(f"⚠️  on_category_done failed for {category_url}: {e}")
+
+    def _record(self, urls: list[str], status: str, kind: str = "book", category: str | None = None):
+        if self.journal is not None:
+            try:
+                self.journal.record(urls, status, kind, category)
+            except Exception as e:
+                # Only resumability suffers: the URLs are redone after a crash
+                print(f"⚠️  Failed to journal {len(urls)} URLs as {status}: {e}")
+
+    async def _enqueue(self, category_url: str, urls: list[str], validators: dict, fetch_q: asyncio.Queue):
+        urls = [url for url in urls if url not in self._done_urls]
+        self._record(urls, QUEUED, category=category_url)
+        for url in urls:
+            self._pending[category_url] += 1
+            await fetch_q.put((category_url, url, validators.get(url)))
+
+    async def _seed_books(self, book_urls: list[tuple[str, str]], fetch_q: asyncio.Queue):
+        by_category: dict[str, list[str]] = {}
+        for url, category_url in book_urls:
+            by_category.setdefault(category_url, []).append(url)
+        for category_url, urls in by_category.items():
+            self._pending.setdefault(category_url, 0)
+            await self._enqueue(category_url, urls, await db.get_validators(urls), fetch_q)
+            self._walked.add(category_url)
+            await self._maybe_category_done(category_url)
+
+    # === Stage 1: walk listing pages into book URLs ===
+    async def _frontier_worker(self, categories: asyncio.Queue, fetch_q: asyncio.Queue):
+        stage = self.stages["frontier"]
+        while True:
+            try:
+                category_url = categories.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            self._pending.setdefault(category_url, 0)
+            started = time.monotonic()
+            try:
+                async for _, snapshots in iter_listing_snapshots(self.client, category_url):
+                    book_urls = [snapshot["url"] for snapshot in snapshots]
+                    if self.listing_filter is not None:
+                        wanted = set(await self.listing_filter(snapshots))
+                        skipped = [url for url in book_urls if url not in wanted]
+                        run_stats["books_listing_unchanged"] += len(skipped)
+                        self._record(skipped, STORED, category=category_url)  # nothing to fetch
+                        book_urls = [url for url in book_urls if url in wanted]
+                    validators = await db.get_validators(book_urls)
+                    await self._enqueue(category_url, book_urls, validators, fetch_q)
+                self._record([category_url], STORED, kind="category")
+                stage.processed += 1
+                stage.observe(time.monotonic() - started)
+            except Exception as e:
+                stage.fail()
+                print(f"❌ Failed to walk {category_url}: {e}")
+            self._walked.add(category_url)
+            await self._maybe_category_done(category_url)
+
+    # === Stage 2: conditional GET of each book page ===
+    async def _fetch_worker(self, fetch_q: asyncio.Queue, parse_q: asyncio.Queue):
+        stage = self.stages["fetch"]
+        while (item := await fetch_q.get()) is not _DONE:
+            category_url, url, validators = item
+            started = time.monotonic()
+            try:
+                response = await fetch_response(self.client, url, validators)
+            except Exception as e:
+                stage.fail()
+                run_stats["books_failed"] += 1
+                print(f"❌ Failed to fetch {url}: {e}")
+                await self._settle(category_url)
+                continue
+            stage.processed += 1
+            stage.observe(time.monotonic() - started)
+            if response.status_code == 304:
+                run_stats["books_not_modified"] += 1
+                self._record([url], STORED, category=category_url)  # nothing to write
+                if self.on_not_modified is not None:
+                    self._not_modified.append(url)
+                    if len(self._not_modified) >= self.store_batch_size:
+                        await self._flush_not_modified()
+                await self._settle(category_url)
+                continue
+            self._record([url], FETCHED, category=category_url)
+            await parse_q.put((category_url, url, response.text, response_validators(response)))
+
+    async def _flush_not_modified(self):
+        urls, self._not_modified = self._not_modified, []
+        if not urls or self.on_not_modified is None:
+            return
+        try:
+            await self.on_not_modified(urls)
+        except Exception as e:
+            print(f"⚠️  on_not_modified failed for {len(urls)} books: {e}")
+
+    # === Stage 3: HTML → book dict (inline or on the parsing pool) ===
+    async def _parse_worker(self, parse_q: asyncio.Queue, store_q: asyncio.Queue):
+        stage = self.stages["parse"]
+        while (item := await parse_q.get()) is not _DONE:
+            category_url, url, html, validators = item
+            started = time.monotonic()
+            try:
+                book = await parse_book_page_async(url, html)
+            except Exception as e:
+                stage.fail()
+                run_stats["books_failed"] += 1
+                print(f"❌ Failed to parse {url}: {e}")
+                await self._settle(category_url)
+                continue
+            book.update(validators)
+            stage.processed += 1
+            stage.observe(time.monotonic() - started)
+            run_stats["books_parsed"] += 1
+            await store_q.put((category_url, book))
+
+    # === Stage 4: hand batches to the store callable ===
+    async def _store_worker(self, store_q: asyncio.Queue):
+        stage = self.stages["store"]
+        finished = False
+        while not finished:
+            item = await store_q.get()
+            if item is _DONE:
+                return
+            batch = [item]
+            # Take whatever else is already waiting, up to one batch
+            while len(batch) < self.store_batch_size:
+                try:
+                    item = store_q.get_nowait()
+                except asyncio.QueueEmpty:
+                    break
+                if item is _DONE:
+                    finished = True
+                    break
+                batch.append(item)
+            started = time.monotonic()
+            try:
+                failed = set(await self.store([book for _, book in batch]) or ())
+            except Exception as e:
+                failed = {book["url"] for _, book in batch}
+                run_stats["books_failed"] += len(batch)
+                print(f"❌ Failed to store {len(batch)} books: {e}")
+            stage.observe(time.monotonic() - started)  # per batch
+            stage.fail(len(failed))
+            stage.processed += len(batch) - len(failed)
+            for category_url, book in batch:
+                if book["url"] not in failed:
+                    self._record([book["url"]], STORED, category=category_url)
+                await self._settle(category_url)
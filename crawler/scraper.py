@@ -1,64 +1,231 @@
-import httpx
 import asyncio
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
+import httpx
+import re
+import time
+from datetime import datetime
+from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception, retry_if_exception_type
 from urllib.parse import urljoin
 from selectolax.parser import HTMLParser
-from crawler.parser import parse_book_page
 from crawler.storage import db
-from crawler.config import CRAWL_CONCURRENCY
+from crawler.config import BASE_URL, CRAWL_SEED
+from crawler.parser import RATING_WORDS
+from crawler.concurrency import BACKOFF_STATUSES, controller_for, parse_retry_after
+from crawler.archive import record_response, recording
+from crawler.stats import run_stats, FETCH_SECONDS, HTTP_RESPONSES, NOT_MODIFIED, FETCH_RETRIES
+
+
+def conditional_headers(validators: dict | None) -> dict:
+    """Build If-None-Match / If-Modified-Since headers from stored validators."""
+    headers = {}
+    if validators:
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+    return headers
+
+
+def response_validators(response: httpx.Response) -> dict:
+    return {
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+    }
+
+
+def _is_backoff_status(exc: BaseException) -> bool:
+    return isinstance(exc, httpx.HTTPStatusError) and exc.response.status_code in BACKOFF_STATUSES
+
+
+def _count_retry(retry_state):
+    FETCH_RETRIES.inc()
 
-semaphore = asyncio.Semaphore(CRAWL_CONCURRENCY)
 
 @retry(
     stop=stop_after_attempt(3),
     wait=wait_exponential(multiplier=1, min=1, max=10),
-    retry=retry_if_exception_type((httpx.TimeoutException, httpx.NetworkError))
+    retry=(
+        retry_if_exception_type((httpx.TimeoutException, httpx.NetworkError))
+        | retry_if_exception(_is_backoff_status)
+    ),
+    before_sleep=_count_retry
 )
+async def fetch_response(client: httpx.AsyncClient, url: str, validators: dict | None = None) -> httpx.Response:
+    """GET a page, revalidating with stored validators. A 304 is returned, not raised.
+
+    Requests wait for a slot from the host's adaptive concurrency controller
+    and report their latency and status back to it. While recording an
+    archive (crawler.archive) validators are ignored, so every page is
+    fetched in full and recorded.
+    """
+    controller = controller_for(str(client.base_url.join(url)))
+    await controller.acquire()
+    start = time.monotonic()
+    try:
+        # Timeouts come from the client (see crawler.transport)
+        response = await client.get(url, headers=conditional_headers(None if recording() else validators))
+    except httpx.TransportError:
+        await controller.release(None)
+        raise
+    except BaseException:
+        await controller.release(None, feedback=False)
+        raise
+    latency = time.monotonic() - start
+    await controller.release(latency, response.status_code, parse_retry_after(response.headers.get("Retry-After")))
+    FETCH_SECONDS.observe(latency)
+    HTTP_RESPONSES.inc(status=response.status_code)
+    record_response(response)
+    if response.status_code == 304:
+        NOT_MODIFIED.inc()
+    else:
+        response.raise_for_status()
+    return response
+
+
 async def fetch_page(client: httpx.AsyncClient, url: str) -> str:
-    response = await client.get(url, timeout=10.0)
-    response.raise_for_status()
+    response = await fetch_response(client, url)
     return response.text
 
-# crawler/scraper.py
-async def crawl_book(client: httpx.AsyncClient, url: str):
-    async with semaphore:
-        try:
-            html = await fetch_page(client, url)
-            book_dict = parse_book_page(url, html)
-            # Save directly to collection
-            await db.books.replace_one(
-                {"url": book_dict["url"]},
-                book_dict,
-                upsert=True
-            )
-            print(f"✅ Saved: {book_dict['title']}")
-        except Exception as e:
-            print(f"❌ Failed to crawl {url}: {e}")
-
-async def crawl_category(client: httpx.AsyncClient, category_url: str):
-    page = 1
-    while True:
-        if page == 1:
-            url = category_url
-        else:
-            url = category_url.replace("index.html", f"page-{page}.html")
-        
-        try:
-            html = await fetch_page(client, url)
-        except httpx.HTTPStatusError as e:
-            if e.response.status_code == 404:
-                break
-            raise
-
-        tree = HTMLParser(html)
-        book_links = tree.css("article.product_pod h3 a")
-        if not book_links:
-            break
-
-        full_urls = [
-            urljoin("https://books.toscrape.com/catalogue/", 
-                    link.attributes["href"].replace("../", ""))
-            for link in book_links
-        ]
-        await asyncio.gather(*[crawl_book(client, u) for u in full_urls])
-        page += 1
\ No newline at end of file
+
+def parse_listing_page(html: str) -> list[dict]:
+    """Snapshot of each ``article.product_pod``: url, price, in-stock flag and rating."""
+    tree = HTMLParser(html)
+    snapshots = []
+    for pod in tree.css("article.product_pod"):
+        link = pod.css_first("h3 a")
+        href = link.attributes.get("href") if link else None
+        if not href:
+            continue
+        price_el = pod.css_first("p.price_color")
+        price_match = re.search(r"\d+(?:\.\d+)?", price_el.text()) if price_el else None
+        rating_el = pod.css_first("p.star-rating")
+        rating_word = (rating_el.attributes.get("class") or "").split()[-1] if rating_el else ""
+        stock_el = pod.css_first(".availability")
+        snapshots.append({
+            "url": urljoin("https://books.toscrape.com/catalogue/", href.replace("../", "")),
+            "price_incl_tax": float(price_match.group()) if price_match else None,
+            "in_stock": "in stock" in stock_el.text().lower() if stock_el else None,
+            "rating": RATING_WORDS.get(rating_word, 0),
+        })
+    return snapshots
+
+
+def parse_page_count(html: str) -> int | None:
+    """Total pages from the pager's "Page X of N", or None when there is no pager."""
+    current = HTMLParser(html).css_first("li.current")
+    match = re.search(r"of\s+(\d+)", current.text()) if current else None
+    return int(match.group(1)) if match else None
+
+
+async def fetch_listing(client: httpx.AsyncClient, url: str) -> dict | None:
+    """Return ``{"books": snapshots, "page_count": N or None}`` for a listing page,
+    or None once past the last page."""
+    cached = await db.pages.find_one({"url": url}, {"_id": 0})
+    # Entries cached before snapshots and page counts were stored must be refetched in full
+    if cached and ("books" not in cached or "page_count" not in cached):
+        cached = None
+    try:
+        response = await fetch_response(client, url, cached)
+    except httpx.HTTPStatusError as e:
+        if e.response.status_code == 404:
+            return None
+        raise
+
+    if response.status_code == 304 and cached:
+        run_stats["listings_not_modified"] += 1
+        return {"books": cached["books"], "page_count": cached["page_count"]}
+
+    listing = {"books": parse_listing_page(response.text), "page_count": parse_page_count(response.text)}
+    await db.pages.update_one(
+        {"url": url},
+        {"$set": {
+            **listing,
+            "book_urls": [snapshot["url"] for snapshot in listing["books"]],
+            "fetched_at": datetime.utcnow(),
+            **response_validators(response),
+        }},
+        upsert=True
+    )
+    run_stats["listings_fetched"] += 1
+    return listing
+
+
+async def fetch_listing_snapshots(client: httpx.AsyncClient, url: str) -> list[dict] | None:
+    """Return the book snapshots on a listing page, or None once past the last page."""
+    listing = await fetch_listing(client, url)
+    return None if listing is None else listing["books"]
+
+
+async def fetch_listing_page(client: httpx.AsyncClient, url: str) -> list[str] | None:
+    """Return the book URLs on a listing page, or None once past the last page."""
+    snapshots = await fetch_listing_snapshots(client, url)
+    return None if snapshots is None else [snapshot["url"] for snapshot in snapshots]
+
+
+async def fetch_category_urls(client: httpx.AsyncClient) -> list[str]:
+    """Category index pages linked from the homepage sidebar."""
+    html = await fetch_page(client, "")
+    tree = HTMLParser(html)
+    category_links = tree.css(".side_categories a")[1:]  # Skip "Books"
+    return [urljoin(BASE_URL, link.attributes["href"]) for link in category_links]
+
+
+async def fetch_seed_urls(client: httpx.AsyncClient, strategy: str = CRAWL_SEED) -> list[str]:
+    """First listing page of every crawl root.
+
+    "categories" walks each category's listing; "catalogue" walks the global
+    ``catalogue/page-N.html`` listing as a single root instead, which skips
+    the homepage request and needs fewer listing pages in total.
+    """
+    if strategy == "catalogue":
+        return [urljoin(BASE_URL, "catalogue/page-1.html")]
+    return await fetch_category_urls(client)
+
+
+def listing_page_url(first_url: str, page: int) -> str:
+    """URL of page ``page`` of the listing whose first page is ``first_url``."""
+    if first_url.endswith("page-1.html"):
+        return first_url[:-len("page-1.html")] + f"page-{page}.html"
+    return first_url.replace("index.html", f"page-{page}.html")
+
+
+async def iter_listing_snapshots(client: httpx.AsyncClient, category_url: str):
+    """Yield (listing_url, snapshots) for each page of a category.
+
+    The pager on page 1 ("Page 1 of N") gives the page count, so pages
+    2..N are all requested at once and yielded as they arrive. Without a
+    pager, pages are probed one after another until one is missing.
+    """
+    first = await fetch_listing(client, category_url)
+    if not first or not first["books"]:
+        return
+    yield category_url, first["books"]
+
+    if first["page_count"] is None:
+        page = 2
+        while True:
+            url = listing_page_url(category_url, page)
+            snapshots = await fetch_listing_snapshots(client, url)
+            if not snapshots:
+                return
+            yield url, snapshots
+            page += 1
+
+    async def fetch(page):
+        url = listing_page_url(category_url, page)
+        return url, await fetch_listing_snapshots(client, url)
+
+    tasks = [asyncio.ensure_future(fetch(page)) for page in range(2, first["page_count"] + 1)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            url, snapshots = await next_done
+            if snapshots:
+                yield url, snapshots
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def iter_listing_pages(client: httpx.AsyncClient, category_url: str):
+    """Yield (listing_url, book_urls) for each page of a category."""
+    async for url, snapshots in iter_listing_snapshots(client, category_url):
+        yield url, [snapshot["url"] for snapshot in snapshots]
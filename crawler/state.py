@@ -1,14 +1,127 @@
 # crawler/state.py
-import json
+import sqlite3
+import time
 from pathlib import Path
+from crawler.config import CRAWL_JOURNAL_PATH, CRAWL_JOURNAL_COMMIT_EVERY, CRAWL_JOURNAL_COMMIT_INTERVAL
 
-_STATE_FILE = Path("crawler/.last_category")
+# Per-URL progress, in order
+QUEUED = "queued"
+FETCHED = "fetched"
+STORED = "stored"
 
-def load_last_category() -> str:
-    if _STATE_FILE.exists():
-        return _STATE_FILE.read_text().strip()
-    return ""
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started_at REAL NOT NULL,
+    finished_at REAL
+);
+CREATE TABLE IF NOT EXISTS entries (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id INTEGER NOT NULL,
+    url TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    category TEXT,
+    status TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_run_url ON entries (run_id, url, seq);
+"""
 
-def save_last_category(url: str):
-    _STATE_FILE.parent.mkdir(exist_ok=True)
-    _STATE_FILE.write_text(url)
\ No newline at end of file
+
+class CrawlJournal:
+    """Append-only, crash-safe record of what a crawl run has done.
+
+    Every status change is appended as a row (``book`` URLs go queued →
+    fetched → stored, ``category`` URLs are stored once fully walked);
+    a URL's status is its latest row. Rows are committed in batches of
+    ``commit_every`` or every ``commit_interval`` seconds with SQLite in
+    WAL mode, so a crash loses at most the last uncommitted batch, whose
+    URLs are simply redone. Finished runs are removed by ``compact()``.
+    """
+
+    def __init__(self, path: str | Path = CRAWL_JOURNAL_PATH, commit_every: int = CRAWL_JOURNAL_COMMIT_EVERY,
+                 commit_interval: float = CRAWL_JOURNAL_COMMIT_INTERVAL):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.commit_every = commit_every
+        self.commit_interval = commit_interval
+        self._conn = sqlite3.connect(self.path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.executescript(_SCHEMA)
+        self._uncommitted = 0
+        self._last_commit = time.monotonic()
+        self.run_id: int | None = None
+
+    def start_run(self) -> bool:
+        """Continue the last unfinished run if there is one; returns True when resuming."""
+        row = self._conn.execute(
+            "SELECT id FROM runs WHERE finished_at IS NULL ORDER BY id DESC LIMIT 1"
+        ).fetchone()
+        if row:
+            self.run_id = row[0]
+            return True
+        cursor = self._conn.execute("INSERT INTO runs (started_at) VALUES (?)", (time.time(),))
+        self._conn.commit()
+        self.run_id = cursor.lastrowid
+        return False
+
+    def record(self, urls: list[str], status: str, kind: str = "book", category: str | None = None):
+        if not urls:
+            return
+        self._conn.executemany(
+            "INSERT INTO entries (run_id, url, kind, category, status) VALUES (?, ?, ?, ?, ?)",
+            [(self.run_id, url, kind, category, status) for url in urls]
+        )
+        self._uncommitted += len(urls)
+        if (self._uncommitted >= self.commit_every
+                or time.monotonic() - self._last_commit >= self.commit_interval):
+            self.flush()
+
+    def flush(self):
+        self._conn.commit()
+        self._uncommitted = 0
+        self._last_commit = time.monotonic()
+
+    def _latest(self, kind: str) -> list[tuple[str, str | None, str]]:
+        return self._conn.execute(
+            """
+            SELECT e.url, e.category, e.status FROM entries e
+            JOIN (SELECT url, MAX(seq) AS seq FROM entries WHERE run_id = ? AND kind = ? GROUP BY url) latest
+              ON e.seq = latest.seq
+            """,
+            (self.run_id, kind)
+        ).fetchall()
+
+    def stored_urls(self, kind: str = "book") -> set[str]:
+        return {url for url, _, status in self._latest(kind) if status == STORED}
+
+    def unfinished(self, kind: str = "book") -> list[tuple[str, str | None]]:
+        """(url, category) of URLs recorded in this run but not yet stored."""
+        return [(url, category) for url, category, status in self._latest(kind) if status != STORED]
+
+    def is_complete(self, category_urls: list[str]) -> bool:
+        """True when every category was walked and every queued book stored."""
+        walked = self.stored_urls(kind="category")
+        return all(url in walked for url in category_urls) and not self.unfinished()
+
+    def finish_run(self):
+        self.flush()
+        self._conn.execute("UPDATE runs SET finished_at = ? WHERE id = ?", (time.time(), self.run_id))
+        self._conn.commit()
+        self.compact()
+
+    def compact(self):
+        """Drop the entries of finished runs and shrink the files on disk."""
+        self._conn.execute(
+            "DELETE FROM entries WHERE run_id IN (SELECT id FROM runs WHERE finished_at IS NOT NULL)"
+        )
+        self._conn.execute(
+            "DELETE FROM runs WHERE finished_at IS NOT NULL AND id < (SELECT MAX(id) FROM runs)"
+        )
+        self._conn.commit()
+        self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        self._conn.execute("VACUUM")
+
+    def close(self):
+        self.flush()
+        self._conn.close()
@@ -0,0 +1,32 @@
+# crawler/stats.py
+from collections import Counter
+from app.core.metrics import REGISTRY
+
+# Per-run counters shared by the crawler and the scheduler
+run_stats = Counter()
+
+
+def reset_run_stats():
+    run_stats.clear()
+
+
+def format_run_summary() -> str:
+    """One-line summary of the counters collected during the current run."""
+    if not run_stats:
+        return "no pages processed"
+    return ", ".join(f"{key}={value}" for key, value in sorted(run_stats.items()))
+
+
+# Prometheus metrics (see app.core.metrics); unlike run_stats they accumulate for the process lifetime
+FETCH_SECONDS = REGISTRY.histogram("crawler_fetch_seconds", "Duration of one HTTP GET, retries excluded")
+HTTP_RESPONSES = REGISTRY.counter("crawler_http_responses", "HTTP responses received, by status code", ("status",))
+NOT_MODIFIED = REGISTRY.counter("crawler_not_modified", "Conditional GETs answered with 304 Not Modified")
+FETCH_RETRIES = REGISTRY.counter("crawler_fetch_retries", "Fetches retried after a timeout, network error or 429/503")
+STAGE_SECONDS = REGISTRY.histogram("crawler_stage_seconds", "Per-item latency of a crawl pipeline stage", ("stage",))
+STAGE_FAILURES = REGISTRY.counter("crawler_stage_failures", "Items a crawl pipeline stage failed", ("stage",))
+CHANGE_DETECT_SECONDS = REGISTRY.histogram("change_detect_seconds", "Duration of change detection for one batch")
+BOOKS_CHANGED = REGISTRY.counter("books_changed", "Books logged as new or updated", ("change_type",))
+MONGO_WRITE_SECONDS = REGISTRY.histogram("mongo_write_seconds", "Duration of one bulk write", ("collection",))
+HTTP_RESPONSE_HEADERS_SECONDS = REGISTRY.histogram(
+    "crawler_http_response_headers_seconds", "Time from sending a request to its response headers", ("http_version",)
+)
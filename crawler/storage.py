@@ -1,15 +1,419 @@
 # crawler/storage.py
+import asyncio
+import gzip
+from datetime import datetime, timedelta
+from typing import Callable
+from bson import Binary
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
-from crawler.config import MONGODB_URL, MONGODB_DB_NAME
+from pymongo import ReplaceOne, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, CollectionInvalid
+from crawler.config import (
+    MONGODB_URL, MONGODB_DB_NAME, SINK_BATCH_SIZE, SINK_FLUSH_INTERVAL, HTML_COMPRESSION,
+    CRAWL_LEASE_SECONDS, CRAWL_MAX_ATTEMPTS, OBSERVATION_RETENTION_DAYS
+)
+from crawler.stats import MONGO_WRITE_SECONDS
+from utils.hashing import compute_content_hash
+from utils.text import tokenize
+
+# Shared with the API response cache (app.core.cache)
+CATALOG_VERSION_ID = "catalog_version"
+
+try:
+    import zstandard
+except ImportError:  # optional: gzip is used instead
+    zstandard = None
+
+
+def compress_html(html: str) -> tuple[bytes, str]:
+    """Compress a page body; returns (data, codec)."""
+    raw = html.encode("utf-8")
+    if HTML_COMPRESSION == "zstd" and zstandard is not None:
+        return zstandard.ZstdCompressor(level=10).compress(raw), "zstd"
+    return gzip.compress(raw, compresslevel=6), "gzip"
+
+
+def decompress_html(data: bytes, codec: str) -> str:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read zstd-compressed pages")
+        raw = zstandard.ZstdDecompressor().decompress(data)
+    elif codec == "gzip":
+        raw = gzip.decompress(data)
+    else:
+        raise ValueError(f"Unknown HTML codec: {codec!r}")
+    return raw.decode("utf-8")
+
+
+def detach_html(book_dict: dict) -> str | None:
+    """Replace raw_html on a book document with its content hash; returns the HTML."""
+    html = book_dict.pop("raw_html", None)
+    if html is not None:
+        book_dict["html_hash"] = compute_content_hash(html.encode("utf-8"))
+    return html
+
+
+class HtmlStore:
+    """Compressed page bodies keyed by content hash, so identical pages are stored once."""
+
+    def __init__(self, get_collection: Callable):
+        self._get_collection = get_collection
+
+    async def put_many(self, pages: dict[str, str]):
+        """Store {content_hash: html}; hashes that already exist are left untouched."""
+        if not pages:
+            return
+        now = datetime.utcnow()
+        requests = []
+        for content_hash, html in pages.items():
+            data, codec = compress_html(html)
+            requests.append(UpdateOne(
+                {"_id": content_hash},
+                {"$setOnInsert": {"data": Binary(data), "codec": codec, "size": len(html), "stored_at": now}},
+                upsert=True
+            ))
+        await self._get_collection().bulk_write(requests, ordered=False)
+
+    async def get(self, content_hash: str) -> str | None:
+        doc = await self._get_collection().find_one({"_id": content_hash})
+        if not doc:
+            return None
+        return decompress_html(doc["data"], doc["codec"])
+
+
+class BookSink:
+    """Buffers book upserts and writes them as unordered bulk_write batches.
+
+    A batch is flushed when it reaches ``batch_size`` documents or when
+    ``flush_interval`` seconds have passed since the first buffered upsert.
+    Documents that fail are reported one by one and kept in ``failed``.
+    """
+
+    def __init__(self, get_collection: Callable, batch_size: int = SINK_BATCH_SIZE,
+                 flush_interval: float = SINK_FLUSH_INTERVAL, html_store: HtmlStore | None = None,
+                 after_write: Callable | None = None):
+        self._get_collection = get_collection
+        self._html_store = html_store
+        self._after_write = after_write
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._buffer: list[dict] = []
+        self._write_lock = asyncio.Lock()
+        self._timer: asyncio.Task | None = None
+        self._timer_flushing = False
+        self.written = 0
+        self.failed: list[dict] = []
+
+    def __len__(self):
+        return len(self._buffer)
+
+    async def add(self, book_dict: dict):
+        self._buffer.append(book_dict)
+        if len(self._buffer) >= self.batch_size:
+            await self.flush()
+        elif self._timer is None or self._timer.done():
+            self._timer = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.flush_interval)
+        self._timer_flushing = True
+        try:
+            await self.flush()
+        finally:
+            self._timer_flushing = False
+
+    async def flush(self) -> int:
+        """Write everything buffered so far; returns the number of documents written."""
+        if not self._buffer:
+            return 0
+        batch, self._buffer = self._buffer, []
+        pages = {}
+        if self._html_store is not None:
+            for doc in batch:
+                html = detach_html(doc)
+                if html is not None:
+                    pages[doc["html_hash"]] = html
+
+        async with self._write_lock:
+            if pages:
+                # Page bodies first, so stored html_hash values resolve; books
+                # whose body was not stored are reported instead of written
+                # with a dangling html_hash
+                try:
+                    await self._html_store.put_many(pages)
+                except Exception as e:
+                    if isinstance(e, BulkWriteError):
+                        hashes = list(pages)
+                        lost = {hashes[error["index"]] for error in e.details.get("writeErrors", [])}
+                    else:
+                        lost = set(pages)
+                    kept = []
+                    for doc in batch:
+                        if doc.get("html_hash") in lost:
+                            self._report(doc, f"page body not stored: {e}")
+                        else:
+                            kept.append(doc)
+                    batch = kept
+            if not batch:
+                return 0
+            requests = [ReplaceOne({"url": doc["url"]}, doc, upsert=True) for doc in batch]
+            try:
+                with MONGO_WRITE_SECONDS.time(collection="books"):
+                    await self._get_collection().bulk_write(requests, ordered=False)
+                written = len(batch)
+            except BulkWriteError as e:
+                errors = e.details.get("writeErrors", [])
+                for error in errors:
+                    self._report(batch[error["index"]], error.get("errmsg", "write error"))
+                written = len(batch) - len(errors)
+            except Exception as e:
+                for doc in batch:
+                    self._report(doc, str(e))
+                written = 0
+
+        self.written += written
+        if written and self._after_write is not None:
+            await self._after_write()
+        return written
+
+    def _report(self, doc: dict, error: str):
+        self.failed.append({"url": doc.get("url"), "error": error})
+        print(f"❌ Failed to save {doc.get('url')}: {error}")
+
+    async def reopen(self):
+        """On (re)connect: write anything buffered before it and drop the timer
+        and lock, which belong to the event loop they were created on.
+        ``written`` and ``failed`` keep counting."""
+        if self._timer and not self._timer.done():
+            self._timer.cancel()
+        self._timer = None
+        self._write_lock = asyncio.Lock()
+        await self.flush()
+
+    async def close(self):
+        if self._timer and not self._timer.done():
+            if self._timer_flushing:
+                # Its batch has already left the buffer: let the write finish
+                await self._timer
+            else:
+                self._timer.cancel()
+        await self.flush()
+
+
+# Work item states in the crawl queue
+PENDING = "pending"
+LEASED = "leased"
+DONE = "done"
+FAILED = "failed"
+
+
+class WorkQueue:
+    """Crawl frontier shared by several workers, stored in MongoDB.
+
+    Items are ``{"_id": url, "kind": "category" | "book", "category": ...}``.
+    A worker claims a batch with ``find_one_and_update``, which sets an
+    owner and a lease expiry; it renews the lease while working and then
+    completes or releases each item. A lease that expires (worker died)
+    can be claimed by anyone; after ``max_attempts`` claims an item is
+    marked failed instead (by ``fail_exhausted``, swept before each claim).
+    """
+
+    def __init__(self, get_collection: Callable, lease_seconds: float = CRAWL_LEASE_SECONDS,
+                 max_attempts: int = CRAWL_MAX_ATTEMPTS):
+        self._get_collection = get_collection
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+
+    async def ensure_indexes(self):
+        await self._get_collection().create_index([("status", 1), ("lease_expires", 1)])
+
+    async def enqueue(self, items: list[dict]):
+        """Add work items; URLs already in the queue keep their state."""
+        if not items:
+            return
+        await self._get_collection().bulk_write([
+            UpdateOne(
+                {"_id": item["_id"]},
+                {"$setOnInsert": {
+                    "kind": item.get("kind", "book"), "category": item.get("category"),
+                    "status": PENDING, "attempts": 0, "owner": None, "lease_expires": None,
+                }},
+                upsert=True
+            )
+            for item in items
+        ], ordered=False)
+
+    async def fail_exhausted(self) -> int:
+        """Mark items that can never be claimed again failed: expired leases
+        (or pending items) that have used up their attempts."""
+        result = await self._get_collection().update_many(
+            {
+                "$or": [{"status": PENDING}, {"status": LEASED, "lease_expires": {"$lt": datetime.utcnow()}}],
+                "attempts": {"$gte": self.max_attempts},
+            },
+            {"$set": {"status": FAILED, "lease_expires": None}}
+        )
+        return result.modified_count
+
+    async def claim(self, owner: str, batch_size: int) -> list[dict]:
+        await self.fail_exhausted()
+        now = datetime.utcnow()
+        claimable = {
+            "$or": [{"status": PENDING}, {"status": LEASED, "lease_expires": {"$lt": now}}],
+            "attempts": {"$lt": self.max_attempts},
+        }
+        lease = {
+            "$set": {"status": LEASED, "owner": owner, "lease_expires": now + timedelta(seconds=self.lease_seconds)},
+            "$inc": {"attempts": 1},
+        }
+        claimed = []
+        for _ in range(batch_size):
+            doc = await self._get_collection().find_one_and_update(
+                claimable, lease, return_document=ReturnDocument.AFTER
+            )
+            if doc is None:
+                break
+            claimed.append(doc)
+        return claimed
+
+    async def renew(self, owner: str, ids: list[str]) -> int:
+        """Extend this owner's leases; returns how many are still held."""
+        result = await self._get_collection().update_many(
+            {"_id": {"$in": ids}, "owner": owner, "status": LEASED},
+            {"$set": {"lease_expires": datetime.utcnow() + timedelta(seconds=self.lease_seconds)}}
+        )
+        return result.matched_count
+
+    async def complete(self, owner: str, ids: list[str]):
+        await self._get_collection().update_many(
+            {"_id": {"$in": ids}, "owner": owner, "status": LEASED},
+            {"$set": {"status": DONE, "lease_expires": None}}
+        )
+
+    async def release(self, owner: str, ids: list[str]):
+        """Give items back for another attempt, or mark them failed when out of attempts."""
+        collection = self._get_collection()
+        held = {"_id": {"$in": ids}, "owner": owner, "status": LEASED}
+        await collection.update_many(
+            {**held, "attempts": {"$gte": self.max_attempts}},
+            {"$set": {"status": FAILED, "lease_expires": None}}
+        )
+        await collection.update_many(held, {"$set": {"status": PENDING, "owner": None, "lease_expires": None}})
+
+    async def requeue_expired(self) -> int:
+        """Return items whose lease ran out to the pending state."""
+        await self.fail_exhausted()
+        result = await self._get_collection().update_many(
+            {"status": LEASED, "lease_expires": {"$lt": datetime.utcnow()}},
+            {"$set": {"status": PENDING, "owner": None, "lease_expires": None}}
+        )
+        return result.modified_count
+
+    async def counts(self) -> dict:
+        cursor = self._get_collection().aggregate([{"$group": {"_id": "$status", "n": {"$sum": 1}}}])
+        return {doc["_id"]: doc["n"] async for doc in cursor}
+
+    async def reset(self):
+        """Forget every item, e.g. before seeding a new full refresh."""
+        await self._get_collection().delete_many({})
+
+
+class InMemoryWorkQueue:
+    """Single-process stand-in for WorkQueue with the same interface (tests, local runs)."""
+
+    def __init__(self, lease_seconds: float = CRAWL_LEASE_SECONDS, max_attempts: int = CRAWL_MAX_ATTEMPTS):
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.items: dict[str, dict] = {}
+
+    async def ensure_indexes(self):
+        pass
+
+    async def enqueue(self, items: list[dict]):
+        for item in items:
+            self.items.setdefault(item["_id"], {
+                "_id": item["_id"], "kind": item.get("kind", "book"), "category": item.get("category"),
+                "status": PENDING, "attempts": 0, "owner": None, "lease_expires": None,
+            })
+
+    async def fail_exhausted(self) -> int:
+        now = datetime.utcnow()
+        exhausted = [
+            doc for doc in self.items.values()
+            if (doc["status"] == PENDING or (doc["status"] == LEASED and doc["lease_expires"] < now))
+            and doc["attempts"] >= self.max_attempts
+        ]
+        for doc in exhausted:
+            doc.update(status=FAILED, lease_expires=None)
+        return len(exhausted)
+
+    async def claim(self, owner: str, batch_size: int) -> list[dict]:
+        await self.fail_exhausted()
+        now = datetime.utcnow()
+        claimed = []
+        for doc in self.items.values():
+            if len(claimed) >= batch_size:
+                break
+            expired = doc["status"] == LEASED and doc["lease_expires"] < now
+            if (doc["status"] == PENDING or expired) and doc["attempts"] < self.max_attempts:
+                doc.update(status=LEASED, owner=owner, lease_expires=now + timedelta(seconds=self.lease_seconds))
+                doc["attempts"] += 1
+                claimed.append(dict(doc))
+        return claimed
+
+    def _held(self, owner: str, ids: list[str]):
+        return [
+            doc for doc in (self.items.get(i) for i in ids)
+            if doc and doc["owner"] == owner and doc["status"] == LEASED
+        ]
+
+    async def renew(self, owner: str, ids: list[str]) -> int:
+        held = self._held(owner, ids)
+        for doc in held:
+            doc["lease_expires"] = datetime.utcnow() + timedelta(seconds=self.lease_seconds)
+        return len(held)
+
+    async def complete(self, owner: str, ids: list[str]):
+        for doc in self._held(owner, ids):
+            doc.update(status=DONE, lease_expires=None)
+
+    async def release(self, owner: str, ids: list[str]):
+        for doc in self._held(owner, ids):
+            if doc["attempts"] >= self.max_attempts:
+                doc.update(status=FAILED, lease_expires=None)
+            else:
+                doc.update(status=PENDING, owner=None, lease_expires=None)
+
+    async def requeue_expired(self) -> int:
+        await self.fail_exhausted()
+        now = datetime.utcnow()
+        expired = [doc for doc in self.items.values() if doc["status"] == LEASED and doc["lease_expires"] < now]
+        for doc in expired:
+            doc.update(status=PENDING, owner=None, lease_expires=None)
+        return len(expired)
+
+    async def counts(self) -> dict:
+        counts = {}
+        for doc in self.items.values():
+            counts[doc["status"]] = counts.get(doc["status"], 0) + 1
+        return counts
+
+    async def reset(self):
+        self.items.clear()
+
 
 class Database:
     def __init__(self):
         self._client: AsyncIOMotorClient | None = None
         self._db: AsyncIOMotorDatabase | None = None
+        self.html_store = HtmlStore(lambda: self.html_pages)
+        self.sink = BookSink(lambda: self.books, html_store=self.html_store,
+                             after_write=self.bump_catalog_version)
+        self.work_queue = WorkQueue(lambda: self.crawl_queue)
 
     async def connect(self):
         self._client = AsyncIOMotorClient(MONGODB_URL)
         self._db = self._client[MONGODB_DB_NAME]
+        await self.sink.reopen()
         # Create indexes
         await self.books.create_index("url", unique=True)
         await self.books.create_index([
@@ -17,10 +421,43 @@ class Database:
             ("price_incl_tax", 1),
             ("rating", 1)
         ])
+        # Keyset pagination for GET /books: one index per sort_by option,
+        # with and without the category filter
+        for field in ("rating", "price_incl_tax", "num_reviews"):
+            await self.books.create_index([(field, -1), ("_id", -1)])
+            await self.books.create_index([("category", 1), (field, -1), ("_id", -1)])
+        # GET /books/search: ranked full-text search and title prefix (typeahead) search
+        await self.books.create_index(
+            [("title", "text"), ("description", "text")],
+            weights={"title": 10, "description": 1}, name="books_text"
+        )
+        await self.books.create_index("title_tokens")
         await self.change_log.create_index("detected_at")
+        # Change feed (GET /changes/feed): resume after _id, optionally filtered
+        for field in ("change_type", "category", "changed_fields"):
+            await self.change_log.create_index([(field, 1), ("_id", 1)])
+        await self.pages.create_index("url", unique=True)
+        await self.work_queue.ensure_indexes()
+        await self._ensure_history_collections()
+
+    async def _ensure_history_collections(self):
+        """Time-series observations (MongoDB 5.0+) and the daily rollups built from them."""
+        if not await self._db.list_collection_names(filter={"name": "book_observations"}):
+            options = {"timeseries": {"timeField": "observed_at", "metaField": "meta", "granularity": "hours"}}
+            if OBSERVATION_RETENTION_DAYS:
+                options["expireAfterSeconds"] = OBSERVATION_RETENTION_DAYS * 86400
+            try:
+                await self._db.create_collection("book_observations", **options)
+            except CollectionInvalid:
+                pass  # created concurrently
+        await self.observations.create_index([("meta.book_url", 1), ("observed_at", 1)])
+        # $merge targets: the "on" fields need a unique index
+        await self.book_daily.create_index([("book_url", 1), ("day", 1)], unique=True)
+        await self.category_daily.create_index([("category", 1), ("day", 1)], unique=True)
 
     async def close(self):
         if self._client:
+            await self.sink.close()
             self._client.close()
 
     @property
@@ -35,5 +472,121 @@ class Database:
             raise RuntimeError("Database not connected. Call connect() first.")
         return self._db.change_log
 
+    @property
+    def html_pages(self):
+        """Compressed page bodies, keyed by content hash (see HtmlStore)."""
+        if self._db is None:
+            raise RuntimeError("Database not connected. Call connect() first.")
+        return self._db.html_pages
+
+    @property
+    def crawl_queue(self):
+        """Shared work items for distributed crawling (see WorkQueue)."""
+        if self._db is None:
+            raise RuntimeError("Database not connected. Call connect() first.")
+        return self._db.crawl_queue
+
+    @property
+    def category_stats(self):
+        """Per-category facets kept current by change detection (see scheduler.category_stats)."""
+        if self._db is None:
+            raise RuntimeError("Database not connected. Call connect() first.")
+        return self._db.category_stats
+
+    @property
+    def observations(self):
+        """Time series of price/stock observations (see scheduler.rollups)."""
+        if self._db is None:
+            raise RuntimeError("Database not connected. Call connect() first.")
+        return self._db.book_observations
+
+    @property
+    def book_daily(self):
+        if self._db is None:
+            raise RuntimeError("Database not connected. Call connect() first.")
+        return self._db.book_daily
+
+    @property
+    def category_daily(self):
+        if self._db is None:
+            raise RuntimeError("Database not connected. Call connect() first.")
+        return self._db.category_daily
+
+    @property
+    def meta(self):
+        """Small bookkeeping documents, e.g. the catalog version counter."""
+        if self._db is None:
+            raise RuntimeError("Database not connected. Call connect() first.")
+        return self._db.meta
+
+    @property
+    def pages(self):
+        """Listing pages with their HTTP validators and the book URLs they link to."""
+        if self._db is None:
+            raise RuntimeError("Database not connected. Call connect() first.")
+        return self._db.pages
+
+    async def get_validators(self, urls: list[str]) -> dict:
+        """Stored ETag / Last-Modified per book URL, fetched in one query."""
+        cursor = self.books.find(
+            {"url": {"$in": urls}},
+            {"_id": 0, "url": 1, "etag": 1, "last_modified": 1}
+        )
+        return {doc["url"]: doc async for doc in cursor}
+
+    async def bump_catalog_version(self):
+        """Invalidate API response caches after books/change_log were written."""
+        await self.meta.update_one({"_id": CATALOG_VERSION_ID}, {"$inc": {"value": 1}}, upsert=True)
+
+    async def backfill_title_tokens(self, batch_size: int = 1000) -> int:
+        """Add title_tokens to books stored before prefix search existed."""
+        updated = 0
+        while True:
+            docs = await self.books.find(
+                {"title_tokens": {"$exists": False}}, {"title": 1}
+            ).limit(batch_size).to_list(length=batch_size)
+            if not docs:
+                return updated
+            await self.books.bulk_write([
+                UpdateOne({"_id": doc["_id"]}, {"$set": {"title_tokens": tokenize(doc.get("title"))}})
+                for doc in docs
+            ], ordered=False)
+            updated += len(docs)
+
+    async def migrate_inline_html(self, batch_size: int = 200) -> int:
+        """Move raw_html still embedded in book documents into the HTML store."""
+        moved = 0
+        while True:
+            docs = await self.books.find(
+                {"raw_html": {"$exists": True}}, {"raw_html": 1}
+            ).limit(batch_size).to_list(length=batch_size)
+            if not docs:
+                return moved
+            pages, updates = {}, []
+            for doc in docs:
+                html = detach_html(doc)
+                pages[doc["html_hash"]] = html
+                updates.append(UpdateOne(
+                    {"_id": doc["_id"]},
+                    {"$set": {"html_hash": doc["html_hash"]}, "$unset": {"raw_html": ""}}
+                ))
+            await self.html_store.put_many(pages)
+            await self.books.bulk_write(updates, ordered=False)
+            moved += len(docs)
+
 # Singleton instance
-db = Database()
\ No newline at end of file
+db = Database()
+
+
+if __name__ == "__main__":
+    # python -m crawler.storage: move legacy inline raw_html into html_pages
+    # and add title_tokens to books stored before prefix search
+    async def _migrate():
+        await db.connect()
+        moved = await db.migrate_inline_html()
+        tokenized = await db.backfill_title_tokens()
+        await db.close()
+        print(f"✅ Moved raw_html of {moved} books into html_pages")
+        print(f"✅ Added title_tokens to {tokenized} books")
+
+    asyncio.run(_migrate())
\ No newline at end of file
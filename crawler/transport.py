@@ -0,0 +1,82 @@
+# crawler/transport.py
+"""The crawler's HTTP client: HTTP/2, a pool sized to the concurrency
+controller, compressed transfers, separate timeouts and timing hooks."""
+import time
+import httpx
+from crawler.config import (
+    BASE_URL, CRAWL_HTTP2, CRAWL_MAX_CONNECTIONS, CRAWL_MAX_KEEPALIVE, CRAWL_KEEPALIVE_EXPIRY,
+    CRAWL_CONNECT_TIMEOUT, CRAWL_READ_TIMEOUT, CRAWL_WRITE_TIMEOUT, CRAWL_POOL_TIMEOUT
+)
+from crawler.stats import HTTP_RESPONSE_HEADERS_SECONDS
+
+try:
+    import h2  # noqa: F401  (optional: enables HTTP/2 in httpx)
+except ImportError:
+    h2 = None
+
+# httpx decodes br/zstd only when their optional packages are installed (zstd
+# needs httpx >= 0.27.1, the floor in requirements.txt / pyproject.toml)
+_ENCODINGS = ["gzip", "deflate"]
+try:
+    import brotli  # noqa: F401
+    _ENCODINGS.insert(0, "br")
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        _ENCODINGS.insert(0, "br")
+    except ImportError:
+        pass
+try:
+    import zstandard  # noqa: F401
+    _ENCODINGS.insert(0, "zstd")
+except ImportError:
+    pass
+ACCEPT_ENCODING = ", ".join(_ENCODINGS)
+
+
+async def _stamp_request(request: httpx.Request):
+    request.extensions["crawl_started"] = time.perf_counter()
+
+
+async def _time_response(response: httpx.Response):
+    # Runs once the headers are in, before the body is read
+    started = response.request.extensions.get("crawl_started")
+    if started is not None:
+        HTTP_RESPONSE_HEADERS_SECONDS.observe(time.perf_counter() - started, http_version=response.http_version)
+
+
+def crawl_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=CRAWL_MAX_CONNECTIONS,
+        max_keepalive_connections=CRAWL_MAX_KEEPALIVE,
+        keepalive_expiry=CRAWL_KEEPALIVE_EXPIRY,
+    )
+
+
+def crawl_timeout() -> httpx.Timeout:
+    return httpx.Timeout(
+        connect=CRAWL_CONNECT_TIMEOUT, read=CRAWL_READ_TIMEOUT, write=CRAWL_WRITE_TIMEOUT, pool=CRAWL_POOL_TIMEOUT
+    )
+
+
+def build_client(transport: httpx.AsyncBaseTransport | None = None, base_url: str = BASE_URL,
+                 http2: bool = CRAWL_HTTP2, **kwargs) -> httpx.AsyncClient:
+    """AsyncClient for crawling ``base_url``.
+
+    ``transport`` swaps the network (e.g. a local stand-in server); the
+    pool limits and HTTP/2 setting then belong to that transport. Extra
+    keyword arguments go to ``httpx.AsyncClient``.
+    """
+    if http2 and h2 is None:
+        print("⚠️  CRAWL_HTTP2 is set but the h2 package is missing; using HTTP/1.1")
+        http2 = False
+    return httpx.AsyncClient(
+        base_url=base_url,
+        transport=transport,
+        http2=http2,
+        limits=crawl_limits(),
+        timeout=crawl_timeout(),
+        headers={"Accept-Encoding": ACCEPT_ENCODING},
+        event_hooks={"request": [_stamp_request], "response": [_time_response]},
+        **kwargs,
+    )
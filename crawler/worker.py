@@ -0,0 +1,146 @@
+# crawler/worker.py
+"""Distributed crawl worker backed by the shared crawl_queue collection.
+
+    python -m crawler.worker --seed   # reset the queue and enqueue every category
+    python -m crawler.worker          # claim and crawl batches until the queue drains
+
+Any number of workers can run at once (see the ``crawler-worker`` service
+in docker-compose.yml). Category items are walked into book items, which
+any worker may then claim; book items go through the regular pipeline.
+"""
+import argparse
+import asyncio
+import os
+import socket
+import httpx
+from crawler.config import CRAWL_WORKER_BATCH, CRAWL_WORKER_IDLE_SECONDS, SINK_BATCH_SIZE
+from crawler.executor import shutdown_parse_executor
+from crawler.main import store_books
+from crawler.pipeline import CrawlPipeline
+from crawler.scraper import fetch_seed_urls, iter_listing_pages
+from crawler.state import STORED
+from crawler.transport import build_client
+from crawler.stats import run_stats, reset_run_stats, format_run_summary
+from app.core.metrics import exporting_metrics
+from scheduler.category_stats import rebuild_category_stats
+from crawler.storage import db, LEASED, PENDING
+
+
+class LeaseRecorder:
+    """Journal stand-in for CrawlPipeline that remembers which leased books were stored."""
+
+    def __init__(self):
+        self.stored: set[str] = set()
+
+    def record(self, urls: list[str], status: str, kind: str = "book", category: str | None = None):
+        if status == STORED and kind == "book":
+            self.stored.update(urls)
+
+    def stored_urls(self, kind: str = "book") -> set[str]:
+        return set()
+
+    def flush(self):
+        pass
+
+
+async def seed(client: httpx.AsyncClient, queue=None):
+    """Start a new refresh: forget the previous queue and enqueue every category."""
+    queue = queue or db.work_queue
+    category_urls = await fetch_seed_urls(client)
+    await queue.reset()
+    await queue.enqueue([{"_id": url, "kind": "category"} for url in category_urls])
+    print(f"🌱 Seeded {len(category_urls)} categories.")
+
+
+async def _keep_leases(queue, owner: str, ids: list[str]):
+    while True:
+        await asyncio.sleep(queue.lease_seconds / 3)
+        held = await queue.renew(owner, ids)
+        if held < len(ids):
+            print(f"⚠️  Lost {len(ids) - held} leases")
+
+
+async def process_batch(client: httpx.AsyncClient, queue, owner: str, items: list[dict]):
+    """Crawl one claimed batch, then complete what succeeded and release the rest."""
+    done: list[str] = []
+    for item in (i for i in items if i["kind"] == "category"):
+        try:
+            async for _, book_urls in iter_listing_pages(client, item["_id"]):
+                await queue.enqueue([{"_id": url, "kind": "book", "category": item["_id"]} for url in book_urls])
+            done.append(item["_id"])
+        except Exception as e:
+            print(f"❌ Failed to walk {item['_id']}: {e}")
+
+    books = [(item["_id"], item["category"]) for item in items if item["kind"] == "book"]
+    if books:
+        recorder = LeaseRecorder()
+        pipeline = CrawlPipeline(client, store_books, journal=recorder, store_batch_size=SINK_BATCH_SIZE)
+        await pipeline.run([], books)
+        done.extend(url for url, _ in books if url in recorder.stored)
+
+    await queue.complete(owner, done)
+    finished = set(done)
+    await queue.release(owner, [item["_id"] for item in items if item["_id"] not in finished])
+    return done
+
+
+async def run_worker(client: httpx.AsyncClient, queue=None, owner: str | None = None,
+                     batch_size: int = CRAWL_WORKER_BATCH, idle_seconds: float = CRAWL_WORKER_IDLE_SECONDS):
+    """Claim batches until nothing is pending or leased by anyone.
+
+    ``claim`` first fails items that are out of attempts, so an expired
+    final-attempt lease does not keep the queue looking busy.
+    """
+    queue = queue or db.work_queue
+    owner = owner or f"{socket.gethostname()}-{os.getpid()}"
+    while True:
+        items = await queue.claim(owner, batch_size)
+        if not items:
+            counts = await queue.counts()
+            if not counts.get(PENDING) and not counts.get(LEASED):
+                return counts
+            # Others are still working (and may enqueue books or let leases expire)
+            await asyncio.sleep(idle_seconds)
+            continue
+        renewer = asyncio.create_task(_keep_leases(queue, owner, [item["_id"] for item in items]))
+        try:
+            done = await process_batch(client, queue, owner, items)
+        finally:
+            renewer.cancel()
+        run_stats["queue_items_done"] += len(done)
+        run_stats["queue_items_released"] += len(items) - len(done)
+        print(f"✅ {owner}: {len(done)}/{len(items)} items done")
+
+
+async def main(seed_only: bool = False):
+    await db.connect()
+    reset_run_stats()
+    # One file / Pushgateway group per replica
+    async with exporting_metrics(f"crawler_worker_{socket.gethostname()}"):
+        try:
+            await _work(seed_only)
+        finally:
+            # Also when the run raises: don't leave parser processes behind
+            shutdown_parse_executor()
+
+
+async def _work(seed_only: bool):
+    async with build_client() as client:
+        if seed_only:
+            await seed(client)
+        else:
+            counts = await run_worker(client)
+            print(f"📊 Queue: {counts}")
+            await db.sink.flush()
+            await rebuild_category_stats()
+    shutdown_parse_executor()
+    await db.close()
+    run_stats["books_written"] = db.sink.written
+    print(f"📊 Run summary: {format_run_summary()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Distributed crawl worker")
+    parser.add_argument("--seed", action="store_true", help="reset the queue and enqueue all categories")
+    args = parser.parse_args()
+    asyncio.run(main(seed_only=args.seed))
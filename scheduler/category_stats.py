@@ -0,0 +1,93 @@
+# scheduler/category_stats.py
+"""Materialized per-category facets for GET /books/facets.
+
+``category_stats`` holds one document per category: book and in-stock
+counts, price sum/min/max and a rating histogram. Change detection keeps
+it current with ``$inc`` deltas; ``rebuild_category_stats`` recomputes it
+from ``books`` in one aggregation (after every crawl and daily run, or for
+recovery):
+
+    python -m scheduler.category_stats
+
+``$min``/``$max`` can only widen the price range, so a category's range
+may stay wider than its books until the rebuild at the end of the run.
+"""
+import asyncio
+from pymongo import UpdateOne
+from crawler.storage import db
+
+UNKNOWN_CATEGORY = "Unknown"
+
+
+def add_book_delta(deltas: dict, book: dict, sign: int = 1):
+    """Add (sign=1) or remove (sign=-1) a book's contribution to ``deltas``, keyed by category."""
+    delta = deltas.setdefault(book.get("category") or UNKNOWN_CATEGORY, {"inc": {}, "prices": []})
+    inc = delta["inc"]
+    price = book.get("price_incl_tax") or 0.0
+    inc["books"] = inc.get("books", 0) + sign
+    inc["in_stock"] = inc.get("in_stock", 0) + sign * ((book.get("availability_count") or 0) > 0)
+    inc["price_sum"] = inc.get("price_sum", 0.0) + sign * price
+    rating_key = f"rating_hist.{book.get('rating') or 0}"
+    inc[rating_key] = inc.get(rating_key, 0) + sign
+    if sign > 0:
+        delta["prices"].append(price)
+
+
+def category_stats_updates(deltas: dict) -> list[UpdateOne]:
+    """One upsert per touched category; zero deltas are dropped."""
+    updates = []
+    for category, delta in deltas.items():
+        update = {}
+        inc = {key: value for key, value in delta["inc"].items() if value}
+        if inc:
+            update["$inc"] = inc
+        if delta["prices"]:
+            update["$min"] = {"price_min": min(delta["prices"])}
+            update["$max"] = {"price_max": max(delta["prices"])}
+        if update:
+            updates.append(UpdateOne({"_id": category}, update, upsert=True))
+    return updates
+
+
+def rebuild_pipeline() -> list[dict]:
+    """books → category_stats, replacing the collection when done."""
+    return [
+        {"$group": {
+            "_id": {"category": {"$ifNull": ["$category", UNKNOWN_CATEGORY]}, "rating": {"$ifNull": ["$rating", 0]}},
+            "books": {"$sum": 1},
+            "in_stock": {"$sum": {"$cond": [{"$gt": ["$availability_count", 0]}, 1, 0]}},
+            "price_sum": {"$sum": "$price_incl_tax"},
+            "price_min": {"$min": "$price_incl_tax"},
+            "price_max": {"$max": "$price_incl_tax"},
+        }},
+        {"$group": {
+            "_id": "$_id.category",
+            "books": {"$sum": "$books"},
+            "in_stock": {"$sum": "$in_stock"},
+            "price_sum": {"$sum": "$price_sum"},
+            "price_min": {"$min": "$price_min"},
+            "price_max": {"$max": "$price_max"},
+            "ratings": {"$push": {"k": {"$toString": "$_id.rating"}, "v": "$books"}},
+        }},
+        {"$set": {"rating_hist": {"$arrayToObject": "$ratings"}}},
+        {"$unset": "ratings"},
+        {"$out": "category_stats"},
+    ]
+
+
+async def rebuild_category_stats():
+    await db.books.aggregate(rebuild_pipeline()).to_list(length=None)
+    await db.bump_catalog_version()
+    print("📊 category_stats rebuilt from books")
+
+
+async def main():
+    await db.connect()
+    try:
+        await rebuild_category_stats()
+    finally:
+        await db.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -2,8 +2,13 @@
 import hashlib
 import json
 import logging
-from datetime import datetime
-from crawler.storage import db
+from datetime import datetime, timedelta
+from pymongo import InsertOne, ReplaceOne, UpdateOne
+from crawler.config import LISTING_SNAPSHOT_MAX_AGE_HOURS
+from crawler.storage import db, detach_html
+from crawler.stats import run_stats, BOOKS_CHANGED, CHANGE_DETECT_SECONDS, MONGO_WRITE_SECONDS
+from scheduler.rollups import observation
+from scheduler.category_stats import add_book_delta, category_stats_updates
 
 # Alert logger setup
 alert_logger = logging.getLogger("alerts")
@@ -12,6 +17,9 @@ if not alert_logger.handlers:
     alert_logger.addHandler(handler)
     alert_logger.setLevel(logging.WARNING)
 
+# Fields whose old/new values are recorded for updated books
+TRACKED_FIELDS = ["price_incl_tax", "availability_count", "rating"]
+
 def compute_fingerprint(book_dict: dict) -> str:  # ← Line 23: FIXED PARAM NAME & PARENTHESIS
     """Generate SHA-256 fingerprint of key book fields."""
     core = {
@@ -23,36 +31,193 @@ def compute_fingerprint(book_dict: dict) -> str:  # ← Line 23: FIXED PARAM NAM
     blob = json.dumps(core, sort_keys=True, default=str)
     return hashlib.sha256(blob.encode("utf-8")).hexdigest()
 
+def listing_differs(snapshot: dict, stored: dict) -> bool:
+    """Whether the listing shows a price, stock or rating other than the stored book's."""
+    if snapshot.get("price_incl_tax") is None or snapshot.get("in_stock") is None:
+        return True
+    return (
+        round(snapshot["price_incl_tax"], 2) != round(stored.get("price_incl_tax") or 0.0, 2)
+        or snapshot["in_stock"] != ((stored.get("availability_count") or 0) > 0)
+        or snapshot.get("rating") != stored.get("rating")
+    )
+
+
+async def select_books_to_fetch(snapshots: list[dict], max_age_hours: float = LISTING_SNAPSHOT_MAX_AGE_HOURS) -> list[str]:
+    """URLs from a listing page whose detail page must be fetched.
+
+    That is new books, books whose listing data differs from the stored
+    document, and books whose last full fetch (``verified_at``) is older
+    than ``max_age_hours``. Costs one projected read per listing page.
+    """
+    if not snapshots:
+        return []
+    stored = {
+        doc["url"]: doc async for doc in db.books.find(
+            {"url": {"$in": [snapshot["url"] for snapshot in snapshots]}},
+            {"_id": 0, "url": 1, "category": 1, "price_incl_tax": 1, "availability_count": 1, "rating": 1,
+             "verified_at": 1}
+        )
+    }
+    now = datetime.utcnow()
+    fresh_after = now - timedelta(hours=max_age_hours)
+    wanted = []
+    confirmed = []
+    for snapshot in snapshots:
+        existing = stored.get(snapshot["url"])
+        if (
+            existing is None
+            or listing_differs(snapshot, existing)
+            or not existing.get("verified_at")
+            or existing["verified_at"] < fresh_after
+        ):
+            wanted.append(snapshot["url"])
+        else:
+            # The listing confirms the stored values: that is today's observation
+            confirmed.append(observation(existing, now))
+    await record_observations(confirmed)
+    return wanted
+
+
+async def mark_verified(urls: list[str]):
+    """Record a full check of books whose detail page was not modified.
+
+    One projected read, one update_many and one insert_many per batch.
+    """
+    if not urls:
+        return
+    now = datetime.utcnow()
+    books = [
+        doc async for doc in db.books.find(
+            {"url": {"$in": urls}},
+            {"_id": 0, "url": 1, "category": 1, "price_incl_tax": 1, "availability_count": 1, "rating": 1}
+        )
+    ]
+    with MONGO_WRITE_SECONDS.time(collection="books"):
+        await db.books.update_many({"url": {"$in": urls}}, {"$set": {"verified_at": now}})
+    await record_observations([observation(book, now) for book in books])
+
+
+async def record_observations(docs: list[dict]):
+    """Append to the price/stock time series (see scheduler.rollups)."""
+    if not docs:
+        return
+    with MONGO_WRITE_SECONDS.time(collection="book_observations"):
+        await db.observations.insert_many(docs, ordered=False)
+
+
 async def detect_and_log_changes(current_book: dict):
     """Detect changes and log to database."""
-    # ← USE current_book (function parameter), NOT book_data
-    current_book["fingerprint"] = compute_fingerprint(current_book)  # Line 26
-    current_book["crawled_at"] = current_book.get("crawled_at") or datetime.utcnow()
-
-    existing = await db.books.find_one({"url": current_book["url"]})  # Line 29
-
-    if not existing:
-        await db.books.insert_one(current_book)
-        await db.change_log.insert_one({
-            "book_url": current_book["url"],
-            "change_type": "new",
-            "detected_at": current_book["crawled_at"],
-            "details": {"title": current_book["title"]}
-        })
-    elif existing.get("fingerprint") != current_book["fingerprint"]:
-        # Updated book
-        await db.books.replace_one({"url": current_book["url"]}, current_book)
-        # Log specific field changes (simplified)
-        changes = {}
-        for field in ["price_incl_tax", "availability_count", "rating"]:
-            if existing.get(field) != current_book[field]:
-                changes[field] = {
-                    "old": existing.get(field),
-                    "new": current_book[field]
-                }
-        await db.change_log.insert_one({
-            "book_url": current_book["url"],
-            "change_type": "updated",
-            "detected_at": current_book["crawled_at"],
-            "changes": changes
-        })
\ No newline at end of file
+    await detect_and_log_changes_batch([current_book])
+
+
+async def detect_and_log_changes_batch(books: list[dict]):
+    """Detect and log changes for a batch of books, e.g. one listing page.
+
+    Uses two projected reads (fingerprints for the whole batch, old field
+    values for mismatches only) and one bulk_write per collection.
+    """
+    if not books:
+        return
+    with CHANGE_DETECT_SECONDS.time():
+        await _detect_and_log_changes_batch(books)
+
+
+async def _detect_and_log_changes_batch(books: list[dict]):
+    now = datetime.utcnow()
+    current = {}
+    html_by_hash = {}
+    for book in books:
+        book["fingerprint"] = compute_fingerprint(book)
+        book["crawled_at"] = book.get("crawled_at") or now
+        book["verified_at"] = now
+        html = detach_html(book)
+        if html is not None:
+            html_by_hash[book["html_hash"]] = html
+        current[book["url"]] = book
+
+    stored = {
+        doc["url"]: doc async for doc in db.books.find(
+            {"url": {"$in": list(current)}},
+            {"_id": 0, "url": 1, "fingerprint": 1, "html_hash": 1, "etag": 1, "last_modified": 1}
+        )
+    }
+
+    changed_urls = [
+        url for url, book in current.items()
+        if url in stored and stored[url].get("fingerprint") != book["fingerprint"]
+    ]
+    previous = {}
+    if changed_urls:
+        projection = {"_id": 0, "url": 1, "category": 1, **{field: 1 for field in TRACKED_FIELDS}}
+        previous = {
+            doc["url"]: doc async for doc in db.books.find({"url": {"$in": changed_urls}}, projection)
+        }
+
+    book_writes = []
+    log_entries = []
+    stats_deltas = {}
+    refreshed = False
+    for url, book in current.items():
+        existing = stored.get(url)
+        if existing is None:
+            book_writes.append(ReplaceOne({"url": url}, book, upsert=True))
+            log_entries.append(InsertOne({
+                "book_url": url,
+                "change_type": "new",
+                "category": book.get("category"),
+                "detected_at": book["crawled_at"],
+                "details": {"title": book["title"]}
+            }))
+            run_stats["books_new"] += 1
+            BOOKS_CHANGED.inc(change_type="new")
+            add_book_delta(stats_deltas, book)
+        elif url in previous:
+            # Updated book
+            book_writes.append(ReplaceOne({"url": url}, book))
+            old = previous[url]
+            changes = {}
+            for field in TRACKED_FIELDS:
+                if old.get(field) != book[field]:
+                    changes[field] = {
+                        "old": old.get(field),
+                        "new": book[field]
+                    }
+            log_entries.append(InsertOne({
+                "book_url": url,
+                "change_type": "updated",
+                "category": book.get("category"),
+                "detected_at": book["crawled_at"],
+                "changed_fields": list(changes),  # multikey-indexed for the change feed's field filter
+                "changes": changes
+            }))
+            run_stats["books_updated"] += 1
+            BOOKS_CHANGED.inc(change_type="updated")
+            add_book_delta(stats_deltas, old, -1)
+            add_book_delta(stats_deltas, book)
+        else:
+            run_stats["books_unchanged"] += 1
+            # Keep the HTTP validators and page hash current for the next run,
+            # and note when the book was last fully checked
+            validators = {key: book.get(key) for key in ("etag", "last_modified", "html_hash")}
+            if any(existing.get(key) != value for key, value in validators.items()):
+                refreshed = True
+            book_writes.append(UpdateOne({"url": url}, {"$set": {**validators, "verified_at": now}}))
+
+    # Page bodies that are already stored under the same hash are skipped
+    known_hashes = {doc.get("html_hash") for doc in stored.values()}
+    await db.html_store.put_many({h: html for h, html in html_by_hash.items() if h not in known_hashes})
+    if book_writes:
+        with MONGO_WRITE_SECONDS.time(collection="books"):
+            await db.books.bulk_write(book_writes, ordered=False)
+    if log_entries:
+        with MONGO_WRITE_SECONDS.time(collection="change_log"):
+            await db.change_log.bulk_write(log_entries, ordered=False)
+    stats_updates = category_stats_updates(stats_deltas)
+    if stats_updates:
+        with MONGO_WRITE_SECONDS.time(collection="category_stats"):
+            await db.category_stats.bulk_write(stats_updates, ordered=False)
+    # Every fully checked book is an observation, changed or not
+    await record_observations([observation(book, now) for book in current.values()])
+    # A verified_at refresh alone doesn't change catalog data, so caches stay valid
+    if log_entries or refreshed:
+        await db.bump_catalog_version()
@@ -1,27 +1,170 @@
 # scheduler/reports.py
+"""Change reports built from the change_log collection.
+
+Counts and breakdowns come from one aggregation; the change entries are
+streamed from a cursor into the file, so memory stays flat however many
+books changed. Any date range can be reported from the command line:
+
+    python -m scheduler.reports --start 2025-10-01 --end 2025-10-07 --gzip --chunk-size 10000
+"""
+import argparse
+import asyncio
+import gzip
 import json
-from datetime import datetime, timezone
-from crawler.storage import db
 import os
+from datetime import date, datetime, timedelta, timezone
+from crawler.config import REPORTS_DIR, REPORT_GZIP, REPORT_CHUNK_SIZE
+from crawler.storage import db
+
+
+def _direction(field: str) -> dict:
+    return {"$cond": [{"$gt": [f"$changes.{field}.new", f"$changes.{field}.old"]}, "up", "down"]}
+
+
+def report_pipeline(start: datetime, end: datetime) -> list[dict]:
+    """Aggregation computing every count of a report over [start, end)."""
+    old_stock, new_stock = "$changes.availability_count.old", "$changes.availability_count.new"
+    stock_move = {"$switch": {
+        "branches": [
+            {"case": {"$and": [{"$lte": [old_stock, 0]}, {"$gt": [new_stock, 0]}]}, "then": "back_in_stock"},
+            {"case": {"$and": [{"$gt": [old_stock, 0]}, {"$lte": [new_stock, 0]}]}, "then": "out_of_stock"},
+            {"case": {"$gt": [new_stock, old_stock]}, "then": "up"},
+        ],
+        "default": "down",
+    }}
+
+    def moves(field: str, bucket) -> list[dict]:
+        return [
+            {"$match": {f"changes.{field}": {"$exists": True}}},
+            {"$group": {"_id": bucket, "count": {"$sum": 1}}},
+        ]
+
+    return [
+        {"$match": {"detected_at": {"$gte": start, "$lt": end}}},
+        {"$facet": {
+            "by_type": [{"$group": {"_id": "$change_type", "count": {"$sum": 1}}}],
+            "price": moves("price_incl_tax", _direction("price_incl_tax")),
+            "stock": moves("availability_count", stock_move),
+            "rating": moves("rating", _direction("rating")),
+            "by_category": [{"$group": {
+                "_id": {"category": {"$ifNull": ["$category", "Unknown"]}, "type": "$change_type"},
+                "count": {"$sum": 1},
+            }}],
+        }},
+    ]
+
+
+def summarize_facets(facets: dict) -> dict:
+    """Turn the $facet output into the report's summary fields."""
+    by_type = {row["_id"]: row["count"] for row in facets.get("by_type", [])}
+    by_category = {}
+    for row in facets.get("by_category", []):
+        key = row["_id"]
+        by_category.setdefault(key["category"], {})[key["type"]] = row["count"]
+    return {
+        "total_changes": sum(by_type.values()),
+        "new_books": by_type.get("new", 0),
+        "updated_books": by_type.get("updated", 0),
+        "price": {row["_id"]: row["count"] for row in facets.get("price", [])},
+        "stock": {row["_id"]: row["count"] for row in facets.get("stock", [])},
+        "rating": {row["_id"]: row["count"] for row in facets.get("rating", [])},
+        "by_category": dict(sorted(by_category.items())),
+    }
+
+
+def _open(path: str, compress: bool):
+    return gzip.open(path, "wt", encoding="utf-8") if compress else open(path, "w", encoding="utf-8")
+
+
+async def write_report(path: str, header: dict, entries, compress: bool = False,
+                       chunk_size: int = 0) -> list[str]:
+    """Write ``header`` plus the streamed ``entries``; returns the files written.
+
+    With ``chunk_size`` the entries go to NDJSON part files next to the
+    report, which lists them under ``change_files``; otherwise they are
+    written inline as the ``changes`` array.
+    """
+    suffix = ".gz" if compress else ""
+    parts = []
+    if chunk_size:
+        base = path[:-len(".json")] if path.endswith(".json") else path
+        part = None
+        count = 0
+        try:
+            async for entry in entries:
+                if count % chunk_size == 0:
+                    if part is not None:
+                        part.close()
+                    parts.append(f"{base}.part-{len(parts) + 1:04d}.ndjson{suffix}")
+                    part = _open(parts[-1], compress)
+                part.write(json.dumps(entry, default=str) + "\n")
+                count += 1
+        finally:
+            if part is not None:
+                part.close()
+        header = {**header, "change_files": [os.path.basename(p) for p in parts]}
+
+    report_path = path + suffix
+    with _open(report_path, compress) as f:
+        f.write("{\n")
+        for key, value in header.items():
+            f.write(f"  {json.dumps(key)}: {json.dumps(value, default=str)},\n")
+        f.write('  "changes": [')
+        first = True
+        if not chunk_size:
+            async for entry in entries:
+                f.write(("\n    " if first else ",\n    ") + json.dumps(entry, default=str))
+                first = False
+        f.write("]\n}\n" if first else "\n  ]\n}\n")
+    return [report_path, *parts]
+
+
+async def generate_report(start: date, end: date, compress: bool = REPORT_GZIP,
+                          chunk_size: int = REPORT_CHUNK_SIZE, out_dir: str = REPORTS_DIR) -> list[str]:
+    """Report of the changes detected from ``start`` through ``end`` (inclusive, UTC days)."""
+    start_at = datetime.combine(start, datetime.min.time(), tzinfo=timezone.utc)
+    end_at = datetime.combine(end + timedelta(days=1), datetime.min.time(), tzinfo=timezone.utc)
+
+    facets = await db.change_log.aggregate(report_pipeline(start_at, end_at)).to_list(length=1)
+    header = {"report_date": start.isoformat()}
+    if end != start:
+        header["report_end"] = end.isoformat()
+    header.update(summarize_facets(facets[0] if facets else {}))
+
+    entries = (
+        db.change_log.find({"detected_at": {"$gte": start_at, "$lt": end_at}})
+        .sort("detected_at", 1)
+        .batch_size(1000)
+    )
+    label = start.isoformat() if end == start else f"{start}_{end}"
+    os.makedirs(out_dir, exist_ok=True)
+    files = await write_report(
+        os.path.join(out_dir, f"change_report_{label}.json"), header, entries, compress, chunk_size
+    )
+    print(f"📄 Report saved: {', '.join(files)}")
+    return files
+
 
 async def generate_daily_report():
     today = datetime.now(timezone.utc).date()
-    start_of_day = datetime.combine(today, datetime.min.time(), tzinfo=timezone.utc)
-
-    changes = await db.change_log.find(
-        {"detected_at": {"$gte": start_of_day}}
-    ).to_list(length=None)
-
-    report = {
-        "report_date": today.isoformat(),
-        "total_changes": len(changes),
-        "new_books": len([c for c in changes if c["change_type"] == "new"]),
-        "updated_books": len([c for c in changes if c["change_type"] == "updated"]),
-        "changes": changes
-    }
+    return await generate_report(today, today)
+
+
+async def main(args):
+    await db.connect()
+    try:
+        await generate_report(args.start, args.end or args.start, args.gzip, args.chunk_size, args.out)
+    finally:
+        await db.close()
+
 
-    os.makedirs("reports", exist_ok=True)
-    filename = f"reports/change_report_{today}.json"
-    with open(filename, "w") as f:
-        json.dump(report, f, indent=2, default=str)
-    print(f"📄 Daily report saved: {filename}")
\ No newline at end of file
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write a change report for a date range")
+    parser.add_argument("--start", type=date.fromisoformat, default=datetime.now(timezone.utc).date(),
+                        help="first day (YYYY-MM-DD, UTC); default today")
+    parser.add_argument("--end", type=date.fromisoformat, help="last day, inclusive; default --start")
+    parser.add_argument("--gzip", action="store_true", default=REPORT_GZIP, help="gzip the report files")
+    parser.add_argument("--chunk-size", type=int, default=REPORT_CHUNK_SIZE,
+                        help="entries per NDJSON part file (0 = inline in the report)")
+    parser.add_argument("--out", default=REPORTS_DIR, help="output directory")
+    asyncio.run(main(parser.parse_args()))
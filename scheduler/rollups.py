@@ -0,0 +1,122 @@
+# scheduler/rollups.py
+"""Price and stock history: raw observations plus daily rollups.
+
+Every full check of a book appends an observation to the
+``book_observations`` time-series collection. ``run_rollups`` then folds
+the days since its last run into ``book_daily`` (per book) and
+``category_daily`` (per category), which the API's history endpoints
+read instead of scanning observations. Backfill or rebuild a range with:
+
+    python -m scheduler.rollups --start 2025-07-01 --end 2025-09-30
+"""
+import argparse
+import asyncio
+from datetime import date, datetime, timedelta
+from crawler.storage import db
+
+ROLLUP_WATERMARK_ID = "rollup_watermark"
+
+
+def observation(book: dict, observed_at: datetime) -> dict:
+    """Observation document for a book (or a stored book confirmed by its listing)."""
+    availability = book.get("availability_count") or 0
+    return {
+        "observed_at": observed_at,
+        "meta": {"book_url": book["url"], "category": book.get("category")},
+        "price_incl_tax": book.get("price_incl_tax"),
+        "availability_count": availability,
+        "in_stock": availability > 0,
+        "rating": book.get("rating"),
+    }
+
+
+def _day_start(day: date) -> datetime:
+    return datetime.combine(day, datetime.min.time())
+
+
+def book_daily_pipeline(start: datetime, end: datetime) -> list[dict]:
+    """Observations in [start, end) → one book_daily document per book and day."""
+    return [
+        {"$match": {"observed_at": {"$gte": start, "$lt": end}}},
+        {"$sort": {"observed_at": 1}},
+        {"$group": {
+            "_id": {
+                "book_url": "$meta.book_url",
+                "day": {"$dateTrunc": {"date": "$observed_at", "unit": "day"}},
+            },
+            "category": {"$last": "$meta.category"},
+            "price_min": {"$min": "$price_incl_tax"},
+            "price_max": {"$max": "$price_incl_tax"},
+            "price_avg": {"$avg": "$price_incl_tax"},
+            "price_last": {"$last": "$price_incl_tax"},
+            "availability_last": {"$last": "$availability_count"},
+            "in_stock": {"$last": "$in_stock"},
+            "rating": {"$last": "$rating"},
+            "observations": {"$sum": 1},
+        }},
+        {"$set": {"book_url": "$_id.book_url", "day": "$_id.day"}},
+        {"$unset": "_id"},
+        {"$merge": {"into": "book_daily", "on": ["book_url", "day"],
+                    "whenMatched": "replace", "whenNotMatched": "insert"}},
+    ]
+
+
+def category_daily_pipeline(start: datetime, end: datetime) -> list[dict]:
+    """book_daily in [start, end) → one category_daily document per category and day."""
+    return [
+        {"$match": {"day": {"$gte": start, "$lt": end}}},
+        {"$group": {
+            "_id": {"category": {"$ifNull": ["$category", "Unknown"]}, "day": "$day"},
+            "books": {"$sum": 1},
+            "books_in_stock": {"$sum": {"$cond": ["$in_stock", 1, 0]}},
+            "price_min": {"$min": "$price_min"},
+            "price_max": {"$max": "$price_max"},
+            "price_avg": {"$avg": "$price_last"},
+        }},
+        {"$set": {"category": "$_id.category", "day": "$_id.day"}},
+        {"$unset": "_id"},
+        {"$merge": {"into": "category_daily", "on": ["category", "day"],
+                    "whenMatched": "replace", "whenNotMatched": "insert"}},
+    ]
+
+
+async def rollup_days(start: date, end: date):
+    """(Re)compute the rollups of every day from ``start`` through ``end``."""
+    start_at, end_at = _day_start(start), _day_start(end + timedelta(days=1))
+    # Each pipeline ends in $merge, so iterating just runs it
+    await db.observations.aggregate(book_daily_pipeline(start_at, end_at)).to_list(length=None)
+    await db.book_daily.aggregate(category_daily_pipeline(start_at, end_at)).to_list(length=None)
+
+
+async def run_rollups(today: date | None = None):
+    """Roll up the days since the last run; the last rolled day is redone, as it may have been partial."""
+    today = today or datetime.utcnow().date()
+    watermark = await db.meta.find_one({"_id": ROLLUP_WATERMARK_ID})
+    if watermark:
+        start = watermark["day"].date()
+    else:
+        first = await db.observations.find_one({}, {"observed_at": 1}, sort=[("observed_at", 1)])
+        if first is None:
+            return
+        start = first["observed_at"].date()
+    await rollup_days(start, today)
+    await db.meta.update_one({"_id": ROLLUP_WATERMARK_ID}, {"$set": {"day": _day_start(today)}}, upsert=True)
+    # History responses are cached under the catalog version
+    await db.bump_catalog_version()
+    print(f"📈 Daily rollups updated for {start} → {today}")
+
+
+async def main(args):
+    await db.connect()
+    try:
+        await rollup_days(args.start, args.end or datetime.utcnow().date())
+        await db.bump_catalog_version()
+    finally:
+        await db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recompute daily price/stock rollups for a date range")
+    parser.add_argument("--start", type=date.fromisoformat, required=True, help="first day (YYYY-MM-DD, UTC)")
+    parser.add_argument("--end", type=date.fromisoformat, help="last day, inclusive; default today")
+    asyncio.run(main(parser.parse_args()))
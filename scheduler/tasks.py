@@ -1,79 +1,81 @@
 # scheduler/tasks.py
-import asyncio
 import httpx
-from selectolax.parser import HTMLParser
-from urllib.parse import urljoin
-from crawler.config import BASE_URL
-from crawler.parser import parse_book_page
-from scheduler.change_detector import detect_and_log_changes
+from crawler.archive import recording
+from crawler.config import LISTING_SNAPSHOT_MODE
+from crawler.executor import shutdown_parse_executor
+from crawler.pipeline import CrawlPipeline
+from crawler.scraper import fetch_seed_urls
+from crawler.transport import build_client
+from crawler.stats import reset_run_stats, format_run_summary
+from scheduler.change_detector import detect_and_log_changes_batch, mark_verified, select_books_to_fetch
 from scheduler.reports import generate_daily_report
+from scheduler.rollups import run_rollups
+from scheduler.category_stats import rebuild_category_stats
 from crawler.storage import db
+from app.core.metrics import exporting_metrics
 
 
-async def crawl_book_with_change_detection(client: httpx.AsyncClient, url: str):
-    """Fetch and parse a single book page, then run change detection."""
-    try:
-        response = await client.get(url, timeout=10.0)
-        response.raise_for_status()
-        html = response.text
-        book_data = parse_book_page(url, html)
-        await detect_and_log_changes(book_data)
-    except Exception as e:
-        print(f"❌ Failed to process {url}: {e}")
+def change_detection_pipeline(client: httpx.AsyncClient, **kwargs) -> CrawlPipeline:
+    """Pipeline that stores through change detection.
+
+    In listing snapshot mode only new, changed or stale books have their
+    detail page fetched; the rest are judged from the category listing.
+    Snapshot mode is off while recording an archive, which must hold
+    every book page.
+    """
+    if LISTING_SNAPSHOT_MODE and not recording():
+        kwargs.setdefault("listing_filter", select_books_to_fetch)
+        kwargs.setdefault("on_not_modified", mark_verified)
+    return CrawlPipeline(client, detect_and_log_changes_batch, **kwargs)
 
 
 async def crawl_category_for_changes(client: httpx.AsyncClient, category_url: str):
     """Crawl all books in a category and apply change detection."""
-    page = 1
-    while True:
-        url = category_url if page == 1 else category_url.replace("index.html", f"page-{page}.html")
-        try:
-            response = await client.get(url)
-            response.raise_for_status()
-        except httpx.HTTPStatusError as e:
-            if e.response.status_code == 404:
-                break
-            raise
-
-        tree = HTMLParser(response.text)
-        book_links = tree.css("article.product_pod h3 a")
-        if not book_links:
-            break
+    await change_detection_pipeline(client).run([category_url])
 
-        book_urls = []
-        for link in book_links:
-            href = link.attributes.get("href")
-            if href:
-                clean_href = href.replace("../", "")
-                full_url = urljoin("https://books.toscrape.com/catalogue/", clean_href)
-                book_urls.append(full_url)
-        await asyncio.gather(*[crawl_book_with_change_detection(client, u) for u in book_urls])
-        page += 1
 
-
-async def run_full_crawl_and_detect_changes():
+async def run_full_crawl_and_detect_changes(transport: httpx.AsyncBaseTransport | None = None):
     """Main entry point for daily crawl + change detection."""
     print("🔍 Starting full crawl and change detection...")
+    reset_run_stats()
     await db.connect()
+    async with exporting_metrics("scheduler"):
+        try:
+            return await _crawl_and_report(transport)
+        finally:
+            # Also when the run raises: don't leave parser processes behind
+            shutdown_parse_executor()
 
-    async with httpx.AsyncClient(base_url=BASE_URL) as client:
-        # Get categories
-        resp = await client.get("")
-        tree = HTMLParser(resp.text)
-        category_links = tree.css(".side_categories a")[1:]
-        category_urls = [
-            urljoin(BASE_URL, link.attributes["href"]) for link in category_links
-        ]
 
+async def _crawl_and_report(transport: httpx.AsyncBaseTransport | None) -> dict:
+    async with build_client(transport) as client:
+        # Get categories
+        category_urls = await fetch_seed_urls(client)
         print(f"📚 Processing {len(category_urls)} categories...")
-        for i, cat_url in enumerate(category_urls, 1):
-            print(f"  {i}/{len(category_urls)}: {cat_url}")
-            await crawl_category_for_changes(client, cat_url)
 
+        finished = 0
+
+        async def report_category(cat_url):
+            nonlocal finished
+            finished += 1
+            print(f"  {finished}/{len(category_urls)}: {cat_url}")
+
+        # Change detection runs on each stored batch of parsed books
+        pipeline = change_detection_pipeline(client, on_category_done=report_category)
+        stats = await pipeline.run(category_urls)
+        print(f"📈 {pipeline.format_stats()}")
+
+    shutdown_parse_executor()
+    # The $inc deltas keep counts current, but $min/$max only widen price
+    # ranges: recompute them once per run
+    await rebuild_category_stats()
+    await run_rollups()
     await generate_daily_report()
     await db.close()
+    print(f"📊 Run summary: {format_run_summary()}")
     print("✅ Daily crawl and change detection completed.")
+    return stats
 
 if __name__ == "__main__":
     import asyncio
-    asyncio.run(run_full_crawl_and_detect_changes())
\ No newline at end of file
+    asyncio.run(run_full_crawl_and_detect_changes())
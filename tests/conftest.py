@@ -0,0 +1,129 @@
+# tests/conftest.py
+"""In-memory stand-ins for Motor collections, shared by the scheduler and API tests."""
+import pytest
+from bson import ObjectId
+from pymongo.errors import OperationFailure
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = list(docs)
+
+    def sort(self, key, direction=1):
+        self.docs.sort(key=lambda doc: doc[key], reverse=direction < 0)
+        return self
+
+    def limit(self, n):
+        self.docs = self.docs[:n]
+        return self
+
+    async def to_list(self, length=None):
+        return self.docs[:length] if length else list(self.docs)
+
+    def __aiter__(self):
+        self._iter = iter(self.docs)
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._iter)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+def matches(doc: dict, query: dict) -> bool:
+    """Equality, membership in array fields, $in and $gt/$gte/$lt."""
+    for key, condition in query.items():
+        value = doc.get(key)
+        if isinstance(condition, dict):
+            for op, arg in condition.items():
+                if op == "$in" and value not in arg:
+                    return False
+                if op == "$gt" and (value is None or not value > arg):
+                    return False
+                if op == "$gte" and (value is None or not value >= arg):
+                    return False
+                if op == "$lt" and (value is None or not value < arg):
+                    return False
+        elif isinstance(value, list):
+            if condition not in value:
+                return False
+        elif value != condition:
+            return False
+    return True
+
+
+class FakeCollection:
+    """Records reads and writes; ``aggregate`` logs its leading $match to ``calls`` under ``name``."""
+
+    def __init__(self, docs=(), name: str = "collection", calls: list | None = None):
+        self.docs = list(docs)
+        self.name = name
+        self.calls = calls if calls is not None else []
+        self.finds = []
+        self.bulk_writes = []
+        self.updates = []
+        self.inserts = 0
+
+    def add(self, **fields) -> dict:
+        """Insert a document with a fresh ObjectId, like a client-side insert."""
+        doc = {"_id": ObjectId(), **fields}
+        self.docs.append(doc)
+        return doc
+
+    def find(self, query, projection=None):
+        self.finds.append((query, projection))
+        docs = [doc for doc in self.docs if matches(doc, query)]
+        if projection:
+            docs = [{k: v for k, v in doc.items() if projection.get(k)} for doc in docs]
+        return FakeCursor(docs)
+
+    async def find_one(self, query, projection=None, sort=None):
+        docs = FakeCursor(doc for doc in self.docs if matches(doc, query))
+        if sort:
+            docs.sort(*sort[0])
+        return docs.docs[0] if docs.docs else None
+
+    async def update_one(self, query, update, upsert=False):
+        for doc in self.docs:
+            if matches(doc, query):
+                doc.update(update.get("$set", {}))
+                return
+        if upsert:
+            self.docs.append({**query, **update.get("$set", {})})
+
+    async def update_many(self, query, update):
+        self.updates.append((query, update))
+
+    async def bulk_write(self, requests, ordered=True):
+        self.bulk_writes.append(requests)
+
+    async def insert_many(self, docs, ordered=True):
+        self.inserts += 1
+        self.docs.extend(docs)
+
+    def aggregate(self, pipeline):
+        self.calls.append((self.name, pipeline[0].get("$match")))
+        return FakeCursor([])
+
+    def watch(self, pipeline):
+        # Like a standalone mongod: no change streams
+        raise OperationFailure("The $changeStream stage is only supported on replica sets", code=40573)
+
+
+class FakeHtmlStore:
+    def __init__(self):
+        self.pages = {}
+
+    async def put_many(self, pages):
+        self.pages.update(pages)
+
+
+@pytest.fixture
+def make_collection():
+    return FakeCollection
+
+
+@pytest.fixture
+def html_store():
+    return FakeHtmlStore()
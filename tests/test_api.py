@@ -4,11 +4,13 @@ from app.models.book import BookResponse
 
 API_KEY = "xT2fG9vLpQ8zRnK4mW7sY1aB3cE6hJ0"
 
+
 def test_invalid_api_key():
     client = TestClient(app)
     response = client.get("/books", headers={"X-API-Key": "wrong"})
     assert response.status_code == 403
 
+
 def test_books_endpoint():
     client = TestClient(app)
     response = client.get("/books?size=1", headers={"X-API-Key": API_KEY})
@@ -18,20 +20,134 @@ def test_books_endpoint():
     if data:
         BookResponse(**data[0])  # Validate schema
 
+
 def test_books_pagination():
     client = TestClient(app)
     response = client.get("/books?page=1&size=2", headers={"X-API-Key": API_KEY})
     assert response.status_code == 200
     assert len(response.json()) <= 2
 
+
 def test_get_book_by_id():
     client = TestClient(app)
     response = client.get("/books/68d8f15d3596606b883a8343", headers={"X-API-Key": API_KEY})
     if response.status_code == 200:  # Only if ID exists
         assert response.json()["id"] == "68d8f15d3596606b883a8343"
 
+
 def test_changes_endpoint():
     client = TestClient(app)
     response = client.get("/changes", headers={"X-API-Key": API_KEY})
     assert response.status_code == 200
-    assert isinstance(response.json(), list)
\ No newline at end of file
+    assert isinstance(response.json(), list)
+
+
+def test_ready_without_lifespan_is_unavailable():
+    client = TestClient(app)
+    response = client.get("/ready")
+    assert response.status_code == 503
+
+
+def test_books_invalid_cursor():
+    client = TestClient(app)
+    response = client.get("/books?cursor=not-a-cursor", headers={"X-API-Key": API_KEY})
+    assert response.status_code == 400
+
+
+def test_books_cursor_pagination():
+    client = TestClient(app)
+    first = client.get("/books?size=2&sort_by=price", headers={"X-API-Key": API_KEY})
+    assert first.status_code == 200
+    next_cursor = first.headers.get("X-Next-Cursor")
+    if next_cursor:  # Only if there is more than one page
+        second = client.get(f"/books?size=2&sort_by=price&cursor={next_cursor}", headers={"X-API-Key": API_KEY})
+        assert second.status_code == 200
+        first_ids = {b["id"] for b in first.json()}
+        assert not first_ids & {b["id"] for b in second.json()}
+
+
+def test_cursor_roundtrip():
+    from bson import ObjectId
+    from app.core.pagination import encode_cursor, decode_cursor
+    oid = ObjectId()
+    position = decode_cursor(encode_cursor("price", 51.77, oid))
+    assert position == {"sort_by": "price", "value": 51.77, "id": oid}
+
+
+def test_export_invalid_format():
+    client = TestClient(app)
+    response = client.get("/books/export?format=xml", headers={"X-API-Key": API_KEY})
+    assert response.status_code == 400
+
+
+def test_export_ndjson():
+    import json
+    client = TestClient(app)
+    response = client.get("/books/export?format=ndjson&rating=5", headers={"X-API-Key": API_KEY})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    for line in response.text.splitlines():
+        assert "raw_html" not in json.loads(line)
+
+
+def test_metrics_endpoint():
+    client = TestClient(app)
+    client.get("/health")
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'api_request_seconds_count{route="/health",method="GET",status="200"}' in response.text
+
+
+def test_change_feed_endpoint():
+    client = TestClient(app)
+    response = client.get("/changes/feed?limit=5", headers={"X-API-Key": API_KEY})
+    assert response.status_code == 200
+    assert len(response.json()) <= 5
+    cursor = response.headers.get("X-Next-Cursor")
+    if cursor:
+        response = client.get(f"/changes/feed?after_id={cursor}", headers={"X-API-Key": API_KEY})
+        assert all(entry["id"] > cursor for entry in response.json())
+
+
+def test_change_feed_rejects_bad_cursor():
+    client = TestClient(app)
+    response = client.get("/changes/feed?after_id=nope", headers={"X-API-Key": API_KEY})
+    assert response.status_code == 400
+
+
+def test_category_daily_stats_endpoint():
+    client = TestClient(app)
+    response = client.get("/stats/categories/Poetry/daily?days=30", headers={"X-API-Key": API_KEY})
+    assert response.status_code == 200
+    assert isinstance(response.json(), list)
+
+
+def test_book_history_rejects_bad_id():
+    client = TestClient(app)
+    response = client.get("/books/nope/history", headers={"X-API-Key": API_KEY})
+    assert response.status_code == 400
+
+
+def test_facets_endpoint():
+    client = TestClient(app)
+    response = client.get("/books/facets", headers={"X-API-Key": API_KEY})
+    assert response.status_code == 200
+    data = response.json()
+    assert set(data) == {"categories", "total"}
+    assert data["total"]["books"] == sum(c["books"] for c in data["categories"])
+
+
+def test_search_endpoint():
+    client = TestClient(app)
+    response = client.get("/books/search?q=light&size=5", headers={"X-API-Key": API_KEY})
+    assert response.status_code == 200
+    scores = [book["score"] for book in response.json()]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_search_prefix_mode():
+    client = TestClient(app)
+    response = client.get("/books/search?q=ligh&mode=prefix", headers={"X-API-Key": API_KEY})
+    assert response.status_code == 200
+    assert all("ligh" in book["title"].lower() for book in response.json())
@@ -0,0 +1,72 @@
+# tests/test_cache.py
+import asyncio
+from types import SimpleNamespace
+from app.core.cache import LocalCacheBackend, ResponseCache
+
+
+class FakeMeta:
+    def __init__(self):
+        self.version = 1
+
+    async def find_one(self, query):
+        return {"_id": query["_id"], "value": self.version}
+
+
+def test_local_backend_evicts_least_recently_used():
+    backend = LocalCacheBackend(max_entries=2, ttl=60)
+
+    async def run():
+        await backend.set("a", 1)
+        await backend.set("b", 2)
+        await backend.get("a")
+        await backend.set("c", 3)
+        return [await backend.get(key) for key in "abc"]
+
+    assert asyncio.run(run()) == [1, None, 3]
+
+
+def test_local_backend_expires_entries():
+    backend = LocalCacheBackend(max_entries=10, ttl=0)
+
+    async def run():
+        await backend.set("a", 1)
+        return await backend.get("a")
+
+    assert asyncio.run(run()) is None
+
+
+def test_cache_key_ignores_param_order_and_unset_values():
+    key = ResponseCache.make_key("books", {"size": 20, "category": None, "page": 1}, 3)
+    assert key == ResponseCache.make_key("books", {"page": 1, "size": 20}, 3)
+    assert key != ResponseCache.make_key("books", {"page": 1, "size": 20}, 4)
+
+
+def test_catalog_version_bump_invalidates():
+    meta = FakeMeta()
+    db = SimpleNamespace(meta=meta)
+    cache = ResponseCache(LocalCacheBackend(), enabled=True, version_ttl=0)
+    calls = []
+
+    async def load():
+        calls.append(1)
+        return ["result"]
+
+    async def run():
+        await cache.get_or_compute(db, "books", {"page": 1}, load)
+        await cache.get_or_compute(db, "books", {"page": 1}, load)
+        meta.version += 1
+        await cache.get_or_compute(db, "books", {"page": 1}, load)
+
+    asyncio.run(run())
+    assert len(calls) == 2
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2
+
+
+def test_disabled_cache_always_computes():
+    cache = ResponseCache(LocalCacheBackend(), enabled=False)
+
+    async def load():
+        return ["fresh"]
+
+    assert asyncio.run(cache.get_or_compute(None, "books", {}, load)) == ["fresh"]
+    assert cache.stats()["misses"] == 0
@@ -0,0 +1,61 @@
+# tests/test_catalog_server.py
+import asyncio
+import httpx
+from benchmarks.catalog_server import CatalogServer, SyntheticCatalog
+from crawler.parser import parse_book_page
+from crawler.scraper import fetch_response, parse_listing_page, parse_page_count, response_validators
+
+BASE = "https://books.toscrape.com/"
+
+
+def get(server, path, headers=None):
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=server), base_url=BASE) as client:
+            return await client.get(path, headers=headers)
+    return asyncio.run(run())
+
+
+def test_pages_have_the_real_site_shape():
+    catalog = SyntheticCatalog(categories=2, books_per_category=45)
+    server = CatalogServer(catalog)
+    category = catalog.categories[0]
+
+    first = get(server, f"catalogue/category/books/{category['slug']}/index.html")
+    assert parse_page_count(first.text) == 3
+    snapshots = parse_listing_page(first.text)
+    assert len(snapshots) == 20
+    book = category["books"][0]
+    assert snapshots[0] == {
+        "url": f"{BASE}catalogue/{book['slug']}/index.html",
+        "price_incl_tax": book["price"],
+        "in_stock": book["stock"] > 0,
+        "rating": book["rating"],
+    }
+    assert get(server, f"catalogue/category/books/{category['slug']}/page-4.html").status_code == 404
+    assert len(parse_listing_page(get(server, "catalogue/page-5.html").text)) == 10
+
+    parsed = parse_book_page(snapshots[0]["url"], get(server, f"catalogue/{book['slug']}/index.html").text, strict=True)
+    assert parsed["title"] == book["title"]
+    assert parsed["category"] == category["name"]
+    assert parsed["availability_count"] == book["stock"]
+
+
+def test_etags_and_mutation():
+    catalog = SyntheticCatalog(categories=1, books_per_category=10, seed=3)
+    server = CatalogServer(catalog)
+    path = "catalogue/category/books/" + catalog.categories[0]["slug"] + "/index.html"
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=server), base_url=BASE) as client:
+            first = await fetch_response(client, path)
+            same = await fetch_response(client, path, response_validators(first))
+            assert catalog.mutate(0.5) == 5
+            changed = await fetch_response(client, path, response_validators(first))
+            return same.status_code, changed.status_code
+
+    assert asyncio.run(run()) == (304, 200)
+
+
+def test_injected_errors():
+    server = CatalogServer(SyntheticCatalog(1, 1), error_rate=1.0)
+    assert get(server, "index.html").status_code == 503
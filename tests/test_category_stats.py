@@ -0,0 +1,39 @@
+# tests/test_category_stats.py
+from scheduler.category_stats import add_book_delta, category_stats_updates, rebuild_pipeline
+
+
+def test_new_book_delta():
+    deltas = {}
+    add_book_delta(deltas, {"category": "Poetry", "price_incl_tax": 12.0, "availability_count": 3, "rating": 4})
+    [update] = category_stats_updates(deltas)
+    assert update._filter == {"_id": "Poetry"}
+    assert update._doc == {
+        "$inc": {"books": 1, "in_stock": 1, "price_sum": 12.0, "rating_hist.4": 1},
+        "$min": {"price_min": 12.0},
+        "$max": {"price_max": 12.0},
+    }
+    assert update._upsert
+
+
+def test_update_moves_only_what_changed():
+    old = {"category": "Poetry", "price_incl_tax": 12.0, "availability_count": 3, "rating": 4}
+    new = dict(old, availability_count=0, rating=5)
+    deltas = {}
+    add_book_delta(deltas, old, -1)
+    add_book_delta(deltas, new)
+    [update] = category_stats_updates(deltas)
+    assert update._doc["$inc"] == {"in_stock": -1, "rating_hist.4": -1, "rating_hist.5": 1}
+
+
+def test_category_change_moves_the_book():
+    old = {"category": "Poetry", "price_incl_tax": 12.0, "availability_count": 1, "rating": 2}
+    deltas = {}
+    add_book_delta(deltas, old, -1)
+    add_book_delta(deltas, dict(old, category="Fiction"))
+    updates = {u._filter["_id"]: u._doc for u in category_stats_updates(deltas)}
+    assert updates["Poetry"] == {"$inc": {"books": -1, "in_stock": -1, "price_sum": -12.0, "rating_hist.2": -1}}
+    assert updates["Fiction"]["$inc"]["books"] == 1
+
+
+def test_rebuild_replaces_the_collection():
+    assert rebuild_pipeline()[-1] == {"$out": "category_stats"}
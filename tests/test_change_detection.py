@@ -40,4 +40,125 @@ def test_fingerprint_handles_missing_fields():
     # Should not raise an exception
     fp = compute_fingerprint(book)
     assert isinstance(fp, str)
-    assert len(fp) == 64  # SHA-256
\ No newline at end of file
+    assert len(fp) == 64  # SHA-256
+
+@pytest.fixture
+def detected_batch(monkeypatch, make_collection, html_store):
+    """Run one listing page through detect_and_log_changes_batch: u1 unchanged, u2 repriced, u3 new."""
+    import asyncio
+    from types import SimpleNamespace
+    import scheduler.change_detector as change_detector
+
+    unchanged = {"url": "u1", "title": "A", "price_incl_tax": 10.0, "availability_count": 1, "rating": 3}
+    repriced = {"url": "u2", "title": "B", "price_incl_tax": 20.0, "availability_count": 1, "rating": 3}
+    stored = [
+        dict(unchanged, fingerprint=compute_fingerprint(unchanged), raw_html="<html>"),
+        dict(repriced, price_incl_tax=25.0, fingerprint="stale", raw_html="<html>"),
+    ]
+    run = SimpleNamespace(
+        books=make_collection(stored), change_log=make_collection(), html_store=html_store,
+        observations=make_collection(), category_stats=make_collection(), bumps=[]
+    )
+
+    async def bump_catalog_version():
+        run.bumps.append(1)
+
+    monkeypatch.setattr(change_detector, "db", SimpleNamespace(
+        books=run.books, change_log=run.change_log, html_store=html_store, bump_catalog_version=bump_catalog_version,
+        observations=run.observations, category_stats=run.category_stats
+    ))
+
+    new = {"url": "u3", "title": "C", "price_incl_tax": 5.0, "availability_count": 0, "rating": 1,
+           "raw_html": "<html>new</html>"}
+    asyncio.run(change_detector.detect_and_log_changes_batch([dict(unchanged), dict(repriced), new]))
+    return run
+
+
+def test_batch_detection_round_trips(detected_batch):
+    """One listing page costs two reads and one bulk_write per collection."""
+    books, change_log = detected_batch.books, detected_batch.change_log
+    assert len(books.finds) == 2
+    assert books.finds[1][0] == {"url": {"$in": ["u2"]}}
+    assert len(books.bulk_writes) == 1 and len(books.bulk_writes[0]) == 3
+    assert len(change_log.bulk_writes) == 1
+    entries = [op._doc for op in change_log.bulk_writes[0]]
+    assert [e["change_type"] for e in entries] == ["updated", "new"]
+    assert entries[0]["changes"] == {"price_incl_tax": {"old": 25.0, "new": 20.0}}
+
+
+def test_batch_detection_moves_raw_html_to_the_html_store(detected_batch):
+    """raw_html is never read back and is stored content-addressed, outside the book document."""
+    books = detected_batch.books
+    assert all("raw_html" not in projection for _, projection in books.finds)
+    new_doc = books.bulk_writes[0][2]._doc
+    assert "raw_html" not in new_doc
+    assert detected_batch.html_store.pages == {new_doc["html_hash"]: "<html>new</html>"}
+
+
+def test_batch_detection_bumps_catalog_version_once(detected_batch):
+    assert detected_batch.bumps == [1]  # one cache invalidation per batch
+
+
+def test_batch_detection_observes_every_checked_book(detected_batch):
+    """Changed or not, each book in the batch gets an observation."""
+    assert [(o["meta"]["book_url"], o["in_stock"]) for o in detected_batch.observations.docs] == [
+        ("u1", True), ("u2", True), ("u3", False)
+    ]
+
+
+def test_batch_detection_updates_category_stats(detected_batch):
+    """The new book adds a count; its +5.0 cancels the repricing's -5.0 in price_sum."""
+    stats = {op._filter["_id"]: op._doc for op in detected_batch.category_stats.bulk_writes[0]}
+    assert stats["Unknown"]["$inc"] == {"books": 1, "rating_hist.1": 1}
+    assert stats["Unknown"]["$min"] == {"price_min": 5.0} and stats["Unknown"]["$max"] == {"price_max": 20.0}
+
+
+def test_listing_snapshot_selects_new_changed_and_stale(monkeypatch, make_collection):
+    import asyncio
+    from datetime import datetime, timedelta
+    from types import SimpleNamespace
+    import scheduler.change_detector as change_detector
+
+    now = datetime.utcnow()
+    stored = [
+        {"url": "fresh", "price_incl_tax": 10.0, "availability_count": 3, "rating": 4, "verified_at": now},
+        {"url": "repriced", "price_incl_tax": 10.0, "availability_count": 3, "rating": 4, "verified_at": now},
+        {"url": "sold_out", "price_incl_tax": 10.0, "availability_count": 3, "rating": 4, "verified_at": now},
+        {"url": "stale", "price_incl_tax": 10.0, "availability_count": 3, "rating": 4,
+         "verified_at": now - timedelta(days=30)},
+    ]
+    books, observations = make_collection(stored), make_collection()
+    monkeypatch.setattr(change_detector, "db", SimpleNamespace(books=books, observations=observations))
+
+    snapshots = [
+        {"url": "fresh", "price_incl_tax": 10.0, "in_stock": True, "rating": 4},
+        {"url": "repriced", "price_incl_tax": 12.5, "in_stock": True, "rating": 4},
+        {"url": "sold_out", "price_incl_tax": 10.0, "in_stock": False, "rating": 4},
+        {"url": "stale", "price_incl_tax": 10.0, "in_stock": True, "rating": 4},
+        {"url": "new", "price_incl_tax": 5.0, "in_stock": True, "rating": 1},
+    ]
+    wanted = asyncio.run(change_detector.select_books_to_fetch(snapshots, max_age_hours=24))
+
+    assert wanted == ["repriced", "sold_out", "stale", "new"]
+    assert len(books.finds) == 1
+    # The book the listing confirmed unchanged still gets an observation
+    assert [o["meta"]["book_url"] for o in observations.docs] == ["fresh"]
+
+
+def test_mark_verified_batches_not_modified_books(monkeypatch, make_collection):
+    """A batch of 304s costs one read, one update_many and one insert_many."""
+    import asyncio
+    from types import SimpleNamespace
+    import scheduler.change_detector as change_detector
+
+    stored = [{"url": f"u{i}", "category": "Poetry", "price_incl_tax": 10.0, "availability_count": 2, "rating": 3}
+              for i in range(3)]
+    books, observations = make_collection(stored), make_collection()
+    monkeypatch.setattr(change_detector, "db", SimpleNamespace(books=books, observations=observations))
+
+    asyncio.run(change_detector.mark_verified(["u0", "u1", "u2", "gone"]))
+
+    assert len(books.finds) == 1
+    assert len(books.updates) == 1 and books.updates[0][0] == {"url": {"$in": ["u0", "u1", "u2", "gone"]}}
+    assert observations.inserts == 1
+    assert [o["meta"]["book_url"] for o in observations.docs] == ["u0", "u1", "u2"]
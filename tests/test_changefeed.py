@@ -0,0 +1,61 @@
+# tests/test_changefeed.py
+import asyncio
+import json
+from datetime import datetime
+from bson import ObjectId
+from app.core.changefeed import build_feed_query, change_stream_match, iter_change_events, wait_for_changes
+
+
+def test_feed_query_prefers_after_id_and_adds_filters():
+    oid = ObjectId()
+    query = build_feed_query(oid, datetime(2024, 1, 1), "updated", "Poetry", "price_incl_tax")
+    assert query == {
+        "_id": {"$gt": oid}, "change_type": "updated", "category": "Poetry", "changed_fields": "price_incl_tax"
+    }
+    assert build_feed_query(since=datetime(2024, 1, 1)) == {"detected_at": {"$gte": datetime(2024, 1, 1)}}
+    assert change_stream_match({"category": "Poetry"}) == {"operationType": "insert", "fullDocument.category": "Poetry"}
+
+
+def test_long_poll_returns_entries_inserted_while_waiting(make_collection):
+    log = make_collection()
+    log.add(change_type="new")
+    first = log.docs[0]["_id"]
+
+    async def scenario():
+        waiter = asyncio.create_task(wait_for_changes(log, build_feed_query(first), 10, timeout=2, poll_interval=0.01))
+        await asyncio.sleep(0.05)
+        log.add(change_type="updated")
+        return await waiter
+
+    docs = asyncio.run(scenario())
+    assert [doc["change_type"] for doc in docs] == ["updated"]
+    assert asyncio.run(wait_for_changes(log, build_feed_query(docs[-1]["_id"]), 10, timeout=0)) == []
+
+
+def test_stream_falls_back_to_polling_and_sends_each_entry_once(make_collection):
+    log = make_collection()
+    log.add(change_type="updated", changed_fields=["price_incl_tax"])
+    log.add(change_type="updated", changed_fields=["rating"])
+
+    async def scenario():
+        events = iter_change_events(log, build_feed_query(field="price_incl_tax"), batch_size=1, poll_interval=0.01)
+        received = [await events.__anext__()]
+        log.add(change_type="updated", changed_fields=["price_incl_tax", "rating"])
+        received.append(await events.__anext__())
+        await events.aclose()
+        return received
+
+    events = asyncio.run(scenario())
+    ids = [event.split("\n")[0][len("id: "):] for event in events]
+    assert ids == [str(log.docs[0]["_id"]), str(log.docs[2]["_id"])]
+    assert json.loads(events[1].split("data: ")[1])["changed_fields"] == ["price_incl_tax", "rating"]
+
+
+def test_long_poll_times_reads_not_waits(make_collection):
+    from app.core.metrics import API_MONGO_QUERY_SECONDS
+    log = make_collection()
+    before = API_MONGO_QUERY_SECONDS.count(route="/test/feed")
+    asyncio.run(wait_for_changes(log, build_feed_query(), 10, timeout=0.05, poll_interval=0.01, route="/test/feed"))
+    reads = API_MONGO_QUERY_SECONDS.count(route="/test/feed") - before
+    assert reads >= 2  # one observation per poll, each far below the 50 ms wait
+    assert API_MONGO_QUERY_SECONDS.total(route="/test/feed") < 0.05
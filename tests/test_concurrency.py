@@ -0,0 +1,68 @@
+# tests/test_concurrency.py
+import asyncio
+from crawler.concurrency import AdaptiveConcurrency, parse_retry_after
+
+
+def test_additive_increase_up_to_ceiling():
+    controller = AdaptiveConcurrency(max_limit=4, min_limit=1, initial=2, latency_target=1.0)
+    for _ in range(50):
+        controller.record(0.05, 200)
+    assert controller.limit == 4
+
+
+def test_multiplicative_decrease_on_429():
+    controller = AdaptiveConcurrency(max_limit=16, min_limit=1, initial=16, decrease_factor=0.5)
+    controller.record(0.05, 429)
+    assert controller.limit == 8
+
+
+def test_one_decrease_per_round_trip():
+    controller = AdaptiveConcurrency(max_limit=16, min_limit=1, initial=16, latency_target=0.5)
+    controller.record(1.0, 200)
+    controller.record(1.0, 200)  # same window: slow responses from one burst
+    assert controller.limit == 8
+
+
+def test_retry_after_pauses_new_requests():
+    controller = AdaptiveConcurrency(max_limit=4, initial=4)
+    controller.record(0.05, 503, retry_after=30)
+    assert controller.paused_until > 0
+    assert parse_retry_after("120") == 120.0
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    assert parse_retry_after(None) is None
+
+
+def test_in_flight_never_exceeds_limit():
+    controller = AdaptiveConcurrency(max_limit=3, min_limit=3, initial=3)
+    peak = 0
+
+    async def request():
+        nonlocal peak
+        await controller.acquire()
+        peak = max(peak, controller.in_flight)
+        await asyncio.sleep(0.001)
+        await controller.release(0.001, 200)
+
+    async def run():
+        await asyncio.gather(*[request() for _ in range(20)])
+
+    asyncio.run(run())
+    assert peak == 3
+    assert controller.in_flight == 0
+
+
+def test_cancel_during_rps_spacing_returns_the_slot():
+    controller = AdaptiveConcurrency(max_limit=4, initial=4, max_rps=1)
+
+    async def run():
+        await controller.acquire()
+        waiting = asyncio.create_task(controller.acquire())  # spaced 1 s after the first
+        await asyncio.sleep(0.01)
+        waiting.cancel()
+        try:
+            await waiting
+        except asyncio.CancelledError:
+            pass
+        return controller.in_flight
+
+    assert asyncio.run(run()) == 1
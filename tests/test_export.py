@@ -0,0 +1,47 @@
+# tests/test_export.py
+import asyncio
+import gzip
+import json
+from datetime import datetime
+from bson import ObjectId
+from app.core.export import encode_stream, iter_csv, iter_ndjson
+
+FIELDS = ["id", "title", "price_incl_tax", "crawled_at"]
+OID = ObjectId("68d8f15d3596606b883a8343")
+
+
+async def docs(n=3):
+    for i in range(n):
+        yield {"_id": OID, "title": f"Book, {i}", "price_incl_tax": 10.0 + i, "crawled_at": datetime(2024, 1, 1)}
+
+
+async def chunks_of(stream):
+    return [chunk async for chunk in stream]
+
+
+async def collect(stream):
+    return b"".join(await chunks_of(stream))
+
+
+def test_ndjson_export():
+    body = asyncio.run(collect(encode_stream(iter_ndjson(docs(), FIELDS))))
+    rows = [json.loads(line) for line in body.decode("utf-8").splitlines()]
+    assert rows[0] == {"id": str(OID), "title": "Book, 0", "price_incl_tax": 10.0, "crawled_at": "2024-01-01 00:00:00"}
+    assert len(rows) == 3
+
+
+def test_csv_export_gzipped():
+    body = asyncio.run(collect(encode_stream(iter_csv(docs(), FIELDS), gzip=True)))
+    lines = gzip.decompress(body).decode("utf-8").splitlines()
+    assert lines[0] == "id,title,price_incl_tax,crawled_at"
+    assert lines[1] == f'{OID},"Book, 0",10.0,2024-01-01 00:00:00'
+    assert len(lines) == 4
+
+
+def test_encode_stream_flushes_in_chunks(monkeypatch):
+    import app.core.export as export
+
+    monkeypatch.setattr(export, "CHUNK_SIZE", 100)
+    chunks = asyncio.run(chunks_of(encode_stream(iter_ndjson(docs(20), FIELDS))))
+    assert len(chunks) > 1
+    assert all(len(chunk) < 300 for chunk in chunks)
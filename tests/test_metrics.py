@@ -0,0 +1,82 @@
+# tests/test_metrics.py
+from app.core.metrics import Registry, exporting_metrics, merge_expositions, write_textfile
+
+
+def test_counter_gauge_and_histogram_render():
+    registry = Registry()
+    responses = registry.counter("http_responses", "Responses", ("status",))
+    responses.inc(status=200)
+    responses.inc(2, status=304)
+    registry.gauge("in_flight", "In flight", ("host",), callback=lambda: {("example.com",): 3})
+    latency = registry.histogram("fetch_seconds", "Fetch time", buckets=(0.1, 1.0))
+    latency.observe(0.05)
+    latency.observe(0.5)
+    latency.observe(5)
+
+    text = registry.render()
+    assert "# TYPE http_responses counter" in text
+    assert 'http_responses_total{status="200"} 1' in text
+    assert 'http_responses_total{status="304"} 2' in text
+    assert 'in_flight{host="example.com"} 3' in text
+    assert 'fetch_seconds_bucket{le="0.1"} 1' in text
+    assert 'fetch_seconds_bucket{le="1"} 2' in text
+    assert 'fetch_seconds_bucket{le="+Inf"} 3' in text
+    assert "fetch_seconds_count 3" in text
+    assert "fetch_seconds_sum 5.55" in text
+
+
+def test_histogram_time_and_label_check():
+    registry = Registry()
+    latency = registry.histogram("stage_seconds", "Stage time", ("stage",))
+    with latency.time(stage="parse"):
+        pass
+    assert latency.count(stage="parse") == 1
+    try:
+        latency.observe(1.0)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("missing labels should be rejected")
+
+
+def test_textfiles_merge_into_one_family_per_metric(tmp_path):
+    for job in ("crawler", "scheduler"):
+        registry = Registry()
+        registry.counter("books_changed", "Books changed", ("change_type",)).inc(change_type="new")
+        write_textfile(job, registry, str(tmp_path))
+
+    texts = [path.read_text() for path in sorted(tmp_path.glob("*.prom"))]
+    merged = merge_expositions(texts)
+    assert merged.count("# TYPE books_changed counter") == 1
+    assert 'books_changed_total{change_type="new",job="crawler"} 1' in merged
+    assert 'books_changed_total{change_type="new",job="scheduler"} 1' in merged
+
+
+def test_exporting_metrics_exports_while_running_and_after_errors(monkeypatch):
+    import asyncio
+    import app.core.metrics as metrics
+    exports = []
+
+    async def fake_export(job):
+        exports.append(job)
+
+    monkeypatch.setattr(metrics, "export_metrics", fake_export)
+
+    async def run():
+        async with exporting_metrics("crawler", interval=0.01):
+            await asyncio.sleep(0.035)
+            raise RuntimeError("crawl failed")
+
+    try:
+        asyncio.run(run())
+    except RuntimeError:
+        pass
+    # Periodic exports during the run, then the final one despite the error
+    assert len(exports) >= 3 and set(exports) == {"crawler"}
+
+
+def test_metric_base_class_is_abstract():
+    import pytest
+    from app.core.metrics import _Metric
+    with pytest.raises(TypeError):
+        _Metric("x", "doc")
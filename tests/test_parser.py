@@ -0,0 +1,72 @@
+# tests/test_parser.py
+import asyncio
+from pathlib import Path
+import pytest
+from crawler.parser import parse_book_page, parse_book_page_legacy
+from crawler.executor import configure_parse_executor, parse_book_page_async
+
+FIXTURES = Path(__file__).parent / "fixtures"
+URL = "https://books.toscrape.com/catalogue/a-light-in-the-attic_1000/index.html"
+
+
+def test_parse_book_page_fixture():
+    html = (FIXTURES / "book_page.html").read_text(encoding="utf-8")
+    book = parse_book_page(URL, html)
+    assert book["title"] == "A Light in the Attic"
+    assert book["category"] == "Poetry"
+    assert book["price_incl_tax"] == 51.77
+    assert book["availability_count"] == 22
+    assert book["rating"] == 3
+    assert book["num_reviews"] == 0
+    assert book["image_url"].endswith("fe72f0532301ec28892ae79a629a293c.jpg")
+    assert book["description"].startswith("It's hard to imagine")
+
+
+@pytest.mark.parametrize("kind", ["thread", "process"])
+def test_parse_executor_matches_inline(kind):
+    html = (FIXTURES / "book_page.html").read_text(encoding="utf-8")
+    expected = parse_book_page(URL, html)
+    configure_parse_executor(2, kind)
+    try:
+        book = asyncio.run(parse_book_page_async(URL, html))
+    finally:
+        configure_parse_executor(0)
+    expected.pop("crawled_at")
+    book.pop("crawled_at")
+    # The process pool does not send raw_html back; it is reattached in the parent
+    assert book["raw_html"] == html
+    assert book == expected
+
+
+@pytest.mark.parametrize("fixture", sorted(p.name for p in FIXTURES.glob("book_page*.html")))
+def test_fast_parser_matches_legacy(fixture):
+    html = (FIXTURES / fixture).read_text(encoding="utf-8")
+    fast = parse_book_page(URL, html, strict=False)
+    strict = parse_book_page(URL, html, strict=True)
+    legacy = parse_book_page_legacy(URL, html)
+    for book in (fast, strict, legacy):
+        book.pop("crawled_at")
+    assert fast == legacy
+    assert strict == legacy
+    assert list(fast) == list(legacy)  # same field order as Book.model_dump()
+
+
+def test_parse_edge_case_fixtures():
+    sold_out = parse_book_page(URL, (FIXTURES / "book_page_out_of_stock.html").read_text(encoding="utf-8"))
+    assert sold_out["availability_raw"] == "Out of stock"
+    assert sold_out["availability_count"] == 0
+    assert sold_out["rating"] == 1
+    assert sold_out["category"] == "Historical Fiction"
+
+    no_description = parse_book_page(URL, (FIXTURES / "book_page_no_description.html").read_text(encoding="utf-8"))
+    assert no_description["title"] == "Sharp Objects & Other Stories"
+    assert no_description["description"] is None
+    assert no_description["num_reviews"] == 7
+    assert no_description["price_incl_tax"] == 47.82
+    assert no_description["rating"] == 5
+
+
+def test_parse_without_breadcrumb_markers_uses_whole_page():
+    html = "<html><body><h1>Bare</h1><p class='price_color'>£3.50</p><p class='star-rating Two'></p></body></html>"
+    book = parse_book_page(URL, html)
+    assert (book["title"], book["price_incl_tax"], book["rating"], book["category"]) == ("Bare", 3.5, 2, "Unknown")
@@ -0,0 +1,145 @@
+# tests/test_pipeline.py
+import asyncio
+from pathlib import Path
+from types import SimpleNamespace
+import httpx
+import pytest
+import crawler.pipeline as pipeline_module
+import crawler.scraper as scraper_module
+from crawler.pipeline import CrawlPipeline
+
+BOOK_HTML = (Path(__file__).parent / "fixtures" / "book_page.html").read_text(encoding="utf-8")
+CATEGORY_URL = "https://books.toscrape.com/catalogue/category/books/poetry_23/index.html"
+
+
+def listing(slugs):
+    pods = "".join(
+        f'<article class="product_pod"><h3><a href="../../../{slug}/index.html">{slug}</a></h3></article>'
+        for slug in slugs
+    )
+    return f"<html><body><ol class='row'>{pods}</ol></body></html>"
+
+
+def handler(request: httpx.Request) -> httpx.Response:
+    path = request.url.path
+    if path.endswith("poetry_23/index.html"):
+        return httpx.Response(200, text=listing(["book-a_1", "book-b_2"]))
+    if path.endswith("poetry_23/page-2.html"):
+        return httpx.Response(200, text=listing(["book-c_3"]))
+    if path.endswith("book-b_2/index.html"):
+        return httpx.Response(500)
+    if "/catalogue/book-" in path:
+        return httpx.Response(200, text=BOOK_HTML)
+    return httpx.Response(404)
+
+
+class FakePages:
+    async def find_one(self, query, projection=None):
+        return None
+
+    async def update_one(self, query, update, upsert=False):
+        pass
+
+
+async def no_validators(urls):
+    return {}
+
+
+def test_pipeline_runs_every_stage(monkeypatch):
+    fake_db = SimpleNamespace(pages=FakePages(), get_validators=no_validators)
+    monkeypatch.setattr(scraper_module, "db", fake_db)
+    monkeypatch.setattr(pipeline_module, "db", fake_db)
+    stored, done = [], []
+
+    async def store(books):
+        stored.extend(book["url"] for book in books)
+
+    async def on_category_done(url):
+        done.append((url, len(stored)))
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            pipeline = CrawlPipeline(client, store, fetch_workers=2, queue_size=1, on_category_done=on_category_done)
+            return await pipeline.run([CATEGORY_URL])
+
+    stats = asyncio.run(run())
+    assert sorted(stored) == [
+        "https://books.toscrape.com/catalogue/book-a_1/index.html",
+        "https://books.toscrape.com/catalogue/book-c_3/index.html",
+    ]
+    assert stats["fetch"]["failed"] == 1
+    assert stats["store"]["processed"] == 2
+    assert all(stage["queue_depth"] == 0 for stage in stats.values())
+    # Fired once, after every book of the category was settled
+    assert done == [(CATEGORY_URL, 2)]
+
+
+def test_not_modified_books_are_reported_in_batches(monkeypatch):
+    fake_db = SimpleNamespace(pages=FakePages(), get_validators=no_validators)
+    monkeypatch.setattr(scraper_module, "db", fake_db)
+    monkeypatch.setattr(pipeline_module, "db", fake_db)
+    batches = []
+
+    def not_modified(request: httpx.Request) -> httpx.Response:
+        if "/catalogue/book-" in request.url.path:
+            return httpx.Response(304)
+        return handler(request)
+
+    async def store(books):
+        pass
+
+    async def on_not_modified(urls):
+        batches.append(sorted(urls))
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(not_modified)) as client:
+            pipeline = CrawlPipeline(client, store, store_batch_size=2, on_not_modified=on_not_modified)
+            await pipeline.run([CATEGORY_URL])
+
+    asyncio.run(run())
+    # Three 304s: one full batch, then the remainder when the run ends
+    assert [len(batch) for batch in batches] == [2, 1]
+
+
+def test_failing_category_hook_does_not_hang_the_run(monkeypatch):
+    fake_db = SimpleNamespace(pages=FakePages(), get_validators=no_validators)
+    monkeypatch.setattr(scraper_module, "db", fake_db)
+    monkeypatch.setattr(pipeline_module, "db", fake_db)
+    stored = []
+
+    async def store(books):
+        stored.extend(book["url"] for book in books)
+
+    async def on_category_done(url):
+        raise RuntimeError("report failed")
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            pipeline = CrawlPipeline(client, store, queue_size=1, store_batch_size=1, on_category_done=on_category_done)
+            return await asyncio.wait_for(pipeline.run([CATEGORY_URL]), 5)
+
+    stats = asyncio.run(run())
+    assert len(stored) == 2
+    assert stats["store"]["processed"] == 2
+
+
+def test_a_dead_worker_fails_the_run_instead_of_hanging(monkeypatch):
+    fake_db = SimpleNamespace(pages=FakePages(), get_validators=no_validators)
+    monkeypatch.setattr(scraper_module, "db", fake_db)
+    monkeypatch.setattr(pipeline_module, "db", fake_db)
+
+    async def store(books):
+        pass
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            pipeline = CrawlPipeline(client, store, queue_size=1, store_batch_size=1)
+
+            async def broken_settle(category_url, count=1):
+                raise RuntimeError("storer died")
+
+            pipeline._settle = broken_settle
+            return await asyncio.wait_for(pipeline.run([CATEGORY_URL]), 5)
+
+    with pytest.raises(RuntimeError, match="storer died"):
+        asyncio.run(run())
@@ -0,0 +1,61 @@
+# tests/test_reports.py
+import asyncio
+import gzip
+import json
+from scheduler.reports import summarize_facets, write_report
+
+
+async def entries(n):
+    for i in range(n):
+        yield {"book_url": f"u{i}", "change_type": "updated", "changes": {"price_incl_tax": {"old": 1, "new": 2}}}
+
+
+def test_summarize_facets():
+    facets = {
+        "by_type": [{"_id": "new", "count": 2}, {"_id": "updated", "count": 5}],
+        "price": [{"_id": "up", "count": 3}, {"_id": "down", "count": 1}],
+        "stock": [{"_id": "out_of_stock", "count": 1}],
+        "rating": [],
+        "by_category": [
+            {"_id": {"category": "Poetry", "type": "updated"}, "count": 4},
+            {"_id": {"category": "Poetry", "type": "new"}, "count": 2},
+            {"_id": {"category": "Art", "type": "updated"}, "count": 1},
+        ],
+    }
+    assert summarize_facets(facets) == {
+        "total_changes": 7,
+        "new_books": 2,
+        "updated_books": 5,
+        "price": {"up": 3, "down": 1},
+        "stock": {"out_of_stock": 1},
+        "rating": {},
+        "by_category": {"Art": {"updated": 1}, "Poetry": {"updated": 4, "new": 2}},
+    }
+
+
+def test_write_report_inline_is_valid_json(tmp_path):
+    path = str(tmp_path / "change_report_2025-10-01.json")
+    files = asyncio.run(write_report(path, {"report_date": "2025-10-01", "total_changes": 3}, entries(3)))
+    assert files == [path]
+    report = json.loads(open(path).read())
+    assert report["total_changes"] == 3
+    assert [c["book_url"] for c in report["changes"]] == ["u0", "u1", "u2"]
+
+    empty = str(tmp_path / "empty.json")
+    asyncio.run(write_report(empty, {"total_changes": 0}, entries(0)))
+    assert json.loads(open(empty).read()) == {"total_changes": 0, "changes": []}
+
+
+def test_write_report_chunked_and_gzipped(tmp_path):
+    path = str(tmp_path / "change_report_2025-10-01.json")
+    files = asyncio.run(write_report(path, {"total_changes": 5}, entries(5), compress=True, chunk_size=2))
+    assert [f.rsplit("/", 1)[-1] for f in files] == [
+        "change_report_2025-10-01.json.gz",
+        "change_report_2025-10-01.part-0001.ndjson.gz",
+        "change_report_2025-10-01.part-0002.ndjson.gz",
+        "change_report_2025-10-01.part-0003.ndjson.gz",
+    ]
+    report = json.loads(gzip.decompress(open(files[0], "rb").read()))
+    assert report["changes"] == [] and len(report["change_files"]) == 3
+    lines = gzip.decompress(open(files[3], "rb").read()).decode().splitlines()
+    assert [json.loads(line)["book_url"] for line in lines] == ["u4"]
@@ -0,0 +1,51 @@
+# tests/test_rollups.py
+import asyncio
+from datetime import date, datetime
+from types import SimpleNamespace
+import scheduler.rollups as rollups
+
+
+def test_observation_document():
+    book = {"url": "u1", "category": "Poetry", "price_incl_tax": 12.5, "availability_count": 0, "rating": 4}
+    doc = rollups.observation(book, datetime(2025, 1, 2, 3))
+    assert doc == {
+        "observed_at": datetime(2025, 1, 2, 3),
+        "meta": {"book_url": "u1", "category": "Poetry"},
+        "price_incl_tax": 12.5, "availability_count": 0, "in_stock": False, "rating": 4,
+    }
+
+
+def test_pipelines_merge_into_the_rollup_collections():
+    start, end = datetime(2025, 1, 1), datetime(2025, 1, 3)
+    book = rollups.book_daily_pipeline(start, end)
+    category = rollups.category_daily_pipeline(start, end)
+    assert book[0] == {"$match": {"observed_at": {"$gte": start, "$lt": end}}}
+    assert book[-1]["$merge"]["into"] == "book_daily" and book[-1]["$merge"]["on"] == ["book_url", "day"]
+    assert category[0] == {"$match": {"day": {"$gte": start, "$lt": end}}}
+    assert category[-1]["$merge"]["into"] == "category_daily"
+
+
+def test_rollups_resume_from_the_watermark(monkeypatch, make_collection):
+    calls = []
+    meta = make_collection(name="meta", calls=calls)
+    observations = make_collection([{"_id": 1, "observed_at": datetime(2025, 1, 1, 8)}], "observations", calls)
+    bumps = []
+
+    async def bump_catalog_version():
+        bumps.append(1)
+
+    monkeypatch.setattr(rollups, "db", SimpleNamespace(
+        meta=meta, observations=observations, book_daily=make_collection(name="book_daily", calls=calls),
+        bump_catalog_version=bump_catalog_version
+    ))
+
+    asyncio.run(rollups.run_rollups(today=date(2025, 1, 3)))
+    # First run starts at the oldest observation
+    assert calls[0] == ("observations", {"observed_at": {"$gte": datetime(2025, 1, 1), "$lt": datetime(2025, 1, 4)}})
+    assert calls[1] == ("book_daily", {"day": {"$gte": datetime(2025, 1, 1), "$lt": datetime(2025, 1, 4)}})
+
+    calls.clear()
+    asyncio.run(rollups.run_rollups(today=date(2025, 1, 5)))
+    # Later runs redo the last rolled day onwards only
+    assert calls[0] == ("observations", {"observed_at": {"$gte": datetime(2025, 1, 3), "$lt": datetime(2025, 1, 6)}})
+    assert bumps == [1, 1]
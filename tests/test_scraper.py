@@ -0,0 +1,105 @@
+# tests/test_scraper.py
+import asyncio
+import httpx
+from crawler.scraper import conditional_headers, fetch_response, response_validators
+
+
+def test_conditional_headers_from_validators():
+    headers = conditional_headers({"etag": '"abc"', "last_modified": "Wed, 01 Oct 2025 00:00:00 GMT"})
+    assert headers == {
+        "If-None-Match": '"abc"',
+        "If-Modified-Since": "Wed, 01 Oct 2025 00:00:00 GMT",
+    }
+
+
+def test_conditional_headers_without_validators():
+    assert conditional_headers(None) == {}
+    assert conditional_headers({"etag": None, "last_modified": None}) == {}
+
+
+def test_fetch_response_returns_304_without_raising():
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.headers.get("If-None-Match") == '"v1"':
+            return httpx.Response(304)
+        return httpx.Response(200, text="<html></html>", headers={"ETag": '"v1"'})
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            first = await fetch_response(client, "https://books.toscrape.com/x.html")
+            second = await fetch_response(client, "https://books.toscrape.com/x.html", response_validators(first))
+            return first, second
+
+    first, second = asyncio.run(run())
+    assert first.status_code == 200
+    assert response_validators(first) == {"etag": '"v1"', "last_modified": None}
+    assert second.status_code == 304
+
+
+def test_parse_listing_page_snapshots():
+    from crawler.scraper import parse_listing_page
+
+    html = """
+    <ol class="row">
+      <li><article class="product_pod">
+        <p class="star-rating Three"></p>
+        <h3><a href="../../../a-light-in-the-attic_1000/index.html" title="A Light in the Attic">A Light...</a></h3>
+        <div class="product_price">
+          <p class="price_color">£51.77</p>
+          <p class="instock availability"><i class="icon-ok"></i> In stock</p>
+        </div>
+      </article></li>
+      <li><article class="product_pod">
+        <p class="star-rating One"></p>
+        <h3><a href="../../../tipping-the-velvet_999/index.html">Tipping the Velvet</a></h3>
+        <div class="product_price">
+          <p class="price_color">£53.74</p>
+          <p class="availability">Out of stock</p>
+        </div>
+      </article></li>
+    </ol>
+    """
+    assert parse_listing_page(html) == [
+        {"url": "https://books.toscrape.com/catalogue/a-light-in-the-attic_1000/index.html",
+         "price_incl_tax": 51.77, "in_stock": True, "rating": 3},
+        {"url": "https://books.toscrape.com/catalogue/tipping-the-velvet_999/index.html",
+         "price_incl_tax": 53.74, "in_stock": False, "rating": 1},
+    ]
+
+
+def test_listing_fans_out_from_pager(monkeypatch):
+    from types import SimpleNamespace
+    import crawler.scraper as scraper_module
+    from crawler.scraper import iter_listing_pages
+
+    class Pages:
+        async def find_one(self, query, projection=None):
+            return None
+
+        async def update_one(self, query, update, upsert=False):
+            pass
+
+    monkeypatch.setattr(scraper_module, "db", SimpleNamespace(pages=Pages()))
+    requested = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requested.append(request.url.path.rsplit("/", 1)[-1])
+        page = int(request.url.path[-len("N.html")])
+        pods = f'<article class="product_pod"><h3><a href="book-{page}_{page}/index.html">b</a></h3></article>'
+        pager = f'<ul class="pager"><li class="current">Page {page} of 3</li></ul>'
+        return httpx.Response(200, text=f"<html><body>{pods}{pager}</body></html>")
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return [url async for url, _ in iter_listing_pages(client, "https://books.toscrape.com/catalogue/page-1.html")]
+
+    pages = asyncio.run(run())
+    assert sorted(pages) == [f"https://books.toscrape.com/catalogue/page-{n}.html" for n in (1, 2, 3)]
+    # No probing past the last page
+    assert sorted(requested) == ["page-1.html", "page-2.html", "page-3.html"]
+
+
+def test_parse_page_count():
+    from crawler.scraper import parse_page_count
+
+    assert parse_page_count('<ul class="pager"><li class="current">\n  Page 1 of 50\n</li></ul>') == 50
+    assert parse_page_count("<html><body></body></html>") is None
@@ -0,0 +1,27 @@
+# tests/test_search.py
+from app.core.search import build_search
+from utils.text import tokenize
+
+
+def test_tokenize_lowercases_and_dedupes():
+    assert tokenize("A Light in the Attic: a light!") == ["a", "light", "in", "the", "attic"]
+    assert tokenize(None) == []
+
+
+def test_text_search_ranks_by_text_score():
+    query, projection, sort = build_search("light attic")
+    assert query == {"$text": {"$search": "light attic"}}
+    assert projection == {"score": {"$meta": "textScore"}}
+    assert sort[0] == ("score", {"$meta": "textScore"})
+
+
+def test_prefix_search_matches_whole_words_then_a_prefix():
+    query, projection, _ = build_search("Light att", mode="prefix")
+    assert query == {"$and": [{"title_tokens": "light"}, {"title_tokens": {"$regex": "^att"}}]}
+    assert projection == {}
+    assert build_search("a.b", mode="prefix")[0] == {"$and": [{"title_tokens": "a"}, {"title_tokens": {"$regex": "^b"}}]}
+
+
+def test_queries_without_words_match_nothing():
+    assert build_search("!!!")[0] is None
+    assert build_search("  ", mode="prefix")[0] is None
@@ -0,0 +1,59 @@
+# tests/test_state.py
+from crawler.state import CrawlJournal, QUEUED, FETCHED, STORED
+
+
+def test_resume_redoes_only_unfinished_urls(tmp_path):
+    path = tmp_path / "journal.sqlite3"
+    journal = CrawlJournal(path, commit_every=1000, commit_interval=3600)
+    assert journal.start_run() is False
+    journal.record(["a", "b", "c"], QUEUED, category="cat-1")
+    journal.record(["a", "b"], FETCHED, category="cat-1")
+    journal.record(["a"], STORED, category="cat-1")
+    journal.record(["cat-1"], STORED, kind="category")
+    journal.close()  # simulated crash: run never finished
+
+    resumed = CrawlJournal(path)
+    assert resumed.start_run() is True
+    assert resumed.stored_urls() == {"a"}
+    assert sorted(resumed.unfinished()) == [("b", "cat-1"), ("c", "cat-1")]
+    assert resumed.stored_urls(kind="category") == {"cat-1"}
+    resumed.close()
+
+
+def test_uncommitted_batch_is_redone(tmp_path):
+    path = tmp_path / "journal.sqlite3"
+    journal = CrawlJournal(path, commit_every=1000, commit_interval=3600)
+    journal.start_run()
+    journal.record(["a"], QUEUED, category="cat-1")
+    journal.flush()
+    journal.record(["a"], STORED, category="cat-1")
+    journal._conn.close()  # crash before the batch was committed
+
+    resumed = CrawlJournal(path)
+    resumed.start_run()
+    assert resumed.unfinished() == [("a", "cat-1")]
+    resumed.close()
+
+
+def test_finish_run_compacts(tmp_path):
+    path = tmp_path / "journal.sqlite3"
+    journal = CrawlJournal(path)
+    journal.start_run()
+    journal.record([f"u{i}" for i in range(100)], QUEUED, category="cat-1")
+    journal.finish_run()
+    assert journal._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0] == 0
+    assert journal.start_run() is False  # next run starts fresh
+    journal.close()
+
+
+def test_is_complete_needs_every_category_walked_and_book_stored(tmp_path):
+    journal = CrawlJournal(tmp_path / "journal.sqlite3")
+    journal.start_run()
+    journal.record(["cat-1"], STORED, kind="category")
+    journal.record(["u1", "u2"], QUEUED, category="cat-1")
+    journal.record(["u1"], STORED, category="cat-1")
+    assert not journal.is_complete(["cat-1"])  # u2 failed
+    journal.record(["u2"], STORED, category="cat-1")
+    assert journal.is_complete(["cat-1"])
+    assert not journal.is_complete(["cat-1", "cat-2"])  # cat-2 was never walked
+    journal.close()
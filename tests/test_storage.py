@@ -0,0 +1,143 @@
+# tests/test_storage.py
+import asyncio
+from pymongo.errors import BulkWriteError
+from crawler.storage import BookSink
+
+
+class FakeCollection:
+    def __init__(self, fail_index=None):
+        self.batches = []
+        self.fail_index = fail_index
+
+    async def bulk_write(self, requests, ordered=True):
+        assert ordered is False
+        self.batches.append(requests)
+        if self.fail_index is not None:
+            raise BulkWriteError({
+                "writeErrors": [{"index": self.fail_index, "code": 11000, "errmsg": "duplicate key"}]
+            })
+
+
+def test_sink_flushes_on_batch_size():
+    collection = FakeCollection()
+    sink = BookSink(lambda: collection, batch_size=2, flush_interval=60)
+
+    async def run():
+        for i in range(5):
+            await sink.add({"url": f"u{i}"})
+        await sink.close()
+
+    asyncio.run(run())
+    assert [len(batch) for batch in collection.batches] == [2, 2, 1]
+    assert sink.written == 5
+
+
+def test_sink_flushes_on_interval():
+    collection = FakeCollection()
+    sink = BookSink(lambda: collection, batch_size=100, flush_interval=0.01)
+
+    async def run():
+        await sink.add({"url": "u0"})
+        await asyncio.sleep(0.05)
+
+    asyncio.run(run())
+    assert len(collection.batches) == 1
+    assert len(sink) == 0
+
+
+def test_sink_reports_per_document_errors():
+    collection = FakeCollection(fail_index=1)
+    sink = BookSink(lambda: collection, batch_size=3, flush_interval=60)
+
+    async def run():
+        for i in range(3):
+            await sink.add({"url": f"u{i}"})
+
+    asyncio.run(run())
+    assert sink.written == 2
+    assert sink.failed == [{"url": "u1", "error": "duplicate key"}]
+
+
+def test_compress_roundtrip_and_detach():
+    from crawler.storage import compress_html, decompress_html, detach_html
+    html = "<html><body>" + "£51.77 " * 500 + "</body></html>"
+    data, codec = compress_html(html)
+    assert len(data) < len(html)
+    assert decompress_html(data, codec) == html
+
+    doc = {"url": "u0", "raw_html": html}
+    assert detach_html(doc) == html
+    assert "raw_html" not in doc
+    assert len(doc["html_hash"]) == 64
+
+
+def test_sink_stores_identical_pages_once():
+    collection = FakeCollection()
+    stored = {}
+
+    class FakeHtmlStore:
+        async def put_many(self, pages):
+            stored.update(pages)
+
+    sink = BookSink(lambda: collection, batch_size=2, flush_interval=60, html_store=FakeHtmlStore())
+
+    async def run():
+        await sink.add({"url": "u0", "raw_html": "<html>same</html>"})
+        await sink.add({"url": "u1", "raw_html": "<html>same</html>"})
+
+    asyncio.run(run())
+    docs = [request._doc for request in collection.batches[0]]
+    assert all("raw_html" not in doc for doc in docs)
+    assert docs[0]["html_hash"] == docs[1]["html_hash"]
+    assert list(stored) == [docs[0]["html_hash"]]
+
+
+def test_sink_skips_books_whose_page_body_was_not_stored():
+    collection = FakeCollection()
+
+    class FailingHtmlStore:
+        async def put_many(self, pages):
+            raise ConnectionError("html_pages unavailable")
+
+    sink = BookSink(lambda: collection, batch_size=2, flush_interval=60, html_store=FailingHtmlStore())
+
+    async def run():
+        await sink.add({"url": "u0", "raw_html": "<html>u0</html>"})
+        await sink.add({"url": "u1"})
+
+    asyncio.run(run())
+    assert [request._doc["url"] for request in collection.batches[0]] == ["u1"]
+    assert sink.written == 1
+    assert sink.failed == [{"url": "u0", "error": "page body not stored: html_pages unavailable"}]
+
+
+def test_close_waits_for_a_timer_flush_in_progress():
+    class SlowCollection(FakeCollection):
+        async def bulk_write(self, requests, ordered=True):
+            await asyncio.sleep(0.05)
+            await super().bulk_write(requests, ordered)
+
+    collection = SlowCollection()
+    sink = BookSink(lambda: collection, batch_size=100, flush_interval=0.01)
+
+    async def run():
+        await sink.add({"url": "u0"})
+        await asyncio.sleep(0.03)  # the timer is now inside bulk_write
+        await sink.close()
+
+    asyncio.run(run())
+    assert sink.written == 1
+    assert len(collection.batches) == 1
+
+
+
+def test_reopen_writes_what_was_buffered_on_another_loop():
+    collection = FakeCollection()
+    sink = BookSink(lambda: collection, batch_size=100, flush_interval=60)
+
+    async def buffer():
+        await sink.add({"url": "u0"})  # e.g. before Database.connect
+
+    asyncio.run(buffer())
+    asyncio.run(sink.reopen())  # what connect does, on the crawl's own loop
+    assert sink.written == 1 and [len(batch) for batch in collection.batches] == [1]
@@ -0,0 +1,36 @@
+# tests/test_transport.py
+import asyncio
+import httpx
+from crawler.config import CRAWL_CONCURRENCY, CRAWL_CONNECT_TIMEOUT, CRAWL_READ_TIMEOUT
+from crawler.stats import HTTP_RESPONSE_HEADERS_SECONDS
+from crawler.transport import ACCEPT_ENCODING, build_client
+
+
+def test_client_pool_timeouts_and_encoding():
+    client = build_client(transport=httpx.MockTransport(lambda request: httpx.Response(200)))
+    assert client.timeout.connect == CRAWL_CONNECT_TIMEOUT
+    assert client.timeout.read == CRAWL_READ_TIMEOUT
+    assert client.headers["Accept-Encoding"] == ACCEPT_ENCODING
+    assert ACCEPT_ENCODING.split(", ")[-2:] == ["gzip", "deflate"]
+    pool = build_client(http2=False)._transport._pool
+    assert pool._max_connections == CRAWL_CONCURRENCY
+    asyncio.run(client.aclose())
+
+
+def test_hooks_time_responses_per_protocol():
+    seen = {}
+
+    def handler(request):
+        seen["accept-encoding"] = request.headers["accept-encoding"]
+        return httpx.Response(200, text="ok")
+
+    before = HTTP_RESPONSE_HEADERS_SECONDS.count(http_version="HTTP/1.1")
+
+    async def scenario():
+        async with build_client(transport=httpx.MockTransport(handler), base_url="http://catalog/") as client:
+            await client.get("index.html")
+            await client.get("page-2.html")
+
+    asyncio.run(scenario())
+    assert seen["accept-encoding"] == ACCEPT_ENCODING
+    assert HTTP_RESPONSE_HEADERS_SECONDS.count(http_version="HTTP/1.1") == before + 2
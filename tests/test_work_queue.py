@@ -0,0 +1,133 @@
+# tests/test_work_queue.py
+import asyncio
+import os
+from types import SimpleNamespace
+import httpx
+import pytest
+import crawler.pipeline as pipeline_module
+import crawler.scraper as scraper_module
+import crawler.worker as worker_module
+from crawler.storage import InMemoryWorkQueue, WorkQueue, DONE, FAILED, LEASED, PENDING
+from tests.test_pipeline import CATEGORY_URL, FakePages, handler, no_validators
+
+MONGODB_URL = os.getenv("TEST_MONGODB_URL", "mongodb://localhost:27017")
+
+
+async def mongo_queue(**kwargs):
+    from motor.motor_asyncio import AsyncIOMotorClient
+    client = AsyncIOMotorClient(MONGODB_URL, serverSelectionTimeoutMS=500)
+    try:
+        await client.admin.command("ping")
+    except Exception:
+        pytest.skip("no local mongod")
+    collection = client.books_test.crawl_queue
+    queue = WorkQueue(lambda: collection, **kwargs)
+    await queue.reset()
+    await queue.ensure_indexes()
+    return queue
+
+
+async def make_queue(kind, **kwargs):
+    if kind == "mongo":
+        return await mongo_queue(**kwargs)
+    return InMemoryWorkQueue(**kwargs)
+
+
+@pytest.fixture(params=["memory", "mongo"])
+def kind(request):
+    return request.param
+
+
+def test_claims_do_not_overlap_and_complete(kind):
+    async def run():
+        queue = await make_queue(kind)
+        await queue.enqueue([{"_id": f"u{i}", "kind": "book", "category": "c"} for i in range(5)])
+        await queue.enqueue([{"_id": "u0", "kind": "book", "category": "c"}])  # duplicate is ignored
+        first = await queue.claim("w1", 3)
+        second = await queue.claim("w2", 3)
+        await queue.complete("w1", [doc["_id"] for doc in first])
+        await queue.complete("w1", [doc["_id"] for doc in second])  # not w1's leases
+        return first, second, await queue.counts()
+
+    first, second, counts = asyncio.run(run())
+    assert len(first) == 3 and len(second) == 2
+    assert not {d["_id"] for d in first} & {d["_id"] for d in second}
+    assert counts == {DONE: 3, LEASED: 2}
+
+
+def test_expired_leases_are_reclaimed_until_attempts_run_out(kind):
+    async def run():
+        queue = await make_queue(kind, lease_seconds=-1, max_attempts=2)
+        await queue.enqueue([{"_id": "u", "kind": "book"}])
+        await queue.claim("dead", 1)  # lease already expired
+        reclaimed = await queue.claim("w2", 1)
+        exhausted = await queue.claim("w3", 1)
+        return reclaimed, exhausted
+
+    reclaimed, exhausted = asyncio.run(run())
+    assert reclaimed[0]["owner"] == "w2" and reclaimed[0]["attempts"] == 2
+    assert exhausted == []
+
+
+def test_release_returns_items_or_fails_them(kind):
+    async def run():
+        queue = await make_queue(kind, max_attempts=2)
+        await queue.enqueue([{"_id": "u", "kind": "book"}])
+        await queue.claim("w1", 1)
+        assert await queue.renew("w1", ["u"]) == 1
+        assert await queue.renew("w2", ["u"]) == 0
+        await queue.release("w1", ["u"])
+        after_first = await queue.counts()
+        await queue.claim("w1", 1)
+        await queue.release("w1", ["u"])
+        return after_first, await queue.counts()
+
+    after_first, after_second = asyncio.run(run())
+    assert after_first == {PENDING: 1}
+    assert after_second == {FAILED: 1}
+
+
+def test_requeue_expired(kind):
+    async def run():
+        queue = await make_queue(kind, lease_seconds=-1)
+        await queue.enqueue([{"_id": "u", "kind": "book"}])
+        await queue.claim("dead", 1)
+        return await queue.requeue_expired(), await queue.counts()
+
+    requeued, counts = asyncio.run(run())
+    assert requeued == 1
+    assert counts == {PENDING: 1}
+
+
+def test_worker_exits_when_a_final_attempt_lease_expires(kind):
+    async def run():
+        queue = await make_queue(kind, lease_seconds=-1, max_attempts=1)
+        await queue.enqueue([{"_id": "u", "kind": "book", "category": "c"}])
+        await queue.claim("dead", 1)  # last attempt, lease already expired
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await asyncio.wait_for(worker_module.run_worker(client, queue, owner="w1", idle_seconds=0), 5)
+
+    assert asyncio.run(run()) == {FAILED: 1}
+
+
+def test_worker_drains_the_queue(monkeypatch):
+    fake_db = SimpleNamespace(pages=FakePages(), get_validators=no_validators)
+    monkeypatch.setattr(scraper_module, "db", fake_db)
+    monkeypatch.setattr(pipeline_module, "db", fake_db)
+    stored = []
+
+    async def store(books):
+        stored.extend(book["url"] for book in books)
+
+    monkeypatch.setattr(worker_module, "store_books", store)
+
+    async def run():
+        queue = InMemoryWorkQueue(max_attempts=2)
+        await queue.enqueue([{"_id": CATEGORY_URL, "kind": "category"}])
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await worker_module.run_worker(client, queue, owner="w1", idle_seconds=0)
+
+    counts = asyncio.run(run())
+    assert len(stored) == 2
+    # The category and two books are done; the book that always 500s ran out of attempts
+    assert counts == {DONE: 3, FAILED: 1}
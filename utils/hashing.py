@@ -9,4 +9,8 @@ def compute_fingerprint(book_data: dict) -> str:
         "rating": book_data.get("rating", 0)
     }
     blob = json.dumps(core, sort_keys=True, default=str)
-    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
\ No newline at end of file
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+def compute_content_hash(data: bytes) -> str:
+    """SHA-256 of a raw page body, used as its content address."""
+    return hashlib.sha256(data).hexdigest()
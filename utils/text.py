@@ -0,0 +1,12 @@
+import re
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def tokenize(text: str | None) -> list[str]:
+    """Lowercased word tokens, first occurrence order, no duplicates.
+
+    Stored on each book as ``title_tokens`` for prefix (typeahead) search;
+    the API tokenizes queries the same way.
+    """
+    return list(dict.fromkeys(_WORD_RE.findall((text or "").lower())))